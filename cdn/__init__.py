@@ -1,5 +1,11 @@
 from .request import Request
-from .livetv import LiveTV
+from .memo import Memo
+from .factorized import Factorized
+from .sketch import Sketch
+from .store import Store
+from .mixed import Mixed
+from .livetv import LiveTV, FactorizedLiveTV
 from .cache import Cache, DellR750
 from .pop import PoP
 from .system import System
+from .pipeline import Tier, Pipeline
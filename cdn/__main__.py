@@ -1,15 +1,26 @@
-from cdn import System, LiveTV, DellR750
+from cdn import Sketch, Memo, Store
+from cdn.montecarlo import MonteCarlo
+from cdn.diurnal import Diurnal, DiurnalMonteCarlo
+from cdn.optimizer import Optimizer
+from cdn.results import Results
+from cdn.pareto import Pareto
+from cdn.checkpoint import Checkpoint
+from cdn.scenarios import Scenarios
 import argparse
 import numpy as np
-import pandas as pd
-from tqdm.auto import tqdm
 import datetime
+import os
+import signal
+
+# plotting, pandas, scipy and tqdm are imported only when a plot, a fit, a report or a progress bar is needed, so a
+# headless run starts at the cost of numpy
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='CDN designer.')
     parser.add_argument('--channels', type=int, help='number of liveTV channels', required=True)
-    parser.add_argument('--zipf', metavar='s', nargs=1,
-                        help='Use zipf distribution to model channel popularity, s parameter', required=True)
+    parser.add_argument('--zipf', metavar='s|FILE', nargs=1, required=True,
+                        help='Use zipf distribution to model channel popularity, s parameter or a csv file of the '
+                             'channel request counts (last column) to fit it to')
     parser.add_argument('--timeshift', type=float, nargs=3, metavar=('LEN', 'MEAN', 'STDDEV'),
                         help='timeshift parameters (h)', required=True)
     parser.add_argument('--fragmentlen', type=float, help='length of a streaming fragment (s)', required=True)
@@ -19,104 +30,207 @@ if __name__ == '__main__':
     #                        required=True)
     parser.add_argument('--peak', type=float, help='maximum peak load (Tbps)', required=True)
     parser.add_argument('--pops', type=int, help='number of PoPs', required=True)
-    parser.add_argument('--iterations', type=int, help='number of Monte Carlo iterations', required=True)
-
-    args = parser.parse_args()
-
-    pd.set_option('display.max_columns', None)  # or 1000
-    pd.set_option('display.max_rows', None)  # or 1000
-    pd.set_option('display.max_colwidth', None)  # or 199
-    pd.set_option('display.width', None)
+    parser.add_argument('--iterations', type=int, required=True,
+                        help='number of Monte Carlo iterations (evaluations with --optimizer)')
+    parser.add_argument('--loadcurve', metavar='FILE',
+                        help='size against the load curve of a day instead of the single peak, a csv of a row per slot '
+                             '(e.g. 288 of 5 minutes): the load relative to --peak and optionally the timeshift mean '
+                             'and stddev (h), a request profile is built for each distinct timeshift')
+    parser.add_argument('--optimizer', choices=Optimizer.strategies,
+                        help='search for the cheapest valid design instead of random sampling')
+    parser.add_argument('--prune', action='store_true',
+                        help='skip the evaluation of the sampled designs, which are invalid by cheap bounds or dominated '
+                             'by the Pareto frontier so far (they are not written to the results), random sampling only')
+    parser.add_argument('--factorized', action='store_true',
+                        help='do not materialize the channel x fragment x profile request profile')
+    parser.add_argument('--memo', type=float, default=64, metavar='MB',
+                        help='memory budget of the miss stream memo (MB), only used with --factorized')
+    parser.add_argument('--memoquantum', type=float, metavar='GB',
+                        help='round the cache volumes of the memo down to a multiple of this (exact if omitted), only '
+                             'used with --factorized')
+    parser.add_argument('--compact', action='store_true',
+                        help='keep the request profile in float32 (less than half the memory, cdf error below 1.2e-7)')
+    parser.add_argument('--store', metavar='DIR',
+                        help='keep the built request profiles in this directory and memory map them on later runs')
+    parser.add_argument('--storebudget', type=float, default=10, metavar='GB',
+                        help='disk budget of the profile store (GB), the least recently used profiles are evicted')
+    parser.add_argument('--sketch', type=float, metavar='ERROR',
+                        help='compress the request profile to a sketch with this maximum hit ratio error')
+    parser.add_argument('--pareto', nargs='+', choices=list(Pareto.senses), default=['cost', 'util_ec', 'util_mc'],
+                        metavar='COLUMN', help=f'objectives of the Pareto frontier ({", ".join(Pareto.senses)}), '
+                                               f'default: cost versus capacity headroom (cost util_ec util_mc)')
+    parser.add_argument('--seed', type=int, help='seed of the Monte Carlo iterations (random if omitted)')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help='checkpoint the random sampling to this file (.npz) periodically and on Ctrl-C or SIGTERM, '
+                             'the run stops after the block at hand, see --resume')
+    parser.add_argument('--checkpointinterval', type=float, default=60, metavar='S',
+                        help='minimum time between two checkpoints (s)')
+    parser.add_argument('--resume', metavar='FILE',
+                        help='continue the run of a checkpoint with its options (the other options are ignored), the '
+                             'output is the one of the uninterrupted run')
+    parser.add_argument('--no-plot', '--headless', dest='headless', action='store_true',
+                        help='do not plot the request profile nor show a progress bar (batch jobs without a display)')
+    parser.add_argument('--profile', action='store_true',
+                        help='time the stages of the run and write the breakdown next to the results (only this '
+                             'process is measured, not the workers)')
+
+    # a resumed run takes its options from the checkpoint, the required ones are not given again
+    resume = argparse.ArgumentParser(add_help=False)
+    resume.add_argument('--resume')
+    checkpoint = resume.parse_known_args()[0].resume
+    if checkpoint:
+        state, _ = Checkpoint.load(checkpoint)
+        args = argparse.Namespace(**dict(state['params'], checkpoint=checkpoint, resume=checkpoint))
+        print(f"Resuming {checkpoint}: {state['blocks']} blocks, {state['rows']} designs done\n")
+    else:
+        args = parser.parse_args()
+        state = None
+    if args.checkpoint and args.optimizer:
+        parser.error('--checkpoint is for the random sampling, it does not take --optimizer')
+    if args.loadcurve and (args.optimizer or args.sketch is not None):
+        parser.error('--loadcurve is evaluated by the Monte Carlo sampling of the request profile, it does not take '
+                     '--optimizer nor --sketch')
+
+    if args.profile:
+        from cdn.profiler import Profiler
+        profiler = Profiler().start()
+    else:
+        profiler = None
 
-    channels = args.channels
-    tslen = args.timeshift[0] * 60 * 60
-    tsmean = args.timeshift[1] * 60 * 60
-    tsstddev = args.timeshift[2] * 60 * 60
     fragmentlen = args.fragmentlen
-    fragmentnum = round(tslen / fragmentlen)
-    profiles = args.profiles
-    bandwidths = np.array(args.bandwidths) * 1000 * 1000
-    #    formats = args.formats
     peak = args.peak * 1000 * 1000 * 1000 * 1000
     pops = args.pops
 
+    # channel popularity
+    s, interval = Scenarios.zipf(args.zipf[0])
+    if interval is not None:
+        print(f"Zipf parameter fitted to {args.zipf[0]}: {s:.3f} (95% confidence interval: {interval[0]:.3f} ... "
+              f"{interval[1]:.3f})\n")
+
     # create request model
-    request = LiveTV(channels, fragmentnum, profiles, bandwidths / 8 * fragmentlen, 1.56, tsmean / fragmentlen,
-                     tsstddev / fragmentlen)
+    if args.factorized:
+        quantum = args.memoquantum * 1000 * 1000 * 1000 if args.memoquantum else None
+        request = Scenarios.livetv(args.channels, s, args.timeshift, fragmentlen, args.profiles, args.bandwidths,
+                                   memo=Memo(args.memo * 1000 * 1000, quantum))
+    else:
+        store = Store(args.store, args.storebudget * 1000 * 1000 * 1000) if args.store else None
+        request = Scenarios.livetv(args.channels, s, args.timeshift, fragmentlen, args.profiles, args.bandwidths,
+                                   store, args.compact)
     #    request.plot()
     #    request.plotstats()
     print(request.describe(fragmentlen))
-    request.plot()
-
-    # create CDN model
-    ec = DellR750()
-    mc = DellR750()
-    cdn = System(pops, request, ec, mc)
-
-    # determine number of request from throughput
-    numrequests = request.bps2rps(peak)
+    if not args.headless:
+        request.plot()
+
+    # create CDN model and determine number of request from throughput
+    model = Sketch(request, args.sketch) if args.sketch is not None else request
+    if args.sketch is not None:
+        print(f"Sketch knots: {model.knots} ({model.nbytes / 1000:.1f} kB)\n")
+    if args.loadcurve:
+        curve = np.loadtxt(args.loadcurve, delimiter=',', ndmin=2)
+        timeshift = [curve[:, column] * 60 * 60 / fragmentlen if curve.shape[1] > column else None for column in [1, 2]]
+        diurnal = Diurnal(request, curve[:, 0] * peak, *timeshift)
+        print(f"Load curve of {args.loadcurve}: {diurnal.slots} slots, {len(diurnal.profiles)} timeshift profiles\n")
+        montecarlo = DiurnalMonteCarlo(diurnal, pops)
+        peak = np.max(diurnal.load)
+    else:
+        montecarlo = Optimizer(model, pops, peak) if args.optimizer else MonteCarlo(model, pops, peak)
+    numrequests = montecarlo.numrequests
     print(f"Total CDN throughput: {peak / 1000 / 1000 / 1000 / 1000:.2f} Tbps\n"
           f"Expected requests: {numrequests:.0f} 1/s\n"
           f"Number of PoPs: {pops}\n")
 
-    # monte carlo
+    # monte carlo, the results are streamed to the csv file
     iterations = args.iterations
-    results = pd.DataFrame(columns=['egress_pop_Gbps', 'numecpop', 'storageec_GB', 'storage1ec_GB', 'replication','chr_ec','util_ec','ingress_pop_Gbps',
-                                    'egress_mc_Gbps', 'nummc', 'storagemc_GB', 'chr_mc', 'util_mc',
-                                    'valid', 'cost'])
-    with tqdm(total=iterations) as pbar:
-        try:
-            for i in range(iterations):
-
-                # play with various edge cache number and sizes
-                cdn.replication = np.random.randint(1, 10+1)
-                cdn.storage1ec = np.random.random()  # ratio
-                cdn.nummodulesec = np.random.randint(ec.minmodules, ec.maxmodules + 1)
-                cdn.numecpop = np.random.randint(1, 40 + 1)
-
-                # play with various master cache memory config, but keep the overall storage at content base
-                cdn.nummodulesmc = np.random.randint(mc.minmodules, mc.maxmodules + 1)
-                cdn.nummc = int(np.ceil(request.contentbase / cdn.storagemc))
-
-                # determine origin load
-                rps2, ingress2, util_ec, chr_ec, rps3, ingress3, util_mc, chr_mc = cdn.ingress(numrequests, request)
-
-                valid = True
-                if util_ec > 1 or util_mc > 1:
-                    valid = False
-                results = results.append({'egress_pop_Gbps': np.round(peak / pops / 1000 / 1000 / 1000),
-                                          'numecpop': cdn.numecpop,
-                                          'storageec_GB': cdn.storageec / 1000 / 1000 / 1000,
-                                          'storage1ec_GB': np.round(cdn.storage1ec / 1000 / 1000 / 1000),
-                                          'replication': cdn.replication,
-                                          'chr_ec': np.round(chr_ec * 100,2),
-                                          'util_ec': np.round(util_ec * 100,2),
-                                          'ingress_pop_Gbps': np.round(ingress2.rps2bps(rps2) / 1000 / 1000 / 1000, 2),
-                                          'egress_mc_Gbps': np.round (ingress2.rps2bps(rps2) * pops / cdn.nummc / 1000 / 1000 / 1000, 2),
-                                          'nummc': cdn.nummc,
-                                          'storagemc_GB': cdn.storagemc / 1000 / 1000 / 1000,
-                                          'chr_mc': np.round(chr_mc * 100,2),
-                                          'util_mc': np.round(util_mc * 100,2),
-                                          'valid': valid, 'cost': cdn.cost}, ignore_index=True)
-                pbar.update(1)
-        except KeyboardInterrupt:
-            pass
-
-    results.sort_values(by=['valid', 'cost'], ascending=False, inplace=True)
-    now = datetime.datetime.now()
-    with open(f"/data/cdn{now}.csv", 'at') as f:
-        for line in request.describe(fragmentlen).splitlines():
-            f.write(f"# {line}\n")
-
-        f.write(f"#\n"
-                f"# Total CDN throughput: {peak / 1000 / 1000 / 1000 / 1000:.2f} Tbps\n"
-                f"# Expected requests: {numrequests:.0f} 1/s\n"
-                f"# Number of PoPs: {pops}\n"
-                f"#\n")
-
-        results.to_csv(f)
-    request.save(f"/data/requests_{now}.png")
-    print(results)
+    now = datetime.datetime.fromisoformat(state['now']) if state else datetime.datetime.now()
+    loadcurve = f"Load curve: {args.loadcurve} ({diurnal.slots} slots)\n" if args.loadcurve else ""
+    header = f"{request.describe(fragmentlen)}" \
+             f"\n" \
+             f"Total CDN throughput: {peak / 1000 / 1000 / 1000 / 1000:.2f} Tbps\n" \
+             f"Expected requests: {numrequests:.0f} 1/s\n" \
+             f"Number of PoPs: {pops}\n" \
+             f"{loadcurve}" \
+             f"\n"
+    if state:
+        _, results, pareto = Checkpoint.resume(checkpoint, MonteCarlo.columns)
+        seed, start, pruned = state['seed'], state['blocks'], state['pruned']
+    else:
+        results = Results(f"/data/cdn{now}.csv", MonteCarlo.columns, header=header)
+        pareto = Pareto(MonteCarlo.columns, args.pareto)
+        # the seed of a random run is drawn here, so a checkpoint can replay it
+        seed = args.seed if args.seed is not None or not args.checkpoint else np.random.SeedSequence().entropy
+        start, pruned = 0, 0
+
+    # with a checkpoint, Ctrl-C and SIGTERM stop the run after the block at hand, the workers ignore them
+    stop = []
+    if args.checkpoint:
+        checkpoint = Checkpoint(args.checkpoint, args.checkpointinterval)
+        params = dict(vars(args), checkpoint=args.checkpoint, resume=None)
+        for signum in [signal.SIGINT, signal.SIGTERM]:
+            signal.signal(signum, lambda *_: stop.append(True))
+    else:
+        checkpoint = None
+    if not args.headless:
+        from tqdm.auto import tqdm
+        pbar = tqdm(total=iterations, initial=len(results) + pruned)
+    else:
+        pbar = None
+    try:
+        if args.optimizer == 'grid':
+            blocks = montecarlo.grid(iterations)
+        elif args.optimizer:
+            blocks = getattr(montecarlo, args.optimizer)(iterations, seed=args.seed)
+        else:
+            blocks = montecarlo.run(iterations, seed=seed, workers=args.workers, prune=args.prune, pareto=pareto,
+                                    start=start)
+        done, offset = start, pruned
+        for block in blocks:
+            results.extend(**block)
+            pareto.extend(**block)
+            done += 1
+            if pbar is not None:
+                pbar.update(len(block['cost']) + offset + montecarlo.pruned - pruned)
+            pruned = offset + montecarlo.pruned
+            if checkpoint is not None and (stop or checkpoint.due):
+                checkpoint.save(done, results, pareto, params=params, seed=seed, now=str(now), pruned=pruned)
+            if stop:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pbar is not None:
+            pbar.close()
+    if stop:
+        print(f"Stopped, continue with --resume {checkpoint.filename}")
+        raise SystemExit(1)
+
+    if args.prune:
+        print(f"Pruned: {pruned} designs invalid by their bounds or dominated, not evaluated")
+    if args.factorized and args.workers == 1:
+        memo = request.memo
+        print(f"Memo: {memo.hits} hits, {memo.misses} misses, {len(memo)} entries ({memo.nbytes / 1000 / 1000:.1f} MB)")
+
+    results.sort(by=['valid', 'cost'], ascending=False)
+    pareto.save(f"/data/pareto{now}.csv", header=f"{header}Pareto frontier of {', '.join(pareto.objectives)}\n")
+    if not args.headless:
+        request.save(f"/data/requests_{now}.png")
+    if checkpoint is not None and os.path.exists(checkpoint.filename):
+        os.remove(checkpoint.filename)
+
+    import pandas as pd
+    pd.set_option('display.max_columns', None)  # or 1000
+    pd.set_option('display.max_rows', None)  # or 1000
+    pd.set_option('display.max_colwidth', None)  # or 199
+    pd.set_option('display.width', None)
+    print(f"Pareto frontier of {', '.join(pareto.objectives)} ({len(pareto)} of {len(results)} designs):")
+    print(pareto.frame())
+
+    if profiler is not None:
+        profiler.stop()
+        print(f"\nStages of the run ({profiler.elapsed:.2f} s, times include the nested stages):")
+        print(profiler.frame())
+        profiler.save(f"{os.path.splitext(results.filename)[0]}_profile.json")
 
 
     # print(f"Total origin throughput: {egress_o.rps2bps(numrequests_o) / 1000 / 1000 / 1000:.2f} Gbps\n"
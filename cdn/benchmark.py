@@ -0,0 +1,254 @@
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from cdn import Request, LiveTV, DellR750, PoP, System
+from cdn.montecarlo import MonteCarlo
+from cdn.results import Results
+from cdn.pareto import Pareto
+from cdn.simulator import LRU, LFU, TTL
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# profile of the benchmarks: bitrate ladder (bps), its weights, fragment length (s) and the CDN load
+bandwidths = np.array([2.5, 5, 8]) * 1000 * 1000
+weights = np.array([1., 2., 3.])
+fragmentlen = 5
+peak = 10 * 1000 * 1000 * 1000 * 1000
+numpops = 10
+
+
+def livetv(scale: int) -> LiveTV:
+    """
+    LiveTV profile of about scale contents: up to 1000 fragments of each channel and profile.
+    :param scale: number of contents
+    :return:
+    """
+    fragments = int(min(1000, max(1, scale // bandwidths.size)))
+    channels = int(max(1, scale // bandwidths.size // fragments))
+    return LiveTV(channels, fragments, weights, bandwidths / 8 * fragmentlen, 1.56, fragments / 4, fragments / 8)
+
+
+def trace(scale: int, requests: int, seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Request log of Zipf distributed contents, one request per second, the sizes of the fragments of the profiles.
+    :param scale: number of contents
+    :param requests: number of requests
+    :param seed: seed of the contents
+    :return: tuple of (request times (s), content ids, content sizes (Byte))
+    """
+    content = np.random.default_rng(seed).zipf(1.56, requests) % scale
+    return np.arange(requests, dtype=float), content, (bandwidths / 8 * fragmentlen).astype(np.int64)[content % 3]
+
+
+class Benchmark:
+    cases = ['request', 'cdf', 'livetv', 'consistenthashing', 'pop', 'system', 'cli', 'lru', 'lfu', 'ttl']
+    scales = [10 ** n for n in range(3, 9)]
+
+    def __init__(self, repeat: int = 3, iterations: int = 10000, seed: Optional[int] = 0,
+                 requests: int = 1000 * 1000):
+        """
+        Timing and peak memory of the hot paths of a sizing run on catalogs of growing scale. The setup of a case (the
+        input profile) is not measured, only the call itself.
+        :param repeat: number of timed calls of a case, the fastest counts
+        :param iterations: number of designs evaluated by the cli case (one Monte Carlo run)
+        :param seed: seed of the random inputs
+        :param requests: number of requests replayed by the cache cases (lru, lfu and ttl of cdn.simulator)
+        """
+        assert repeat > 0, f"non positive repeat: {repeat}"
+        assert iterations > 0, f"non positive iterations: {iterations}"
+        assert requests > 0, f"non positive requests: {requests}"
+        self._repeat = repeat
+        self._iterations = iterations
+        self._seed = seed
+        self._requests = requests
+        self._profiles = {}
+
+    def _profile(self, scale: int) -> LiveTV:
+        """
+        Returns the LiveTV profile of the scale, only the one of the last scale is kept.
+        """
+        if scale not in self._profiles:
+            self._profiles = {scale: livetv(scale)}
+        return self._profiles[scale]
+
+    def setup(self, case: str, scale: int) -> Callable[[], object]:
+        """
+        Prepares the input of a case.
+        :param case: see cases
+        :param scale: number of contents
+        :return: the call to measure
+        """
+        assert case in self.cases, f"Wrong case: {case}"
+        rng = np.random.default_rng(self._seed)
+        if case == 'request':
+            size, probability = rng.integers(1, 10 * 1000 * 1000, scale), rng.random(scale)
+            return lambda: Request(size, probability)
+        if case == 'livetv':
+            return lambda: livetv(scale)
+        if case in ['lru', 'lfu', 'ttl']:
+            return self._replay(case, *trace(scale, self._requests, self._seed))
+
+        request = self._profile(scale)
+        if case == 'cdf':
+            volumes = rng.uniform(0, request.contentbase, 1000)
+            return lambda: [(request.cdf(volume), request.miss(volume).meanrequestsize) for volume in volumes]
+        if case == 'consistenthashing':
+            return lambda: request.consistenthashing(5, 2)
+        if case == 'pop':
+            pop = PoP(DellR750())
+            pop.numcache, pop.replication, pop.nummodules = 10, 2, 8
+            return lambda: pop.ingress(int(request.bps2rps(peak / numpops)), request)
+        if case == 'system':
+            system = System(numpops, request, DellR750(), DellR750())
+            system.numecpop, system.replication, system.nummodulesec = 10, 2, 8
+            return lambda: system.ingress(int(request.bps2rps(peak)), request)
+        return lambda: self._cli(request)
+
+    def _cli(self, request: Request):
+        """
+        The loop of cdn/__main__.py: a Monte Carlo run streamed to the results and to the Pareto frontier.
+        """
+        montecarlo = MonteCarlo(request, numpops, peak)
+        with tempfile.TemporaryDirectory() as directory:
+            results = Results(os.path.join(directory, 'cdn.csv'), MonteCarlo.columns)
+            pareto = Pareto(MonteCarlo.columns)
+            for block in montecarlo.run(self._iterations, seed=self._seed):
+                results.extend(**block)
+                pareto.extend(**block)
+            results.sort(by=['valid', 'cost'], ascending=False)
+
+    def _replay(self, case: str, time: np.ndarray, content: np.ndarray, size: np.ndarray,
+                chunksize: int = 1 << 20) -> Callable[[], object]:
+        """
+        Replays a request log through a new cache chunk by chunk, like cdn.trace: the lru and lfu caches hold a tenth
+        of the requested volume, the lfu one is refreshed every 10000 requests, the ttl one keeps a content for a
+        tenth of the log.
+        """
+        capacity = np.sum(size[np.unique(content, return_index=True)[1]]) / 10
+        make = {'lru': lambda: LRU(capacity), 'lfu': lambda: LFU(capacity, 10000),
+                'ttl': lambda: TTL(content.size / 10)}[case]
+
+        def replay():
+            cache = make()
+            return [cache.feed(content[start:start + chunksize], size[start:start + chunksize],
+                               time[start:start + chunksize]) for start in range(0, content.size, chunksize)]
+        return replay
+
+    def measure(self, call: Callable[[], object]) -> Tuple[float, float, int]:
+        """
+        Times a call repeatedly, then traces its allocations (numpy reports its buffers to tracemalloc) in one more
+        call, so the tracing does not slow down the timed ones.
+        :param call:
+        :return: tuple of (fastest and mean time (s), peak of the allocated memory (Byte))
+        """
+        times = []
+        for _ in range(self._repeat):
+            start = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            call()
+            _, peakmemory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return min(times), float(np.mean(times)), peakmemory
+
+    def run(self, cases: Optional[Sequence[str]] = None, scales: Optional[Sequence[int]] = None,
+            callback: Optional[Callable[[Dict[str, object]], None]] = None) -> pd.DataFrame:
+        """
+        Measures the cases on all scales, scale by scale, so the profile of a scale is built only once.
+        :param cases: see cases, all if None
+        :param scales: numbers of contents, see scales if None
+        :param callback: called with each result row as it is measured
+        :return: frame of case, scale, time (fastest), mean and peak memory (Byte)
+        """
+        rows = []
+        for scale in scales if scales is not None else self.scales:
+            for case in cases if cases is not None else self.cases:
+                best, mean, peakmemory = self.measure(self.setup(case, int(scale)))
+                rows.append({'case': case, 'scale': int(scale), 'time': best, 'mean': mean, 'memory': peakmemory})
+                if callback is not None:
+                    callback(rows[-1])
+        self._profiles = {}
+        return pd.DataFrame(rows, columns=['case', 'scale', 'time', 'mean', 'memory'])
+
+    @staticmethod
+    def save(filename: str, frame: pd.DataFrame):
+        """
+        Writes the results as json, along with the versions they were measured with.
+        :param filename:
+        :param frame: see run()
+        :return:
+        """
+        environment = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                       'machine': platform.machine(), 'processor': platform.processor()}
+        with open(filename, 'wt') as f:
+            json.dump({'environment': environment, 'results': frame.to_dict(orient='records')}, f, indent=1)
+
+    @staticmethod
+    def load(filename: str) -> pd.DataFrame:
+        """
+        Reads the results written by save().
+        """
+        with open(filename) as f:
+            return pd.DataFrame(json.load(f)['results'], columns=['case', 'scale', 'time', 'mean', 'memory'])
+
+    @staticmethod
+    def compare(frame: pd.DataFrame, baseline: pd.DataFrame, tolerance: float = 0.2,
+                mintime: float = 1e-3) -> pd.DataFrame:
+        """
+        Compares results to a baseline, case by case and scale by scale (only the ones in both).
+        :param frame: see run()
+        :param baseline: see run()
+        :param tolerance: relative slowdown or memory growth allowed
+        :param mintime: time (s) below which a slowdown is timer noise rather than a regression
+        :return: frame of the time and memory ratios (to the baseline) and whether it regressed
+        """
+        assert tolerance >= 0, f"negative tolerance: {tolerance}"
+        merged = frame.merge(baseline, on=['case', 'scale'], suffixes=('', '_baseline'))
+        merged['timeratio'] = merged['time'] / merged['time_baseline']
+        merged['memoryratio'] = merged['memory'] / np.maximum(merged['memory_baseline'], 1)
+        merged['regression'] = ((merged['timeratio'] > 1 + tolerance) & (merged['time'] > mintime)) | \
+                               (merged['memoryratio'] > 1 + tolerance)
+        return merged[['case', 'scale', 'time', 'time_baseline', 'timeratio', 'memory', 'memory_baseline',
+                       'memoryratio', 'regression']]
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Benchmark of the CDN model.')
+    parser.add_argument('--cases', nargs='+', choices=Benchmark.cases, default=Benchmark.cases, help='cases to measure')
+    parser.add_argument('--scales', type=float, nargs='+', default=Benchmark.scales,
+                        help='numbers of contents (default: 1e3 ... 1e8)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed calls of a case')
+    parser.add_argument('--iterations', type=int, default=10000, help='number of designs of the cli case')
+    parser.add_argument('--requests', type=int, default=1000 * 1000,
+                        help='number of requests of the lru, lfu and ttl cases')
+    parser.add_argument('--output', default='benchmark.json', help='json file of the results')
+    parser.add_argument('--baseline', help='json file of earlier results to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative slowdown or memory growth allowed')
+    args = parser.parse_args()
+
+    pd.set_option('display.width', None)
+    benchmark = Benchmark(args.repeat, args.iterations, requests=args.requests)
+    results = benchmark.run(args.cases, [int(scale) for scale in args.scales],
+                            callback=lambda row: print(f"{row['case']:>17} {row['scale']:>10.0e}: {row['time']:9.4f} s"
+                                                       f" {row['memory'] / 1000 / 1000:10.1f} MB", flush=True))
+    Benchmark.save(args.output, results)
+
+    if args.baseline:
+        comparison = Benchmark.compare(results, Benchmark.load(args.baseline), args.tolerance)
+        print(comparison)
+        regressions = comparison[comparison['regression']]
+        if len(regressions):
+            names = [f"{case} {scale:.0e}" for case, scale in zip(regressions['case'], regressions['scale'])]
+            print(f"Regressions: {', '.join(names)}")
+            sys.exit(1)
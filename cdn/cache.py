@@ -19,6 +19,14 @@ class Cache:
     def modulesize(self):
         return self._modulesize
 
+    @property
+    def moduleprice(self) -> float:
+        return self._moduleprice
+
+    @property
+    def baseprice(self) -> float:
+        return self._baseprice
+
     @property
     def maxmodules(self) -> int:
         return self._maxmodules
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from cdn.results import Results
+from cdn.pareto import Pareto
+from typing import Dict, List, Tuple
+
+
+class Checkpoint:
+    # layout version of the checkpoint files
+    version = 1
+
+    def __init__(self, filename: str, interval: float = 60):
+        """
+        Periodic checkpoint of a Monte Carlo run (see MonteCarlo.run()): the blocks of a run are seeded one by one
+        from its seed, so the random state is the seed and the number of blocks done. The results are flushed to their
+        csv file, which is truncated back to the checkpointed size on resume, the Pareto frontier is stored as is. The
+        checkpoint is written to a temporary file and renamed, so the file on disk is always a complete one.
+        :param filename: checkpoint file (.npz)
+        :param interval: minimum time between two checkpoints (s)
+        """
+        assert interval >= 0, f"negative interval: {interval}"
+        self._filename = filename
+        self._interval = interval
+        self._last = time.monotonic()
+        self._saves = 0
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def saves(self) -> int:
+        return self._saves
+
+    @property
+    def due(self) -> bool:
+        """
+        Whether the interval has passed since the last checkpoint.
+        """
+        return time.monotonic() - self._last >= self._interval
+
+    def save(self, blocks: int, results: Results, pareto: Pareto, **state):
+        """
+        Writes a checkpoint.
+        :param blocks: number of blocks done
+        :param results: results of the blocks done, flushed
+        :param pareto: frontier of the blocks done
+        :param state: json serializable values, e.g. the parameters and the seed of the run
+        :return:
+        """
+        results.flush()
+        meta = dict(state, version=self.version, blocks=blocks, filename=results.filename, rows=len(results),
+                    size=os.path.getsize(results.filename), objectives=pareto.objectives)
+        frontier = {f"frontier_{name}": values for name, values in pareto.frontier.items()}
+
+        directory = os.path.dirname(os.path.abspath(self._filename))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), **frontier)
+            os.replace(tmp, self._filename)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self._last = time.monotonic()
+        self._saves += 1
+
+    @staticmethod
+    def load(filename: str) -> Tuple[Dict[str, object], Dict[str, np.ndarray]]:
+        """
+        Reads a checkpoint.
+        :param filename:
+        :return: tuple of (state, see save(), Pareto frontier)
+        """
+        with np.load(filename) as checkpoint:
+            meta = json.loads(str(checkpoint['meta']))
+            frontier = {name[len('frontier_'):]: checkpoint[name] for name in checkpoint.files
+                        if name.startswith('frontier_')}
+        assert meta['version'] == Checkpoint.version, f"Wrong checkpoint version: {meta['version']}"
+        return meta, frontier
+
+    @staticmethod
+    def resume(filename: str, columns: List[Tuple[str, type]]) -> Tuple[Dict[str, object], Results, Pareto]:
+        """
+        Restores the results and the Pareto frontier of a checkpoint.
+        :param filename:
+        :param columns: columns of the results, see Results
+        :return: tuple of (state, see save(), results, Pareto frontier)
+        """
+        meta, frontier = Checkpoint.load(filename)
+        results = Results.reopen(meta['filename'], columns, meta['rows'], meta['size'])
+        pareto = Pareto(columns, meta['objectives'])
+        pareto.frontier = frontier
+        return meta, results, pareto
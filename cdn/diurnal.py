@@ -0,0 +1,131 @@
+import numpy as np
+from cdn import System
+from cdn.livetv import _LiveTV
+from cdn.montecarlo import MonteCarlo
+from typing import Dict, List, Optional, Tuple
+
+
+class Diurnal:
+    def __init__(self, request: _LiveTV, load: np.ndarray, tsmu: Optional[np.ndarray] = None,
+                 tssigma: Optional[np.ndarray] = None):
+        """
+        Load curve of a day, e.g. 288 slots of 5 minutes: the throughput and the timeshift distribution of each slot.
+        The slots of the same timeshift share one request profile, the other ones get a timeshifted copy of request
+        (only the fragment factor is recomputed, see _LiveTV.timeshifted()). Each profile is evaluated once for all
+        of its slots, so round the timeshifts to keep the profiles few.
+        :param request: LiveTV or FactorizedLiveTV profile
+        :param load: array of the total CDN throughput of the slots (bps)
+        :param tsmu: array of the timeshift means of the slots (fragment), the one of request if None
+        :param tssigma: array of the timeshift stddevs of the slots (fragment), the one of request if None
+        """
+        load = np.asarray(load, dtype=float)
+        assert load.ndim == 1 and load.size > 0, f"Wrong load curve shape: {load.shape}"
+        assert np.all(load >= 0), f"negative load: {load}"
+        tsmu = np.broadcast_to(request.tsmu if tsmu is None else tsmu, load.shape)
+        tssigma = np.broadcast_to(request.tssigma if tssigma is None else tssigma, load.shape)
+        self._request = request
+        self._load = load
+
+        pairs, inverse = np.unique(np.stack([tsmu, tssigma]).astype(float), axis=1, return_inverse=True)
+        inverse = np.ravel(inverse)
+        self._profiles = [(request.timeshifted(mu, sigma), np.flatnonzero(inverse == n))
+                          for n, (mu, sigma) in enumerate(pairs.T)]
+
+        self._numrequests = np.empty(load.shape)
+        for profile, slots in self._profiles:
+            self._numrequests[slots] = profile.bps2rps(load[slots])
+
+    @property
+    def request(self) -> _LiveTV:
+        return self._request
+
+    @property
+    def load(self) -> np.ndarray:
+        return self._load
+
+    @property
+    def slots(self) -> int:
+        return self._load.size
+
+    @property
+    def numrequests(self) -> np.ndarray:
+        """
+        Number of requests of each slot (1/s).
+        """
+        return self._numrequests
+
+    @property
+    def profiles(self) -> List[Tuple[_LiveTV, np.ndarray]]:
+        """
+        List of (request profile, indices of its slots).
+        """
+        return self._profiles
+
+    def batch(self, system: System, replication: np.ndarray, storage1ec: np.ndarray, nummodulesec: np.ndarray,
+              numecpop: np.ndarray, nummodulesmc: np.ndarray,
+              nummc: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluates arrays of system configurations over all slots, one System.curve() per request profile.
+        :param system: system of the caches and PoPs, its configuration is left untouched
+        :param replication: see System.batch()
+        :param storage1ec: ratio of the dedicated storage on the edge caches
+        :param nummodulesec: number of memory modules in an edge cache
+        :param numecpop: number of edge caches in a PoP
+        :param nummodulesmc: number of memory modules in a master cache
+        :param nummc: number of master caches
+        :return: tuple of (rps2, util_ec, chr_ec, util_mc, chr_mc, origin egress (bps)) arrays of the configurations
+                 with an extra last axis of the slots, rps2 is the ingress of one PoP (1/s)
+        """
+        configuration = [replication, storage1ec, nummodulesec, numecpop, nummodulesmc, nummc]
+        shape = np.broadcast(*configuration).shape + (self.slots,)
+        results = tuple(np.empty(shape) for _ in range(6))
+        for profile, slots in self._profiles:
+            for result, values in zip(results, system.curve(self._numrequests[slots], profile, *configuration)):
+                result[..., slots] = values
+        return results
+
+
+class DiurnalMonteCarlo(MonteCarlo):
+    def __init__(self, diurnal: Diurnal, numpops: int):
+        """
+        Random sampling of the CDN design space against a load curve instead of a single peak: the utilizations of a
+        design are the highest ones of the day (so a valid design is valid in every slot), the CHRs are averaged
+        over the requests of the day reaching their tier.
+        :param diurnal: load curve
+        :param numpops: number of PoPs
+        """
+        assert np.max(diurnal.load) > 0, "load curve without load"
+        super().__init__(diurnal.request, numpops, np.max(diurnal.load))
+        self._diurnal = diurnal
+
+    def bounds(self, replication: np.ndarray, storage1ec: np.ndarray, nummodulesec: np.ndarray, numecpop: np.ndarray,
+               nummodulesmc: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same as MonteCarlo.bounds(), but the slots may have other profiles, only the cost is known.
+        """
+        _, _, cost = super().bounds(replication, storage1ec, nummodulesec, numecpop, nummodulesmc)
+        return np.zeros(cost.shape), np.zeros(cost.shape), cost
+
+    @staticmethod
+    def _average(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Average of the CHRs of the slots (last axis) by the requests reaching the tier, a slot without any has no CHR
+        (NaN) and no weight. NaN if no slot has requests.
+        """
+        weights = np.where(np.isnan(values), 0, weights)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sum(np.where(weights > 0, values, 0) * weights, axis=-1) / np.sum(weights, axis=-1)
+
+    def evaluate(self, replication: np.ndarray, storage1ec: np.ndarray, nummodulesec: np.ndarray,
+                 numecpop: np.ndarray, nummodulesmc: np.ndarray) -> Dict[str, np.ndarray]:
+        nummc = self.nummc(nummodulesmc)
+        rps2, util_ec, chr_ec, util_mc, chr_mc, _ = self._diurnal.batch(self._system, replication, storage1ec,
+                                                                        nummodulesec, numecpop, nummodulesmc, nummc)
+
+        # the edge caches serve the requests of the clients, the master caches the ingress of all PoPs
+        chr_ec = self._average(chr_ec, np.broadcast_to(self._diurnal.numrequests, chr_ec.shape))
+        chr_mc = self._average(chr_mc, rps2 * self._numpops)
+        rps = np.full(np.shape(chr_ec), np.nan)
+        return self._columns(replication, storage1ec, nummodulesec, numecpop, nummodulesmc, nummc, rps,
+                             np.max(util_ec, axis=-1), chr_ec, rps, np.max(util_mc, axis=-1), chr_mc,
+                             self._system.batchcost(nummodulesec, numecpop, nummodulesmc, nummc))
@@ -0,0 +1,291 @@
+import copy
+import numpy as np
+from cdn import Request
+from cdn.memo import Memo
+from typing import List, Optional, Tuple
+
+
+class Factorized(Request):
+    def __init__(self, pmf1: np.ndarray, pmf2: np.ndarray, pmf3: np.ndarray, sizes: np.ndarray,
+                 memo: Optional[Memo] = None):
+        """
+        Profile of a separable product distribution, content (i, j, k) is requested with the probability
+        pmf1[i] * pmf2[j] * pmf3[k] and has the size sizes[k]. The product is never materialized: a prefix of the
+        descending probability order is the set of contents above a probability threshold, its volume and probability
+        is counted over the sorted factors. Memory grows with the sum of the dimensions, not with their product.
+        :param pmf1: probabilities of the first dimension (e.g. channels)
+        :param pmf2: probabilities of the second dimension (e.g. fragments)
+        :param pmf3: probabilities of the third dimension (e.g. profiles)
+        :param sizes: size of the contents along the third dimension (Byte)
+        :param memo: memo of the miss streams shared by the tails, it keeps the bisections of sweep() across calls
+        """
+        super().__init__()
+        assert pmf3.shape == sizes.shape, f"Shape mismatch: {pmf3.shape}, {sizes.shape}"
+        assert np.sum(sizes) > 0, f"Wrong size sum: {np.sum(sizes)}"
+
+        # the shorter one of the first two dimensions is iterated, the longer one is searched
+        if pmf1.size > pmf2.size:
+            pmf1, pmf2 = pmf2, pmf1
+        self._outer = np.outer(pmf1 / np.sum(pmf1), pmf3 / np.sum(pmf3))
+        self._sizes = np.asarray(sizes, dtype=float)
+        self._inner = np.sort(pmf2 / np.sum(pmf2))
+        self._innermass = np.concatenate([[0], np.cumsum(self._inner[::-1])])
+        self._grids = {}
+
+        # the profile holds the contents below the (exclusive) threshold _top, the volume, probability and byte mass
+        # and the number of the contents above it are kept in the _v0, _p0, _b0 and _n0, like in the views of Request
+        self._top = np.inf
+        self._n0 = 0
+        self._nend, self._vend, self._pend, self._bend = self._state(0)
+        self._norm = self._pend
+        self._memo = memo if memo is not None else Memo()
+
+    @property
+    def memo(self) -> Memo:
+        return self._memo
+
+    def _indices(self, threshold: np.ndarray) -> np.ndarray:
+        """
+        Returns the first index into the sorted inner factor of each outer cell, from which the contents have a
+        probability of at least threshold.
+        :param threshold: array of thresholds
+        :return: array of the shape of threshold + the outer shape
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            limit = threshold[..., np.newaxis, np.newaxis] / self._outer
+        limit[np.isnan(limit)] = 0  # 0 / 0: a zero threshold takes the zero probabilities too
+        return np.searchsorted(self._inner, limit)
+
+    def _state(self, threshold) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the number, volume, probability and byte mass of the contents with a probability of at least threshold.
+        :param threshold: scalar or array of thresholds, searched all at once
+        :return: tuple of scalars or arrays of the shape of threshold
+        """
+        threshold = np.asarray(threshold, dtype=float)
+        flat = threshold.ravel()
+        results = (np.zeros(flat.size, dtype=int),) + tuple(np.zeros(flat.size) for _ in range(3))
+
+        # the thresholds are searched in chunks of about 4M limits
+        step = max(1, (1 << 22) // self._outer.size)
+        for start in range(0, flat.size, step):
+            chunk = slice(start, start + step)
+            counts = self._inner.size - self._indices(flat[chunk])
+            masses = self._outer * self._innermass[counts]
+            for values, result in zip(results, (counts.sum(axis=(1, 2)), counts.sum(axis=1) @ self._sizes,
+                                                masses.sum(axis=(1, 2)), masses.sum(axis=1) @ self._sizes)):
+                values[chunk] = result
+        return tuple(values.reshape(threshold.shape)[()] for values in results)
+
+    def _grid(self) -> Tuple[np.ndarray, np.ndarray, Tuple[np.ndarray, ...]]:
+        """
+        Returns the thresholds of the grid, which split the contents into intervals of about the same number (by the
+        quantiles of an evenly strided sample of the contents), their indices (see _indices()) and their states. It is
+        built by the first search and shared with the tails, its indices take at most 64 MB.
+        """
+        if 'grid' not in self._grids:
+            cells, size = self._outer.size, self._inner.size
+            intervals = int(np.clip(self._nend // 64, 1, min(4096, (1 << 24) // cells)))
+            sample = np.unique(np.linspace(0, cells * size - 1, min(cells * size, intervals * 16)).astype(np.int64))
+            products = np.sort(self._outer.ravel()[sample // size] * self._inner[sample % size])
+            quantiles = products[np.linspace(0, products.size - 1, intervals + 1).astype(int)[1:-1]]
+            thresholds = np.unique(np.concatenate([[0], quantiles, [np.inf]]))
+            step = max(1, (1 << 22) // cells)
+            indices = np.concatenate([self._indices(thresholds[start:start + step]).reshape(-1, cells).astype(np.int32)
+                                      for start in range(0, thresholds.size, step)])
+            self._grids['grid'] = thresholds, indices, self._state(thresholds)
+        return self._grids['grid']
+
+    def _bisect(self, volume: np.ndarray, head: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, Tuple[np.ndarray, ...],
+                                                                                 np.ndarray]:
+        """
+        Searches the probability thresholds (of all volumes at once), which contents have a volume the nearest to
+        volume (the smaller one on a tie, at least one content), like Request._index(). A volume falls into an
+        interval of the grid (see _grid()), only the contents of the interval are listed and sorted. The contents of
+        the same probability are a group, which is cut at the nearest content as well: its contents are taken evenly
+        (they are in any order in a materialized profile), so a group of one content size is cut like there.
+        :param volume: array of volumes measured from the heads (Byte)
+        :param head: tuple of the arrays of the number, volume, probability and byte mass of the contents before them
+        :return: tuple of (thresholds, tuple of the arrays of the state of the thresholds, probabilities of the groups
+                 at the cuts), the threshold of a cut group is the one above it, its state holds the part before the cut
+        """
+        thresholds, indices, states = self._grid()
+        target = head[1] + np.maximum(volume, np.finfo(float).tiny)
+        inside = np.flatnonzero(target <= self._vend)
+        state = [np.full(target.shape, value, dtype=dtype) for value, dtype in zip(
+            (self._nend, self._vend, self._pend, self._bend), (int, float, float, float))]
+        threshold, level = np.zeros(target.shape), np.zeros(target.shape)
+        if inside.size == 0:
+            return threshold, tuple(state), level
+
+        # the interval of each target (the volumes of the thresholds decrease), the last one first, so the volumes of
+        # the contents listed below grow throughout
+        interval = thresholds.size - 1 - np.searchsorted(states[1][::-1], target[inside])
+        intervals = np.unique(interval)[::-1]
+        first, stop = indices[intervals], indices[intervals + 1]
+        lengths = (stop - first).ravel()
+        cell = np.repeat(np.tile(np.arange(self._outer.size), intervals.size), lengths)
+        owner = np.repeat(np.arange(intervals.size), np.sum(stop - first, axis=1))
+        offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        probability = self._outer.ravel()[cell] * self._inner[np.repeat(first.ravel(), lengths) + offset]
+        order = np.lexsort((-probability, owner))
+        probability, owner = probability[order], owner[order]
+        size = self._sizes[cell[order] % self._sizes.size]
+
+        # the groups of the same probability and their state after them, counted from the threshold after the interval
+        starts = np.flatnonzero(np.concatenate([[True], (np.diff(probability) != 0) | (np.diff(owner) != 0)]))
+        group = [np.diff(np.append(starts, probability.size))] + [np.add.reduceat(values, starts) for values in
+                                                                  (size, probability, probability * size)]
+        groupowner = owner[starts]
+        beginning = np.searchsorted(groupowner, np.arange(intervals.size))
+        after = []
+        for values, base in zip(group, states):
+            sums = np.cumsum(values)
+            offsets = np.concatenate([[0], sums])[beginning]
+            after.append(sums - offsets[groupowner] + base[intervals + 1][groupowner])
+
+        # the group of each target and the nearest content in it, at least one content after the head
+        g = np.searchsorted(after[1], target[inside])
+        count, volumes = group[0][g], group[1][g]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            taken = np.ceil(count * (target[inside] - after[1][g] + volumes) / volumes - 0.5)
+        taken = np.maximum(np.nan_to_num(taken), head[0][inside] + 1 - (after[0][g] - count))
+        taken = np.clip(taken, 0, count).astype(int)
+        for values, sums, sizes in zip(state, after, group):
+            values[inside] = sums[g] - sizes[g] + (taken if values.dtype == int else taken / count * sizes[g])
+        # a cut after the last content is the end itself, not its rounded sums, so the tail is empty like in Request
+        end = inside[state[0][inside] == self._nend]
+        for values, value in zip(state, (self._nend, self._vend, self._pend, self._bend)):
+            values[end] = value
+        level[inside] = probability[starts[g]]
+        threshold[inside] = np.where(taken < count, np.nextafter(level[inside], np.inf), level[inside])
+        return threshold, tuple(state), level
+
+    def _locate(self, volume: float) -> Tuple[float, Tuple[int, float, float, float], float]:
+        """
+        Same as _bisect() of a single volume in this profile.
+        :param volume: measured from the first content of the profile (Byte)
+        :return: tuple of (threshold, state of the threshold, probability of the group at the cut)
+        """
+        threshold, state, level = self._bisect(np.array([volume], dtype=float),
+                                               tuple(np.array([value]) for value in (self._n0, self._v0, self._p0,
+                                                                                     self._b0)))
+        return threshold[0], tuple(values[0] for values in state), level[0]
+
+    def _tail(self, threshold: float, state: Tuple[int, float, float, float]):
+        """
+        Returns the contents below threshold as a profile, without copying the factors.
+        """
+        tail = copy.copy(self)
+        tail._top = threshold
+        tail._n0, tail._v0, tail._p0, tail._b0 = state
+        tail._norm = self._pend - tail._p0
+        return tail
+
+    def pmf(self, volume) -> float:
+        _, _, level = self._locate(volume)
+        return level / self._norm
+
+    def cdf(self, volume) -> float:
+        if self.numcontents == 0 or self._norm <= 0:
+            return 1
+        _, state, _ = self._locate(volume)
+        return (state[2] - self._p0) / self._norm
+
+    def miss(self, volume: float):
+        return self._tail(*self._locate(volume)[:2]) if self.numcontents else self
+
+    def split(self, volume: float) -> Tuple[float, Request, float]:
+        miss = self.miss(volume)
+
+        # the miss stream starts at the located volume, so it holds the hit probability mass too
+        ratio = (miss._p0 - self._p0) / self._norm if self.numcontents and self._norm > 0 else 1
+        return ratio, miss, miss.meanrequestsize
+
+    def sweep(self, volumes, start=0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same as Request.sweep(), but the miss streams are described by the volume before them (0: this profile). The
+        distinct (volume, start) pairs, which are not in the memo, are bisected all at once (see _splits()).
+        """
+        volumes, start = np.broadcast_arrays(self._memo.quantize(np.asarray(volumes, dtype=float)),
+                                             self._memo.quantize(np.asarray(start, dtype=float)))
+        pairs, inverse = np.unique(np.stack([volumes.ravel(), start.ravel()]), axis=1, return_inverse=True)
+
+        heads, headinverse = np.unique(pairs[1], return_inverse=True)
+        streams, positive = [self] * heads.size, np.flatnonzero(heads > 0)
+        for n, (_, miss, _) in zip(positive, self._splits([self] * positive.size, heads[positive])):
+            streams[n] = miss
+        splits = self._splits([streams[n] for n in np.ravel(headinverse)], pairs[0])
+
+        ratio = np.array([split[0] for split in splits], dtype=float)
+        missstart = np.array([split[1]._v0 - self._v0 for split in splits], dtype=float)
+        meansize = np.array([split[2] for split in splits], dtype=float)
+        inverse = np.ravel(inverse).reshape(volumes.shape)
+        return ratio[inverse], missstart[inverse], meansize[inverse]
+
+    def _splits(self, profiles: List['Factorized'], volumes: np.ndarray) -> List[Tuple[float, Request, float]]:
+        """
+        Same as split() of each profile at its volume, the ones not in the memo are bisected at once and memoized.
+        """
+        splits = [self._memo.get(profile, volume) for profile, volume in zip(profiles, volumes)]
+        missing = [n for n, split in enumerate(splits) if split is None]
+        empty = [n for n in missing if profiles[n].numcontents == 0]
+        for n in empty:
+            splits[n] = (1, profiles[n], profiles[n].meanrequestsize)
+        missing = [n for n in missing if profiles[n].numcontents > 0]
+        if missing:
+            located = [profiles[n] for n in missing]
+            head = tuple(np.array([getattr(profile, name) for profile in located], dtype=float)
+                         for name in ('_n0', '_v0', '_p0', '_b0'))
+            thresholds, states, _ = self._bisect(volumes[missing], head)
+            for k, (n, profile) in enumerate(zip(missing, located)):
+                miss = profile._tail(thresholds[k], (int(states[0][k]),) + tuple(float(values[k])
+                                                                                 for values in states[1:]))
+                ratio = (miss._p0 - profile._p0) / profile._norm if profile._norm > 0 else 1
+                splits[n] = (ratio, miss, miss.meanrequestsize)
+        for n in missing + empty:
+            self._memo.put(profiles[n], volumes[n], splits[n])
+        return splits
+
+    def hashing(self, nodes, replication=1, volume=0, start=0,
+                head: int = 256) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # the single contents are not at hand, the stream is spread evenly
+        return self._evenhashing(nodes, replication, volume, start)
+
+    @property
+    def numcontents(self) -> int:
+        return self._nend - self._n0
+
+    @property
+    def contentbase(self) -> int:
+        return self._vend - self._v0
+
+    @property
+    def meanrequestsize(self):
+        return (self._bend - self._b0) / self._norm if self._norm > 0 else 0
+
+    def plot(self, axs, **kwargs):
+        import matplotlib.pyplot as plt
+
+        if axs is None:
+            fig, axs = plt.subplots(1, 2)
+
+        # sample the profile, it is not materialized
+        volumes = np.geomspace(np.min(self._sizes[self._sizes > 0]), self.contentbase, 200)
+        _, states, levels = self._bisect(volumes, tuple(np.full(volumes.shape, value) for value in (self._n0, self._v0,
+                                                                                           self._p0, self._b0)))
+        volumes = states[1] - self._v0
+
+        axs[0, 0].plot(volumes / 1000 / 1000 / 1000, levels / self._norm, **kwargs)
+        axs[0, 0].set_ylabel("probabbility")
+        axs[0, 0].set_xlabel('volume (GB)')
+        axs[0, 0].loglog()
+        axs[0, 0].title.set_text('pmf')
+
+        axs[0, 1].plot(volumes / 1000 / 1000 / 1000, (states[2] - self._p0) / self._norm, **kwargs)
+        axs[0, 1].set_ylabel("probabbility")
+        axs[0, 1].set_xlabel('volume (GB)')
+        axs[0, 1].title.set_text('cdf')
+
+        if axs is None:
+            plt.show()
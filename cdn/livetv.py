@@ -1,58 +1,76 @@
+import copy
 import numpy as np
-from scipy.stats import zipfian, norm
-import matplotlib.pyplot as plt
 from cdn import Request
+from cdn.factorized import Factorized
+from cdn.memo import Memo
+from cdn.store import Store
+from cdn.zipf import pmf
+from typing import Optional
 
 
-class LiveTV(Request):
-    def __init__(self, channels: int, fragments: int, profiles: np.array, profilesizes: np.ndarray,
+class _LiveTV:
+    def _factors(self, channels: int, fragments: int, profiles: np.array, profilesizes: np.ndarray,
                  s: float, tsmu: float, tssigma: float):
+        """
+        Generates the pmf for all dimensions.
+        """
         self._channels = channels
         self._fragments = fragments
         self._profiles = profiles
         self._profilesizes = profilesizes
         self._s = s
-        self._tsmu = tsmu
-        self._tssigma = tssigma
-
-        # generate pmf for all dimensions
 
         # use zipf distribution for channel popularity
-        self.channelpmf = zipfian.pmf(np.arange(1, channels + 1), s, channels)
+        self.channelpmf = pmf(np.arange(1, channels + 1), s, channels)
         assert np.sum(self.channelpmf).round(3) == 1, f"channel PMF is invalid, {np.sum(self.channelpmf)}"
         assert len(self.channelpmf) == channels, f'channel PMF wrong length: {len(self.channelpmf)}'
 
-        # use normal distribution for fragment popularity (with mean timeshift)
-        self.fragmentpmf = norm.pdf(np.arange(1, fragments + 1), tsmu, tssigma)
-        self.fragmentpmf = self.fragmentpmf / sum(self.fragmentpmf)
-        assert np.sum(self.fragmentpmf).round(3) == 1, f"fragmentpmf PMF is invalid, {np.sum(self.fragmentpmf)}"
-        assert len(self.fragmentpmf) == fragments, f'fragmentpmf PMF wrong length: {len(self.fragmentpmf)}'
+        self._timeshift(tsmu, tssigma)
 
         # use linear for profiles
         self.profilempf = profiles / np.sum(profiles)
         assert np.sum(self.profilempf).round(3) == 1, f"profilempf PMF is invalid, {np.sum(self.profilempf)}"
         assert len(self.profilempf) == len(profiles), f'profilempf PMF wrong length: {len(self.profilempf)}'
 
-        # create pmf matrix
-        pmf = np.prod((self.channelpmf.reshape((len(self.channelpmf), 1, 1)),
-                       self.fragmentpmf.reshape((1, len(self.fragmentpmf), 1)),
-                       self.profilempf.reshape((1, 1, len(self.profilempf)))))
-        assert np.sum(pmf).round(3) == 1, f"final PMF is invalid, {np.sum(pmf)}"
-        assert pmf.shape == (
-            len(self.channelpmf), len(self.fragmentpmf), len(self.profilempf)), f"Wrong shape: {pmf.shape}"
-        for ch, fr, p in zip(np.random.randint(len(self.channelpmf), size=100),
-                             np.random.randint(len(self.fragmentpmf), size=100),
-                             np.random.randint(len(self.profilempf), size=100)):
-            assert pmf[ch, fr, p] == self.channelpmf[ch] * self.fragmentpmf[fr] * self.profilempf[p]
-
-        # create size matrix
-        size = np.prod((np.ones((len(self.channelpmf), 1, 1)),
-                        np.ones((1, len(self.fragmentpmf), 1)),
-                        profilesizes.reshape((1, 1, len(profilesizes)))))
+    def _timeshift(self, tsmu: float, tssigma: float):
+        """
+        Generates the pmf of the fragments, the only factor depending on the timeshift.
+        """
+        self._tsmu = tsmu
+        self._tssigma = tssigma
 
-        super().__init__(size=size.flatten(), probability=pmf.flatten())
+        # use normal distribution for fragment popularity (with mean timeshift), the density up to its constant
+        self.fragmentpmf = np.exp(-((np.arange(1, self._fragments + 1) - tsmu) / tssigma) ** 2 / 2)
+        self.fragmentpmf = self.fragmentpmf / sum(self.fragmentpmf)
+        assert np.sum(self.fragmentpmf).round(3) == 1, f"fragmentpmf PMF is invalid, {np.sum(self.fragmentpmf)}"
+        assert len(self.fragmentpmf) == self._fragments, f'fragmentpmf PMF wrong length: {len(self.fragmentpmf)}'
+
+    @property
+    def tsmu(self) -> float:
+        return self._tsmu
+
+    @property
+    def tssigma(self) -> float:
+        return self._tssigma
+
+    def timeshifted(self, tsmu: float, tssigma: float):
+        """
+        Returns the profile of another timeshift distribution: the channel and profile factors are reused, only the
+        fragment factor is recomputed (and the profile of the factors built, see _build()).
+        :param tsmu: timeshift mean (fragment)
+        :param tssigma: timeshift stddev (fragment)
+        :return: profile of the same class
+        """
+        if (tsmu, tssigma) == (self._tsmu, self._tssigma):
+            return self
+        profile = copy.copy(self)
+        profile._timeshift(tsmu, tssigma)
+        profile._build()
+        return profile
 
     def plot(self, axs=None, **kwargs):
+        import matplotlib.pyplot as plt
+
         if axs is None:
             fig, axs = plt.subplots(3, 2)
 
@@ -80,6 +98,8 @@ class LiveTV(Request):
             plt.show()
 
     def save(self, filename: str, axs=None, **kwargs):
+        import matplotlib.pyplot as plt
+
         if axs is None:
             fig, axs = plt.subplots(3, 2)
 
@@ -96,3 +116,72 @@ class LiveTV(Request):
                f"Profiles: {self._profilesizes / fragmentlen * 8 / 1000 / 1000} Mbps\n"
 
 #               f"Profiles: {[x for x in self._profiles]}\n"s
+
+
+class LiveTV(_LiveTV, Request):
+    def __init__(self, channels: int, fragments: int, profiles: np.array, profilesizes: np.ndarray,
+                 s: float, tsmu: float, tssigma: float, store: Optional[Store] = None, compact: bool = False):
+        """
+        Request profile of the channel x fragment x profile tensor.
+        :param store: the profile is memory mapped from the store if it is there, otherwise it is built and stored
+        :param compact: float32 arrays and the sizes as profile indices, see Request
+        """
+        self._factors(channels, fragments, profiles, profilesizes, s, tsmu, tssigma)
+        self._store = store
+        self._compactarrays = compact
+        self._build()
+
+    def _build(self):
+        """
+        Sorts the channel x fragment x profile tensor of the factors into the arrays of the profile.
+        """
+        store, compact, profilesizes = self._store, self._compactarrays, self._profilesizes
+        if store is not None:
+            key = Store.key(self.__class__.__name__, self._channels, self._fragments, self._profiles, profilesizes,
+                            self._s, self._tsmu, self._tssigma, compact)
+            Request.__init__(self)
+            if store.load(key, self):
+                return
+
+        # create pmf matrix
+        dtype = np.float32 if compact else float
+        channelpmf, fragmentpmf, profilempf = [factor.astype(dtype) for factor in
+                                               [self.channelpmf, self.fragmentpmf, self.profilempf]]
+        pmf = channelpmf.reshape((len(channelpmf), 1, 1)) * \
+              fragmentpmf.reshape((1, len(fragmentpmf), 1)) * \
+              profilempf.reshape((1, 1, len(profilempf)))
+        assert np.sum(pmf).round(3) == 1, f"final PMF is invalid, {np.sum(pmf)}"
+        assert pmf.shape == (
+            len(self.channelpmf), len(self.fragmentpmf), len(self.profilempf)), f"Wrong shape: {pmf.shape}"
+        for ch, fr, p in zip(np.random.randint(len(self.channelpmf), size=100),
+                             np.random.randint(len(self.fragmentpmf), size=100),
+                             np.random.randint(len(self.profilempf), size=100)):
+            assert pmf[ch, fr, p] == channelpmf[ch] * fragmentpmf[fr] * profilempf[p]
+
+        # create size matrix, of the profile indices if compact
+        if compact:
+            size = np.arange(len(profilesizes), dtype=np.min_scalar_type(len(profilesizes)))
+            size = np.broadcast_to(size.reshape((1, 1, len(profilesizes))), pmf.shape)
+            Request.__init__(self, size.flatten(), pmf.ravel(), compact, np.asarray(profilesizes))
+        else:
+            size = np.broadcast_to(profilesizes.reshape((1, 1, len(profilesizes))), pmf.shape)
+            Request.__init__(self, size=size.flatten(), probability=pmf.flatten())
+        if store is not None:
+            store.save(key, self)
+
+
+class FactorizedLiveTV(_LiveTV, Factorized):
+    def __init__(self, channels: int, fragments: int, profiles: np.array, profilesizes: np.ndarray,
+                 s: float, tsmu: float, tssigma: float, memo: Optional[Memo] = None):
+        """
+        Same as LiveTV, but the channel x fragment x profile tensor is not materialized, see Factorized.
+        """
+        self._factors(channels, fragments, profiles, profilesizes, s, tsmu, tssigma)
+        self._memo = memo if memo is not None else Memo()
+        self._build()
+
+    def _build(self):
+        """
+        Sorts the factors, see Factorized, the timeshifted profiles share the memo.
+        """
+        Factorized.__init__(self, self.channelpmf, self.fragmentpmf, self.profilempf, self._profilesizes, self._memo)
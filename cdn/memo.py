@@ -0,0 +1,101 @@
+import sys
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class Memo:
+    def __init__(self, budget: int = 64 * 1000 * 1000, quantum: Optional[float] = None):
+        """
+        Least recently used cache of the miss streams: the cdf value, the miss stream profile and its mean request size
+        of a profile at a cache volume, see Request.split(). The miss streams are kept alive by the memo, so chained
+        lookups on them hit as well. The factorized profiles look their miss streams up in it, also on the batch path
+        (see Factorized.sweep()), and so does PoP.ingress() given one. A plain Request sweeps its tiers with a binary
+        search, which is cheaper than a lookup, so the batch path does not use a memo then.
+        :param budget: memory budget (Byte), the least recently used entries are evicted above it
+        :param quantum: the volumes are rounded down to a multiple of quantum (Byte), None for the exact volumes
+        """
+        assert budget > 0, f"non positive budget: {budget}"
+        assert quantum is None or quantum > 0, f"non positive quantum: {quantum}"
+        self._budget = budget
+        self._quantum = quantum
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._nbytes = 0
+
+    @staticmethod
+    def _sizeof(profile, miss) -> int:
+        """
+        Estimates the memory of an entry, the arrays shared with profile are not counted (views are).
+        """
+        shared = {id(value) for value in vars(profile).values()}
+        return sys.getsizeof(vars(miss)) + sum(sys.getsizeof(value) for value in vars(miss).values()
+                                               if id(value) not in shared)
+
+    def quantize(self, volume):
+        """
+        Rounds volumes down to a multiple of the quantum, if there is one.
+        :param volume: scalar or array of cache volumes (Byte)
+        :return: scalar or array of the quantized volumes
+        """
+        return np.floor(np.asarray(volume) / self._quantum)[()] * self._quantum if self._quantum is not None else volume
+
+    def get(self, profile, volume: float) -> Optional[Tuple[float, object, float]]:
+        """
+        Returns the entry of profile at volume (see lookup()), None if it is not in the memo.
+        """
+        key = (profile, float(self.quantize(volume)))
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, profile, volume: float, value: Tuple[float, object, float]):
+        """
+        Adds an entry, profile.split() of the quantized volume, and evicts the least recently used ones above the
+        budget.
+        """
+        size = self._sizeof(profile, value[1])
+        self._entries[(profile, float(self.quantize(volume)))] = (value, size)
+        self._nbytes += size
+
+        while self._nbytes > self._budget and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._nbytes -= size
+
+    def lookup(self, profile, volume: float) -> Tuple[float, object, float]:
+        """
+        Returns profile.split(volume), from the memo if possible.
+        :param profile: request profile (keyed by identity)
+        :param volume: cache volume (Byte)
+        :return: tuple of (cdf, miss stream profile, mean request size of the miss stream)
+        """
+        volume = self.quantize(volume)
+        value = self.get(profile, volume)
+        if value is None:
+            value = profile.split(volume)
+            self.put(profile, volume, value)
+        return value
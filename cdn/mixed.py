@@ -0,0 +1,106 @@
+import numpy as np
+from cdn import Request
+from typing import List, Sequence
+
+
+class Mixed(Request):
+    def __init__(self, profiles: Sequence[Request], weights: Sequence[float], compact: bool = False,
+                 chunksize: int = 1 << 20):
+        """
+        Mixed workload of several catalogs served by the same caches, e.g. LiveTV, catch-up and VoD: the contents of
+        the catalogs are distinct, a request goes to a catalog by its weight. The profiles are sorted already, so their
+        arrays are merged chunk by chunk in one pass instead of sorted again: a chunk takes the contents of each
+        profile down to the highest of the smallest probabilities of their next chunksize contents, and the (at most
+        one per profile) sorted runs are merged by a stable sort, which merges the runs in linear time. Only the
+        arrays of the mixed profile are allocated.
+        :param profiles: materialized profiles (Request, LiveTV, views, compact ones, ...), not Factorized nor Sketch
+        :param weights: share of the requests of each profile, for shares of the traffic divide them by the mean
+               request sizes of the profiles
+        :param compact: float32 arrays and the sizes as indices into the distinct sizes of the profiles, see Request
+        :param chunksize: number of contents taken from a profile at once
+        """
+        super().__init__()
+        weights = np.asarray(weights, dtype=float)
+        assert len(profiles) > 0, "no profiles"
+        assert weights.shape == (len(profiles),), f"Shape mismatch: {weights.shape}, {len(profiles)} profiles"
+        assert np.all(weights >= 0) and np.sum(weights) > 0, f"Wrong weights: {weights}"
+        assert chunksize > 0, f"non positive chunksize: {chunksize}"
+        for profile in profiles:
+            assert type(profile).sweep is Request.sweep, f"{type(profile).__name__} profile is not materialized"
+        self._shares = weights / np.sum(weights)
+        self._names = [profile.__class__.__name__ for profile in profiles]
+
+        # the distinct sizes of all profiles, the sizes of each one as indices into them if compact
+        n = sum(profile.numcontents for profile in profiles)
+        if compact:
+            tables = [profile._sizetable if profile._sizetable is not None else
+                      Mixed._distinct(profile._size, chunksize) for profile in profiles]
+            self._sizetable = np.unique(np.concatenate(tables))
+            remap = [np.searchsorted(self._sizetable, table) for table in tables]
+            self._size = np.empty(n, dtype=np.min_scalar_type(max(self._sizetable.size - 1, 0)))
+        else:
+            self._size = np.empty(n, dtype=np.result_type(*[(profile._size if profile._sizetable is None else
+                                                             profile._sizetable).dtype for profile in profiles]))
+        dtype = np.float32 if compact else float
+        self._pmf, self._cdf, self._volume, self._bytes = (np.empty(n, dtype=dtype) for _ in range(4))
+
+        # probability of a content of each profile relative to its (view) probability mass
+        scale = [share / profile._norm if profile._norm > 0 else 0 for share, profile in zip(self._shares, profiles)]
+        cursor, fill, carry = [0] * len(profiles), 0, np.zeros(3)
+        while fill < n:
+            ends = [min(c + chunksize, profile.numcontents) for c, profile in zip(cursor, profiles)]
+            threshold = max(profiles[k]._pmf[ends[k] - 1] * scale[k] for k in range(len(profiles))
+                            if cursor[k] < ends[k])
+
+            pmfs, sizes = [], []
+            for k, profile in enumerate(profiles):
+                window = profile._pmf[cursor[k]:ends[k]] * scale[k]
+                stop = cursor[k] + np.searchsorted(-window, -threshold, side='right')
+                size = profile._size[cursor[k]:stop]
+                if compact:
+                    size = remap[k][size] if profile._sizetable is not None else np.searchsorted(self._sizetable, size)
+                elif profile._sizetable is not None:
+                    size = profile._sizetable[size]
+                pmfs.append(window[:stop - cursor[k]])
+                sizes.append(size)
+                cursor[k] = stop
+            pmf, size = np.concatenate(pmfs), np.concatenate(sizes)
+            order = np.argsort(-pmf, kind='stable')
+            pmf, size = pmf[order], size[order]
+
+            # the cumulative sums are carried over the chunks in float64
+            stop = fill + pmf.size
+            self._pmf[fill:stop], self._size[fill:stop] = pmf, size
+            pmf, size = self._pmf[fill:stop], self._sizetable[size] if compact else size
+            for c, (values, sums) in enumerate(zip([pmf, size, pmf * size], [self._cdf, self._volume, self._bytes])):
+                chunk = np.cumsum(values, dtype=float) + carry[c]
+                sums[fill:stop], carry[c] = chunk, chunk[-1]
+            fill = stop
+
+    @staticmethod
+    def _distinct(size: np.ndarray, chunksize: int) -> np.ndarray:
+        """
+        Distinct values of the sizes, collected chunk by chunk (there are few of them).
+        """
+        distinct = np.array([], dtype=size.dtype)
+        for start in range(0, size.size, chunksize):
+            distinct = np.union1d(distinct, size[start:start + chunksize])
+        return distinct
+
+    @property
+    def shares(self) -> np.ndarray:
+        """
+        Share of the requests of each profile.
+        """
+        return self._shares
+
+    @property
+    def names(self) -> List[str]:
+        """
+        Class names of the profiles.
+        """
+        return self._names
+
+    def describe(self):
+        mix = ", ".join(f"{name} {share * 100:.1f} %" for name, share in zip(self._names, self._shares))
+        return f"{super().describe()}Requests: {mix}\n"
@@ -0,0 +1,236 @@
+import multiprocessing
+import numpy as np
+from cdn import Request, System, DellR750
+from cdn.pareto import Pareto
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# the Monte Carlo model of a worker process, see MonteCarlo.run()
+_montecarlo = None
+
+
+def _init(montecarlo):
+    global _montecarlo
+    _montecarlo = montecarlo
+
+
+def _block(args) -> Dict[str, np.ndarray]:
+    return _montecarlo.block(*args)
+
+
+class MonteCarlo:
+    columns = [('egress_pop_Gbps', float), ('numecpop', int), ('storageec_GB', float), ('storage1ec_GB', float),
+               ('replication', int), ('chr_ec', float), ('util_ec', float), ('ingress_pop_Gbps', float),
+               ('egress_mc_Gbps', float), ('nummc', int), ('storagemc_GB', float), ('chr_mc', float),
+               ('util_mc', float), ('valid', bool), ('cost', float)]
+
+    # bounds of the design space
+    maxreplication = 10
+    maxnumecpop = 40
+
+    def __init__(self, request: Request, numpops: int, peak: float):
+        """
+        Random sampling of the CDN design space.
+        :param request: request profile
+        :param numpops: number of PoPs
+        :param peak: total CDN throughput (bps)
+        """
+        self._request = request
+        self._numpops = numpops
+        self._peak = peak
+        self._numrequests = request.bps2rps(peak)
+        self._ec = DellR750()
+        self._mc = DellR750()
+        self._system = System(numpops, request, self._ec, self._mc)
+
+        # pruning of run(), the largest content of the profiles with single contents (their volume lookups are
+        # rounded to a content, see Request._index()) for the bound of the master caches
+        self._prune = False
+        self._pareto = None
+        self._pruned = 0
+        self._maxsize = float(np.max(request.sizes)) if type(request).sweep is Request.sweep and \
+            request.numcontents else None
+
+    @property
+    def numrequests(self) -> float:
+        return self._numrequests
+
+    @property
+    def pruned(self) -> int:
+        """
+        Number of designs pruned by run() without evaluating them.
+        """
+        return self._pruned
+
+    def block(self, seed: np.random.SeedSequence, num: int) -> Dict[str, np.ndarray]:
+        """
+        Draws and evaluates a block of random designs.
+        :param seed: seed of the block
+        :param num: number of designs
+        :return: dict of result columns
+        """
+        designs = self._draw(seed, num)
+        if self._prune:
+            keep = ~self.prunable(*designs)
+            designs = [values[keep] for values in designs]
+        return self.evaluate(*designs)
+
+    def _draw(self, seed: np.random.SeedSequence, num: int) -> List[np.ndarray]:
+        """
+        Draws a block of random designs, the same ones for the same seed.
+        :return: list of the arrays of replication, storage1ec, nummodulesec, numecpop and nummodulesmc
+        """
+        rng = np.random.default_rng(seed)
+        ec, mc = self._ec, self._mc
+
+        # play with various edge cache number and sizes
+        replication = rng.integers(1, self.maxreplication + 1, num)
+        storage1ec = rng.random(num)  # ratio
+        nummodulesec = rng.integers(ec.minmodules, ec.maxmodules + 1, num)
+        numecpop = rng.integers(1, self.maxnumecpop + 1, num)
+
+        # play with various master cache memory config
+        nummodulesmc = rng.integers(mc.minmodules, mc.maxmodules + 1, num)
+
+        return [replication, storage1ec, nummodulesec, numecpop, nummodulesmc]
+
+    def nummc(self, nummodulesmc: np.ndarray) -> np.ndarray:
+        """
+        Number of master caches, the overall storage is kept at the content base.
+        """
+        return np.ceil(self._request.contentbase / (nummodulesmc * self._mc.modulesize)).astype(int)
+
+    def bounds(self, replication: np.ndarray, storage1ec: np.ndarray, nummodulesec: np.ndarray, numecpop: np.ndarray,
+               nummodulesmc: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Lower bounds of the utilizations and the exact cost of designs, from their configuration alone (see
+        System.batch()): an edge cache serves its share of the egress of the PoP at least, and the master caches the
+        bytes of the contents beyond the storage of all edge caches of a PoP (the bound is 0 for the profiles without
+        single contents).
+        :return: tuple of (util_ec bound, util_mc bound, cost)
+        """
+        ec, mc = self._ec, self._mc
+        nummc = self.nummc(nummodulesmc)
+        rps = np.trunc(self._numrequests / self._numpops)
+        util_ec = self._request.rps2bps(rps / numecpop) / ec.capacity
+        util_mc = np.zeros(np.shape(util_ec))
+        if self._maxsize is not None:
+            # the edge caches of a PoP hit the contents up to their storage and two contents more (their volume lookups
+            # are rounded), the request numbers are truncated twice
+            ratio, _, meansize = self._request.sweep(numecpop * nummodulesec * ec.modulesize + 3 * self._maxsize)
+            bytes_ = np.maximum(rps * (1 - ratio) * meansize - 2 * self._maxsize, 0)
+            util_mc = bytes_ * self._numpops / nummc * 8 / mc.capacity * (1 - 1e-9)
+        return util_ec, util_mc, self._system.batchcost(nummodulesec, numecpop, nummodulesmc, nummc)
+
+    def prunable(self, replication: np.ndarray, storage1ec: np.ndarray, nummodulesec: np.ndarray,
+                 numecpop: np.ndarray, nummodulesmc: np.ndarray) -> np.ndarray:
+        """
+        Returns which designs are invalid by their bounds, or dominated by the Pareto frontier of run() even with the
+        bounds as their results (the CHRs are bounded by 100 %).
+        :return: boolean array
+        """
+        util_ec, util_mc, cost = self.bounds(replication, storage1ec, nummodulesec, numecpop, nummodulesmc)
+        prunable = (util_ec > 1) | (util_mc > 1)
+        if self._pareto is not None:
+            prunable |= self._dominated(self._pareto, util_ec, util_mc, cost)
+        return prunable
+
+    @staticmethod
+    def _dominated(pareto: Pareto, util_ec: np.ndarray, util_mc: np.ndarray, cost: np.ndarray) -> np.ndarray:
+        """
+        Returns which designs are dominated by pareto with their bounds as their results.
+        """
+        bounds = {'cost': cost, 'util_ec': np.round(util_ec * 100, 2), 'util_mc': np.round(util_mc * 100, 2),
+                  'chr_ec': np.full(cost.shape, 100.), 'chr_mc': np.full(cost.shape, 100.)}
+        return pareto.dominated(**{name: bounds[name] for name in pareto.objectives})
+
+    def _undominated(self, seed: np.random.SeedSequence, num: int, pareto: Pareto,
+                     block: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Drops the designs of a block evaluated by a worker, which are dominated by pareto, like prunable() does in this
+        process: the designs are drawn again from their seed, the ones of the block are the valid ones by their bounds.
+        """
+        util_ec, util_mc, cost = self.bounds(*self._draw(seed, num))
+        evaluated = ~((util_ec > 1) | (util_mc > 1))
+        keep = ~self._dominated(pareto, util_ec[evaluated], util_mc[evaluated], cost[evaluated])
+        return {name: values[keep] for name, values in block.items()}
+
+    def evaluate(self, replication: np.ndarray, storage1ec: np.ndarray, nummodulesec: np.ndarray,
+                 numecpop: np.ndarray, nummodulesmc: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Evaluates designs, the arrays are of the same length.
+        :param replication:
+        :param storage1ec: ratio of the dedicated storage on the edge caches
+        :param nummodulesec: number of memory modules in an edge cache
+        :param numecpop: number of edge caches in a PoP
+        :param nummodulesmc: number of memory modules in a master cache
+        :return: dict of result columns
+        """
+        nummc = self.nummc(nummodulesmc)
+
+        # determine origin load
+        return self._columns(replication, storage1ec, nummodulesec, numecpop, nummodulesmc, nummc,
+                             *self._system.batch(self._numrequests, self._request, replication, storage1ec,
+                                                 nummodulesec, numecpop, nummodulesmc, nummc))
+
+    def _columns(self, replication, storage1ec, nummodulesec, numecpop, nummodulesmc, nummc, rps2, util_ec, chr_ec,
+                 rps3, util_mc, chr_mc, cost) -> Dict[str, np.ndarray]:
+        """
+        Returns the result columns of designs out of the results of System.batch().
+        """
+        ec, mc = self._ec, self._mc
+
+        # the master caches serve the ingress of all PoPs
+        egress_mc = util_mc * mc.capacity
+        return {'egress_pop_Gbps': np.full(np.size(cost), np.round(self._peak / self._numpops / 1000 / 1000 / 1000)),
+                'numecpop': numecpop,
+                'storageec_GB': nummodulesec * ec.modulesize / 1000 / 1000 / 1000,
+                'storage1ec_GB': np.round(np.trunc(storage1ec * nummodulesec * ec.modulesize) / 1000 / 1000 / 1000),
+                'replication': replication,
+                'chr_ec': np.round(chr_ec * 100, 2),
+                'util_ec': np.round(util_ec * 100, 2),
+                'ingress_pop_Gbps': np.round(egress_mc * nummc / self._numpops / 1000 / 1000 / 1000, 2),
+                'egress_mc_Gbps': np.round(egress_mc / 1000 / 1000 / 1000, 2),
+                'nummc': nummc,
+                'storagemc_GB': nummodulesmc * mc.modulesize / 1000 / 1000 / 1000,
+                'chr_mc': np.round(chr_mc * 100, 2),
+                'util_mc': np.round(util_mc * 100, 2),
+                'valid': (util_ec <= 1) & (util_mc <= 1),
+                'cost': cost}
+
+    def run(self, iterations: int, seed: Optional[int] = None, workers: int = 1, blocksize: int = 10000,
+            prune: bool = False, pareto: Optional[Pareto] = None, start: int = 0) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Evaluates random designs block by block. Each block has its own random generator spawned from seed, so the
+        results of a seed do not depend on the number of workers.
+        :param iterations: number of designs
+        :param seed: None for a random run
+        :param workers: number of worker processes, 1 runs in this process
+        :param blocksize: number of designs in a block
+        :param prune: skip the designs, which are invalid by their bounds or dominated by the frontier of pareto (see
+               prunable()), they are drawn but neither evaluated nor returned, see pruned
+        :param pareto: frontier of the results so far, kept up to date by the caller, so a resumed run prunes the
+               same designs. The workers prune by the bounds only, the designs of their blocks dominated by the
+               frontier are dropped here (they are evaluated, but the results are the ones of a single process).
+        :param start: number of blocks to skip, the ones done before a checkpoint (see Checkpoint)
+        :return: iterator of the result columns of the blocks, in order
+        """
+        assert workers > 0, f"non positive number of workers: {workers}"
+        sizes = [min(blocksize, iterations - done) for done in range(0, iterations, blocksize)]
+        blocks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))[start:]
+        sizes = sizes[start:]
+        self._prune, self._pareto = prune, pareto if workers == 1 else None
+
+        try:
+            if workers == 1:
+                for size, block in zip(sizes, (self.block(*block) for block in blocks)):
+                    self._pruned += size - len(block['cost'])
+                    yield block
+            else:
+                with multiprocessing.Pool(workers, initializer=_init, initargs=(self,)) as pool:
+                    for (seed, size), block in zip(blocks, pool.imap(_block, blocks)):
+                        if prune and pareto is not None:
+                            block = self._undominated(seed, size, pareto, block)
+                        self._pruned += size - len(block['cost'])
+                        yield block
+        finally:
+            self._prune, self._pareto = False, None
@@ -0,0 +1,196 @@
+import numpy as np
+from cdn import Request
+from cdn.montecarlo import MonteCarlo
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class Optimizer(MonteCarlo):
+    strategies = ['grid', 'descent', 'surrogate']
+
+    def __init__(self, request: Request, numpops: int, peak: float, steps: int = 11):
+        """
+        Guided search of the CDN design space for the cheapest valid design (utilizations at most 1). The space is
+        the same as the one of MonteCarlo, the dedicated storage ratio is discretized. The cost of a design is known
+        without evaluating it, only the validity needs the request profile.
+        :param request: request profile
+        :param numpops: number of PoPs
+        :param peak: total CDN throughput (bps)
+        :param steps: number of the dedicated storage ratios between 0 and 1
+        """
+        super().__init__(request, numpops, peak)
+        assert steps > 1, f"Wrong number of steps: {steps}"
+        ec, mc = self._ec, self._mc
+
+        # axes of the grid: replication, storage1ec, nummodulesec, numecpop, nummodulesmc
+        self._axes = (np.arange(1, self.maxreplication + 1), np.linspace(0, 1, steps),
+                      np.arange(ec.minmodules, ec.maxmodules + 1), np.arange(1, self.maxnumecpop + 1),
+                      np.arange(mc.minmodules, mc.maxmodules + 1))
+        self._shape = tuple(axis.size for axis in self._axes)
+
+        # cost of the whole grid
+        replication, storage1ec, nummodulesec, numecpop, nummodulesmc = np.meshgrid(*self._axes, indexing='ij',
+                                                                                    sparse=True)
+        self._cost = np.broadcast_to(self._system.batchcost(nummodulesec, numecpop, nummodulesmc,
+                                                            self.nummc(nummodulesmc)).astype(float), self._shape)
+        self._evaluations = 0
+
+    @property
+    def evaluations(self) -> int:
+        return self._evaluations
+
+    def _evaluate(self, idx: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+        """
+        Evaluates designs of the grid.
+        :param idx: flat indices of the designs
+        :return: tuple of (dict of result columns, util_ec, util_mc)
+        """
+        self._evaluations += idx.size
+        params = [axis[i] for axis, i in zip(self._axes, np.unravel_index(idx, self._shape))]
+        params.append(self.nummc(params[-1]))
+        results = self._system.batch(self._numrequests, self._request, *params)
+
+        # the unrounded utilizations, the result columns are in percent
+        return self._columns(*params, *results), results[1], results[4]
+
+    def grid(self, iterations: int, batchsize: int = 100) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Enumerates the grid in the order of the cost, batch by batch, the first valid design is the cheapest one.
+        The edge caches of a PoP carry at least the load of a single one evenly, the designs with less edge caches
+        are skipped. More edge caches, more modules in them or less replication never increase the master cache
+        load, so a design with an overloaded master cache prunes the cheaper ones along these axes.
+        :param iterations: maximum number of evaluations
+        :param batchsize: number of designs evaluated at once
+        :return: iterator of the result columns of the batches
+        """
+        # load of the edge caches in a single one (it is not imbalanced)
+        storage1ec, nummodulesec = np.meshgrid(self._axes[1], self._axes[2], indexing='ij')
+        load = self._system.edgeload(self._numrequests, self._request, storage1ec, nummodulesec)
+
+        # the smallest number of edge caches (index) not known to be invalid for each other coordinate
+        shape = self._shape[:3] + self._shape[4:]
+        edge = np.maximum(np.ceil(load * (1 - 1e-12)).astype(int) - 1, 0)
+        numecpop = np.broadcast_to(edge[np.newaxis, :, :, np.newaxis], shape).copy()
+        cost = np.moveaxis(self._cost, 3, -1)
+
+        done = 0
+        while done < iterations:
+            pending = numecpop < self._shape[3]
+            if not np.any(pending):
+                return
+            candidates = np.take_along_axis(cost, np.minimum(numecpop, self._shape[3] - 1)[..., np.newaxis],
+                                            axis=-1)[..., 0]
+            candidates = np.where(pending, candidates, np.inf).ravel()
+            num = min(batchsize, np.count_nonzero(pending), iterations - done)
+            other = np.argpartition(candidates, num - 1)[:num]
+
+            coords = np.unravel_index(other, shape)
+            idx = np.ravel_multi_index(coords[:3] + (numecpop[coords],) + coords[3:], self._shape)
+            block, util_ec, util_mc = self._evaluate(idx)
+            done += num
+            yield block
+
+            if np.any(block['valid']):
+                return
+
+            # less modules or more replication overload the master caches too
+            master = np.zeros(shape, dtype=int)
+            master[coords] = np.where(util_mc > 1, numecpop[coords] + 1, 0)
+            master = np.maximum.accumulate(master, axis=0)
+            master = np.flip(np.maximum.accumulate(np.flip(master, axis=2), axis=2), axis=2)
+            numecpop[coords] += 1
+            numecpop = np.maximum(numecpop, master)
+
+    def descent(self, iterations: int, seed: Optional[int] = None,
+                restarts: int = 5) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Coordinate descent from random designs: all values of one coordinate are evaluated at once, the best one is
+        kept, until a full round does not change the design. Invalid designs are ranked by their highest utilization.
+        :param iterations: maximum number of evaluations
+        :param seed: None for a random run
+        :param restarts: number of random starting designs
+        :return: iterator of the result columns of the evaluated designs
+        """
+        rng = np.random.default_rng(seed)
+        known = {}  # flat index: (cost or inf if invalid, highest utilization)
+
+        done = 0
+        for _ in range(restarts):
+            design, changed = [rng.integers(size) for size in self._shape], True
+            while changed:
+                changed = False
+                for axis, size in enumerate(self._shape):
+                    designs = [np.full(size, value) for value in design]
+                    designs[axis] = np.arange(size)
+                    idx = np.ravel_multi_index(designs, self._shape)
+
+                    new = np.array([i for i in idx if i not in known], dtype=int)[:max(iterations - done, 0)]
+                    if new.size:
+                        block, util_ec, util_mc = self._evaluate(new)
+                        done += new.size
+                        violation = np.maximum(util_ec, util_mc)
+                        known.update(zip(new.tolist(), zip(np.where(violation <= 1, self._cost.flat[new], np.inf),
+                                                           violation)))
+                        yield block
+                    if any(i not in known for i in idx):
+                        return
+
+                    best = min(idx, key=lambda i: known[i])
+                    if best != idx[design[axis]]:
+                        design[axis], changed = np.unravel_index(best, self._shape)[axis], True
+
+    def surrogate(self, iterations: int, seed: Optional[int] = None,
+                  batchsize: int = 50) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Surrogate model search: the logarithm of the utilizations is fitted with a linear model of the (logarithm
+        of the) coordinates, and the cheapest designs, which may be valid within the largest error of the fit so far,
+        are evaluated next, until the cheapest valid design found is not more expensive than any unevaluated design
+        predicted possibly valid.
+        :param iterations: maximum number of evaluations
+        :param seed: None for a random run
+        :param batchsize: number of designs evaluated at once
+        :return: iterator of the result columns of the batches
+        """
+        rng = np.random.default_rng(seed)
+        size = int(np.prod(self._shape))
+        features = [np.log(self._axes[0]), self._axes[1], np.log(self._axes[2]), np.log(self._axes[3]),
+                    np.log(self._axes[4]), np.log(self.nummc(self._axes[4]))]
+        axes = [0, 1, 2, 3, 4, 4]
+        evaluated = np.zeros(size, dtype=bool)
+        x, y = [], []
+        best = np.inf
+
+        # start with random designs
+        idx = rng.choice(size, min(batchsize, size, iterations), replace=False)
+        done = 0
+        while idx.size:
+            block, util_ec, util_mc = self._evaluate(idx)
+            done += idx.size
+            evaluated[idx] = True
+            yield block
+
+            best = min(best, np.min(self._cost.flat[idx][block['valid']], initial=np.inf))
+            coords = np.unravel_index(idx, self._shape)
+            x.append(np.column_stack([np.ones(idx.size)] + [feature[coords[axis]]
+                                                             for feature, axis in zip(features, axes)]))
+            y.append(np.log(np.maximum(np.column_stack([util_ec, util_mc]), np.finfo(float).tiny)))
+
+            # the model is additive, so it is predicted for the whole grid through broadcasting
+            coef, _, _, _ = np.linalg.lstsq(np.concatenate(x), np.concatenate(y), rcond=None)
+            margin = np.max(np.concatenate(x) @ coef - np.concatenate(y), axis=0)  # the fit may be too pessimistic
+            prediction = np.zeros(self._shape + (2,)) + coef[0] - margin
+            for feature, axis, c in zip(features, axes, coef[1:]):
+                shape = [1] * (len(self._shape) + 1)
+                shape[axis], shape[-1] = feature.size, 2
+                prediction = prediction + (feature[:, np.newaxis] * c).reshape(shape)
+
+            violation = np.max(prediction, axis=-1).ravel()
+            candidates = ~evaluated & (violation <= 0) & (self._cost.ravel() < best)
+            if not np.any(candidates) and best == np.inf:
+                # nothing is predicted valid yet, go for the least violating designs
+                candidates, score = ~evaluated, violation
+            else:
+                score = self._cost.ravel()
+            num = min(batchsize, np.count_nonzero(candidates), iterations - done)
+            if num <= 0:
+                return
+            idx = np.argpartition(np.where(candidates, score, np.inf), num - 1)[:num]
@@ -0,0 +1,131 @@
+import numpy as np
+from cdn.results import Results
+from typing import Dict, List, Optional, Tuple
+
+
+class Pareto:
+    # +1: the lower the better, -1: the higher the better
+    senses = {'cost': 1, 'util_ec': 1, 'util_mc': 1, 'chr_ec': -1, 'chr_mc': -1}
+
+    def __init__(self, columns: List[Tuple[str, type]], objectives: Optional[List[str]] = None,
+                 chunksize: int = 256):
+        """
+        Online Pareto frontier of the valid designs: only the designs, which are not dominated by any other one in
+        the objectives, are kept. Rows equal in all the objectives are kept only once (the first one).
+        :param columns: list of (name, dtype) of the columns of a row
+        :param objectives: list of the objective columns (see senses), all of them if None
+        :param chunksize: number of new rows checked against each other at once
+        """
+        objectives = list(self.senses) if objectives is None else objectives
+        assert objectives and set(objectives) <= set(self.senses), f"Wrong objectives: {objectives}"
+        assert chunksize > 0, f"non positive chunksize: {chunksize}"
+        self._columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self._objectives = objectives
+        self._chunksize = chunksize
+        self._frontier = {name: np.empty(0, dtype=dtype) for name, dtype in self._columns}
+
+    @property
+    def objectives(self) -> List[str]:
+        return self._objectives
+
+    @property
+    def frontier(self) -> Dict[str, np.ndarray]:
+        return self._frontier
+
+    @frontier.setter
+    def frontier(self, frontier: Dict[str, np.ndarray]):
+        """
+        Restores a frontier, e.g. of a checkpoint, as it is.
+        """
+        assert set(frontier) == {name for name, _ in self._columns}, f"Wrong columns: {sorted(frontier)}"
+        self._frontier = {name: np.asarray(frontier[name], dtype=dtype) for name, dtype in self._columns}
+
+    def __len__(self) -> int:
+        return self._frontier[self._objectives[0]].size
+
+    def _points(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Returns the objectives as rows of a matrix, all to be minimized. A NaN objective (e.g. chr_mc of a design
+        without master cache traffic) is the worst value, otherwise it would neither dominate nor be dominated.
+        """
+        points = np.column_stack([self.senses[name] * np.asarray(columns[name], dtype=float)
+                                  for name in self._objectives])
+        return np.where(np.isnan(points), np.inf, points)
+
+    def _dominated(self, points: np.ndarray, by: np.ndarray) -> np.ndarray:
+        """
+        Returns which points are dominated (or equaled) by any of by, checked chunk by chunk.
+        """
+        dominated = np.zeros(len(points), dtype=bool)
+        for start in range(0, len(by), self._chunksize):
+            chunk = by[start:start + self._chunksize]
+            dominated |= np.any(self._leq(chunk, points), axis=0)
+        return dominated
+
+    @staticmethod
+    def _leq(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        Returns the matrix of a[i] <= b[j] in all objectives (objective by objective, a reduction over the short last
+        axis would be slow).
+        """
+        leq = a[:, np.newaxis, 0] <= b[np.newaxis, :, 0]
+        for k in range(1, a.shape[1]):
+            leq &= a[:, np.newaxis, k] <= b[np.newaxis, :, k]
+        return leq
+
+    def dominated(self, **columns) -> np.ndarray:
+        """
+        Returns which rows are dominated (or equaled) by the frontier, so they would not enter it.
+        :param columns: array of each objective, all of the same length
+        :return: boolean array
+        """
+        return self._dominated(self._points(columns), self._points(self._frontier))
+
+    def extend(self, **columns):
+        """
+        Updates the frontier with several rows at once: the valid new rows dominated by the frontier are dropped, the
+        rest is ordered lexicographically, so a row can only be dominated by the ones before it, and the frontier
+        rows dominated by the remaining new rows are dropped.
+        :param columns: array of each column, all of the same length
+        :return:
+        """
+        assert set(columns) == {name for name, _ in self._columns}, f"Wrong columns: {sorted(columns)}"
+        valid = np.asarray(columns['valid'], dtype=bool)
+        rows = {name: np.asarray(columns[name], dtype=dtype)[valid] for name, dtype in self._columns}
+        points, frontier = self._points(rows), self._points(self._frontier)
+
+        new = np.flatnonzero(~self._dominated(points, frontier))
+        new = new[np.lexsort(points[new].T[::-1])]
+        points = points[new]
+
+        kept = np.zeros(new.size, dtype=bool)
+        for start in range(0, new.size, self._chunksize):
+            chunk = points[start:start + self._chunksize]
+            kept[start:start + len(chunk)] = ~(self._dominated(chunk, points[:start]) |
+                                               np.any(np.triu(self._leq(chunk, chunk), 1), axis=0))
+
+        old = ~self._dominated(frontier, points[kept])
+        self._frontier = {name: np.concatenate([self._frontier[name][old], rows[name][new[kept]]])
+                          for name, _ in self._columns}
+
+    def frame(self):
+        """
+        Returns the frontier as a pandas DataFrame, ordered by the objectives.
+        :return:
+        """
+        import pandas as pd
+
+        order = np.lexsort(self._points(self._frontier).T[::-1])
+        return pd.DataFrame({name: values[order] for name, values in self._frontier.items()},
+                            columns=[name for name, _ in self._columns])
+
+    def save(self, filename: str, header: str = ""):
+        """
+        Writes the frontier to a csv file, see Results.
+        :param filename: csv file to write (truncated)
+        :param header: text written before the rows, each line commented out with #
+        :return:
+        """
+        results = Results(filename, self._columns, header=header, chunksize=max(len(self), 1))
+        results.extend(**self._frontier)
+        results.flush()
@@ -0,0 +1,123 @@
+import numpy as np
+from cdn import Request, Cache
+from typing import Dict, List
+
+
+class Tier:
+    def __init__(self, name: str, cache: Cache, count, replication=1, fanin=1, nummodules=None,
+                 dedicated=None, hashed: bool = True):
+        """
+        Stage of a cache hierarchy: a site of the tier is a cluster of caches sharing the miss streams of fanin sites of
+        the tier below. The numbers may be arrays of configurations, they are broadcasted against the ones of the
+        other tiers (see Pipeline.batch()).
+        :param name: e.g. edge, mid, master, shield
+        :param cache: cache type
+        :param count: number of caches of a site
+        :param replication: number of caches of a site holding a content
+        :param fanin: number of sites of the tier below feeding a site, it divides their number
+        :param nummodules: number of memory modules in a cache, the ones of cache if None
+        :param dedicated: ratio of the storage of a cache holding the hottest contents of its own requests, like the
+               edge caches of a PoP (see PoP.ingress()), the misses are forwarded to the cache holding them by
+               consistent hashing. None: the requests go to that cache directly, like the master caches.
+        :param hashed: the load of the hottest cache of the consistent hashing (see Request.hashing()), or an even load
+        """
+        self.name = name
+        self.cache = cache
+        self.count = np.asarray(count)
+        self.replication = np.asarray(replication)
+        self.fanin = np.asarray(fanin)
+        self.nummodules = np.asarray(cache.nummodules if nummodules is None else nummodules)
+        self.dedicated = None if dedicated is None else np.asarray(dedicated)
+        self.hashed = hashed
+        assert np.all(self.count > 0), f"non positive number of caches: {self.count}"
+        assert np.all(self.replication > 0), f"non positive replication: {self.replication}"
+        assert np.all(self.fanin > 0), f"non positive fanin: {self.fanin}"
+        assert np.all((cache.minmodules <= self.nummodules) & (self.nummodules <= cache.maxmodules)), \
+            f"Invalid nummodules: {self.nummodules}"
+        assert dedicated is None or np.all((0 <= self.dedicated) & (self.dedicated <= 1)), \
+            f"Wrong dedicated ratio: {self.dedicated}"
+
+    @property
+    def storage(self) -> np.ndarray:
+        return self.nummodules * self.cache.modulesize
+
+    @property
+    def cost(self) -> np.ndarray:
+        """
+        Cost of a site.
+        """
+        return self.count * (self.cache.baseprice + self.nummodules * self.cache.moduleprice)
+
+
+class Pipeline:
+    def __init__(self, sites: int, tiers: List[Tier]):
+        """
+        Hierarchy of cache tiers, the first one serves the clients, the last one is served by the origin. The miss
+        stream of a tier is a suffix of the sorted profile, so all tiers are evaluated on the cumulative arrays of the
+        one profile, chained by the ranks their streams start at (see Request.sweep()), nothing is materialized.
+        :param sites: number of sites of the first tier (e.g. PoPs), the fanin of the first tier is not used
+        :param tiers: tiers from the clients to the origin
+        """
+        assert sites > 0, f"non positive number of sites: {sites}"
+        assert len(tiers) > 0, "no tiers"
+        self._tiers = tiers
+        self._sites = [np.asarray(sites)]
+        for tier in tiers[1:]:
+            assert np.all(self._sites[-1] % tier.fanin == 0), \
+                f"fanin {tier.fanin} of {tier.name} does not divide the sites below: {self._sites[-1]}"
+            self._sites.append(self._sites[-1] // tier.fanin)
+
+    @property
+    def tiers(self) -> List[Tier]:
+        return self._tiers
+
+    @property
+    def sites(self) -> List[np.ndarray]:
+        """
+        Number of sites of each tier.
+        """
+        return self._sites
+
+    def batch(self, numrequests, egress: Request) -> List[Dict[str, np.ndarray]]:
+        """
+        Evaluates the tiers for the configurations of their (broadcasted) arrays in one pass.
+        :param numrequests: total number of requests of the clients (1/s), scalar or array
+        :param egress: request profile of the clients
+        :return: list of the results of each tier, dicts of arrays: rps and bps of the requests into a site, missrps
+                 and missbps of the requests a site forwards to the tier above (the origin after the last one), chr,
+                 util (of the hottest cache) and cost of the tier (all sites)
+        """
+        results = []
+        rps = np.trunc(np.asarray(numrequests) / self._sites[0])
+        start, meansize = 0, egress.meanrequestsize
+        for n, tier in enumerate(self._tiers):
+            if n > 0:
+                rps = rps * tier.fanin
+            storage = tier.storage
+            bps = rps * meansize * 8
+
+            if tier.dedicated is not None:
+                # the hottest contents on each cache, the misses go to the one holding them by consistent hashing
+                storage1 = np.trunc(tier.dedicated * storage)
+                ratio1, start1, meansize1 = egress.sweep(storage1, start)
+                rps1 = np.trunc(rps * (1 - ratio1))
+                ratio, missstart, missmeansize = egress.sweep(tier.count * (storage - storage1) / tier.replication,
+                                                              start1)
+                missrps = np.trunc(rps1 * (1 - ratio))
+                imbalance = egress.hashing(tier.count, tier.replication, storage - storage1, start1)[2] \
+                    if tier.hashed else 1
+                util = (bps / tier.count + rps1 * meansize1 * 8 * imbalance / tier.count) / tier.cache.capacity
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    chr_ = 1 - (rps1 + missrps) / (rps + rps1)
+            else:
+                ratio, missstart, missmeansize = egress.sweep(tier.count * storage / tier.replication, start)
+                missrps = np.trunc(rps * (1 - ratio))
+                imbalance = egress.hashing(tier.count, tier.replication, storage, start)[2] if tier.hashed else 1
+                util = bps * imbalance / tier.count / tier.cache.capacity
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    chr_ = np.where(rps != 0, 1 - missrps / np.where(rps != 0, rps, 1), np.nan)
+
+            results.append({'rps': rps, 'bps': bps, 'missrps': missrps, 'missbps': missrps * missmeansize * 8,
+                            'chr': chr_, 'util': util, 'cost': self._sites[n] * tier.cost})
+            rps, start, meansize = missrps, missstart, missmeansize
+        return results
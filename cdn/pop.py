@@ -1,14 +1,39 @@
-from cdn import Request, Cache
-from typing import Tuple
+import numpy as np
+
+from cdn import Request, Cache, Memo
+from typing import List, Optional, Tuple
 
 
 class PoP:
-    def __init__(self, cache: Cache):
+    # stages of ingress() in order with the properties they depend on besides the stages before them, a setter makes
+    # the first stage depending on its property and all the later ones stale
+    dependencies = [('dedicated', {'storage1ec', 'nummodules'}), ('hashed', {'numcache', 'replication'})]
+
+    def __init__(self, cache: Cache, memo: Optional[Memo] = None):
         self._cache = cache
+        self._memo = memo
         self._numcache = 1
         self._storage1ec = 0.1
         self._replication = 1
 
+        # the egress profile and the results of the stages of the last ingress(), the ones from _stale on are stale
+        self._egress = None
+        self._stages = {}
+        self._stale = 0
+
+    def _invalidate(self, name: str):
+        """
+        Makes the stages depending on a property stale, the cache of the PoP must be changed through the setters.
+        """
+        self._stale = min([self._stale] + [n for n, (_, names) in enumerate(self.dependencies) if name in names])
+
+    @property
+    def stale(self) -> List[str]:
+        """
+        Stages of ingress() to be recomputed (all of them for another egress profile).
+        """
+        return [stage for stage, _ in self.dependencies[self._stale:]]
+
     @property
     def replication(self) -> int:
         return self._replication
@@ -18,6 +43,7 @@ class PoP:
         assert isinstance(val,
                           int) and val > 0, f"non positive replication: {val}, (replication 1 --> object only one on the pop"
         self._replication = val
+        self._invalidate('replication')
 
     @property
     def numcache(self):
@@ -27,6 +53,7 @@ class PoP:
     def numcache(self, val: int):
         assert isinstance(val, int) and val > 0, f"non positive number of caches: {val}"
         self._numcache = val
+        self._invalidate('numcache')
 
     @property
     def maxmodules(self):
@@ -36,6 +63,14 @@ class PoP:
     def minmodules(self):
         return self._cache.minmodules
 
+    @property
+    def moduleprice(self) -> float:
+        return self._cache.moduleprice
+
+    @property
+    def baseprice(self) -> float:
+        return self._cache.baseprice
+
     @property
     def nummodules(self) -> int:
         return self._cache.nummodules
@@ -43,6 +78,7 @@ class PoP:
     @nummodules.setter
     def nummodules(self, val: int):
         self._cache.nummodules = val
+        self._invalidate('nummodules')
 
     @property
     def storage(self):
@@ -56,29 +92,97 @@ class PoP:
     def storage1ec(self, percent: float):
         assert 0 <= percent <= 1, f"Wrong storage1: {percent}"
         self._storage1ec = percent
+        self._invalidate('storage1ec')
+
+    def split(self, profile: Request, volume: float) -> Tuple[float, Request, float]:
+        """
+        Returns profile.split(volume), through the memo if there is one.
+        """
+        return self._memo.lookup(profile, volume) if self._memo is not None else profile.split(volume)
 
     def ingress(self, rps: int, egress: Request) -> Tuple[int, Request, float, float]:
         """
 
         :param rps: interpreted on the PoP
         :param egress:
-        :return: tuple of (ingress number of requests, ingress Request profile, ec utilization, ec CHR)
+        :return: tuple of (ingress number of requests, ingress Request profile, ec utilization (of the hottest cache),
+                 ec CHR)
         """
-        # calculate the numrequests1 and ingress1 (after the first, dedicated storage1) total for all caches
-        rps1, ingress1 = int(rps * (1 - egress.cdf(self.storage1ec))), egress.miss(self.storage1ec)
+        if egress is not self._egress:
+            self._egress, self._stale = egress, 0
 
-        # calculate rps2, ingress2 (considering consistent hashing and replication)
-        rps2 = int(rps1 * (1 - ingress1.cdf(self._numcache * (self._cache.storage - self.storage1ec) / self._replication)))
-        ingress2 = ingress1.miss(self._numcache * (self._cache.storage - self.storage1ec) / self._replication)
+        # calculate the numrequests1 and ingress1 (after the first, dedicated storage1) total for all caches
+        if self._stale <= 0:
+            self._stages['dedicated'] = self.split(egress, self.storage1ec)[:2]
+        cdf1, ingress1 = self._stages['dedicated']
+        rps1 = int(rps * (1 - cdf1))
+
+        # calculate rps2, ingress2 (considering consistent hashing and replication), on the hottest cache of the
+        # consistent hashing
+        if self._stale <= 1:
+            cdf2, ingress2, _ = self.split(ingress1, self._numcache * (self._cache.storage - self.storage1ec) /
+                                           self._replication)
+            _, _, imbalance = ingress1.hashing(self._numcache, self._replication,
+                                               self._cache.storage - self.storage1ec)
+            self._stages['hashed'] = cdf2, ingress2, imbalance
+        cdf2, ingress2, imbalance = self._stages['hashed']
+        rps2 = int(rps1 * (1 - cdf2))
+        self._stale = len(self.dependencies)
 
         # utilization is just throughput on it / capacity
-        util_ec = (egress.rps2bps(rps / self._numcache) + ingress1.rps2bps(rps1) / self._numcache) / self._cache.capacity
+        util_ec = (egress.rps2bps(rps / self._numcache) + ingress1.rps2bps(rps1) * imbalance / self._numcache) / \
+                  self._cache.capacity
 
         # chr is 1 - all miss / all requests
         chr_ec = 1 - (rps1 + rps2) / (rps + rps1)
 
         return rps2, ingress2, util_ec, chr_ec
 
+    def batch(self, rps, egress: Request, replication: np.ndarray, storage1ec: np.ndarray,
+              nummodules: np.ndarray, numcache: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+                                                                    np.ndarray]:
+        """
+        Vectorized ingress() for arrays of PoP configurations, the arrays are broadcasted against each other. The
+        ingress Request profiles are described by the rank they start at in egress (see Request.sweep()).
+        :param rps: interpreted on the PoP, a scalar or an array of the slots of a load curve: the miss streams do not
+               depend on the load, the load dependent results get the extra last axes of rps
+        :param egress:
+        :param replication:
+        :param storage1ec: ratio of the dedicated storage
+        :param nummodules: number of memory modules in an edge cache
+        :param numcache: number of edge caches in the PoP
+        :return: tuple of (ingress number of requests, ingress profile ranks, ingress mean request sizes,
+                 ec utilization (of the hottest cache), ec CHR)
+        """
+        replication, storage1ec, nummodules, numcache = np.broadcast_arrays(replication, storage1ec, nummodules,
+                                                                            numcache)
+        assert np.all(replication > 0), f"non positive replication: {replication}"
+        assert np.all((0 <= storage1ec) & (storage1ec <= 1)), f"Wrong storage1: {storage1ec}"
+        assert np.all((self.minmodules <= nummodules) & (nummodules <= self.maxmodules)), \
+            f"Invalid nummodules: {nummodules}"
+        assert np.all(numcache > 0), f"non positive number of caches: {numcache}"
+
+        storage = nummodules * self._cache.modulesize
+        storage1 = np.trunc(storage1ec * storage)
+
+        # same as ingress(), the miss streams are chained through their ranks
+        ratio1, start1, meansize1 = egress.sweep(storage1)
+        ratio2, start2, meansize2 = egress.sweep(numcache * (storage - storage1) / replication, start1)
+        _, _, imbalance = egress.hashing(numcache, replication, storage - storage1, start1)
+
+        # the loads of the slots
+        rps = np.asarray(rps)
+        slots = (Ellipsis,) + (np.newaxis,) * rps.ndim
+        ratio1, meansize1, ratio2, imbalance, numcache = (values[slots] for values in
+                                                          [ratio1, meansize1, ratio2, imbalance, numcache])
+        rps1 = np.trunc(rps * (1 - ratio1))
+        rps2 = np.trunc(rps1 * (1 - ratio2))
+        util_ec = (egress.rps2bps(rps / numcache) + rps1 * meansize1 * 8 * imbalance / numcache) / self._cache.capacity
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chr_ec = 1 - (rps1 + rps2) / (rps + rps1)
+
+        return rps2, start2, meansize2, util_ec, chr_ec
+
     @property
     def cost(self):
         return self._numcache * self._cache.cost
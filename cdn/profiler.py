@@ -0,0 +1,155 @@
+import contextlib
+import functools
+import json
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from cdn import Request, Factorized, Sketch, LiveTV, FactorizedLiveTV, PoP, System, Memo
+from cdn.livetv import _LiveTV
+from cdn.montecarlo import MonteCarlo
+from cdn.results import Results
+from cdn.pareto import Pareto
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# stages of a sizing run: building (and plotting) the profile, the miss chains of the edge caches, the master caches
+# (System.ingress includes PoP.ingress) and the bookkeeping of the results
+stages = [(LiveTV, '__init__'), (FactorizedLiveTV, '__init__'), (Sketch, '__init__'), (_LiveTV, 'plot'),
+          (_LiveTV, 'save'),
+          (Request, 'miss'), (Request, 'split'), (Request, 'sweep'), (Request, 'hashing'),
+          (Factorized, 'miss'), (Factorized, 'split'), (Factorized, 'sweep'), (Factorized, 'hashing'),
+          (Sketch, 'miss'), (Sketch, 'sweep'), (Sketch, 'hashing'), (Memo, 'lookup'),
+          (PoP, 'ingress'), (PoP, 'batch'), (System, 'ingress'), (System, 'batch'), (System, 'curve'),
+          (MonteCarlo, 'evaluate'),
+          (Results, 'extend'), (Results, 'sort'), (Pareto, 'extend'), (Pareto, 'save')]
+
+
+class Profiler:
+    def __init__(self, memory: bool = True):
+        """
+        Registry of timers and call counters of the stages of a run. Nothing is instrumented until start(), the methods
+        are wrapped then and restored by stop(), so a run without a profiler does not pay anything.
+        :param memory: trace the allocations (tracemalloc), the bytes of a stage are the ones still allocated after it
+        """
+        self._memory = memory
+        self._times = {}
+        self._bytes = {}
+        self._patched = []
+        self._start = None
+        self._elapsed = 0.
+
+    @property
+    def running(self) -> bool:
+        return self._start is not None
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Time (s) between start() and stop() (or now).
+        """
+        return self._elapsed + (time.perf_counter() - self._start if self.running else 0.)
+
+    def _record(self, name: str, elapsed: float, allocated: int):
+        self._times.setdefault(name, []).append(elapsed)
+        self._bytes[name] = self._bytes.get(name, 0) + allocated
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measures the block as a stage.
+        :param name: stage name, the measurements of the same name add up
+        :return:
+        """
+        before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(name, elapsed, tracemalloc.get_traced_memory()[0] - before if tracemalloc.is_tracing() else 0)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator measuring each call of a function as a stage.
+        :param name: stage name
+        :return:
+        """
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument(self, owner: type, attribute: str, name: Optional[str] = None):
+        """
+        Replaces a method by a timed one until stop().
+        :param owner: class defining the method
+        :param attribute: method name
+        :param name: stage name, Class.method by default
+        :return:
+        """
+        assert attribute in vars(owner), f"{owner.__name__} does not define {attribute}"
+        original = vars(owner)[attribute]
+        setattr(owner, attribute, self.timed(name or f"{owner.__name__}.{attribute}")(original))
+        self._patched.append((owner, attribute, original))
+
+    def start(self, targets: Sequence[Tuple[type, str]] = tuple(stages)) -> 'Profiler':
+        """
+        Instruments the methods and starts the clock.
+        :param targets: list of (class, method), see stages
+        :return: self
+        """
+        assert not self.running, "profiler already running"
+        for owner, attribute in targets:
+            self.instrument(owner, attribute)
+        if self._memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        """
+        Stops the clock and restores the original methods.
+        """
+        if self.running:
+            self._elapsed += time.perf_counter() - self._start
+            self._start = None
+        while self._patched:
+            owner, attribute, original = self._patched.pop()
+            setattr(owner, attribute, original)
+        if self._memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def __enter__(self) -> 'Profiler':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Returns the breakdown of the stages by total time. The times of nested stages are included in the ones of
+        their callers (System.batch includes PoP.batch).
+        :return: frame of calls, total, mean and p99 time (s), share of the elapsed time and bytes of each stage
+        """
+        rows: List[Dict[str, object]] = []
+        elapsed = self.elapsed
+        for name, times in self._times.items():
+            times = np.array(times)
+            rows.append({'stage': name, 'calls': times.size, 'total': np.sum(times), 'mean': np.mean(times),
+                         'p99': np.percentile(times, 99), 'share': np.sum(times) / elapsed if elapsed else np.nan,
+                         'bytes': self._bytes[name]})
+        columns = ['stage', 'calls', 'total', 'mean', 'p99', 'share', 'bytes']
+        return pd.DataFrame(rows, columns=columns).sort_values('total', ascending=False).set_index('stage')
+
+    def save(self, filename: str):
+        """
+        Writes the breakdown as json.
+        :param filename:
+        :return:
+        """
+        with open(filename, 'wt') as f:
+            json.dump({'elapsed': self.elapsed, 'stages': self.frame().to_dict(orient='index')}, f, indent=1,
+                      default=lambda value: value.item())
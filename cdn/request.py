@@ -1,15 +1,43 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from typing import Callable, Optional, Tuple
+
+
+def _accumulate(values: Callable[[int, int], np.ndarray], n: int, dtype, chunksize: int = 1 << 20) -> np.ndarray:
+    """
+    Cumulative sum accumulated in float64 chunk by chunk, but stored as dtype.
+    :param values: returns the values between two indices
+    :param n: number of values
+    :param dtype: dtype of the sums
+    :param chunksize: number of values summed at once
+    :return:
+    """
+    sums, carry = np.empty(n, dtype=dtype), 0.
+    for start in range(0, n, chunksize):
+        chunk = np.cumsum(values(start, min(start + chunksize, n)), dtype=float) + carry
+        sums[start:start + chunk.size], carry = chunk, chunk[-1]
+    return sums
 
 
 class Request:
-    def __init__(self, size: np.array = np.array([]), probability: np.array = np.array([])):
+    # distinct content sizes of a compact profile, _size holds the indices into them then
+    _sizetable = None
+
+    def __init__(self, size: np.array = np.array([]), probability: np.array = np.array([]), compact: bool = False,
+                 sizetable: Optional[np.ndarray] = None):
         """
         This is just a profile holding probabilities (sum of requests normalized to 1)
-        :param size: size of a request (Byte)
+        :param size: size of a request (Byte), or its index into sizetable
         :param probability: number of requests
+        :param compact: keep the arrays in float32 and the sizes as indices into the distinct sizes, about 17 instead
+               of 40 Byte per content. The sums are accumulated in float64, so the cdf is off by less than 1.2e-7 and
+               the volumes by less than 6e-8 times the content base: a cache volume may thus be rounded to a content
+               within 6e-8 * contentbase of the exact one. The hit ratios and mean request sizes of a miss stream
+               are off by the same divided by the probability mass of the stream.
+        :param sizetable: distinct sizes (Byte), size are indices into them
         """
         assert size.shape == probability.shape, f"Shape mismatch: {size.shape}, {probability.shape}"
+        if sizetable is not None and not compact:
+            size = sizetable[size]
 
         if probability.size == 0:
             # it may be empty
@@ -17,21 +45,75 @@ class Request:
             self._cdf = np.array([])
             self._size = np.array([])
             self._volume = np.array([])
+            self._bytes = np.array([])
         else:
 #            assert np.sum(probability).round(
 #                3) == 1, f"Wrong sum on probabilities: {np.sum(probability)}, (elements: {probability.size})"
-            assert np.sum(size) > 0, f"Wrong size sum: {np.sum(size)}"
+            assert np.sum(size if sizetable is None else sizetable[size]) > 0, f"Wrong size sum: {np.sum(size)}"
 
             # determine ranking order
             order = np.argsort(probability)[::-1]
+            if compact:
+                self._compact(size, probability, order, sizetable)
+            else:
+                self._sort(size, probability, order)
+
+        # volume, probability and byte mass before the first content and the probability mass of the profile, the
+        # arrays of views are not renormalized, they share the arrays of the profile they were cut from
+        self._v0 = 0
+        self._p0 = 0
+        self._b0 = 0
+        self._norm = 1
+
+    def _sort(self, size: np.ndarray, probability: np.ndarray, order: np.ndarray):
+        """
+        Sorts the arrays by the ranking order and determines their cumulative sums.
+        """
+        # sort arrays and determine properties
+        self._pmf = probability[order] / np.sum(probability)
+        self._cdf = np.cumsum(self._pmf)
 
-            # sort arrays and determine properties
-            self._pmf = probability[order] / np.sum(probability)
-            self._cdf = np.cumsum(self._pmf)
+        self._size = size[order]
+        self._volume = np.cumsum(self._size)
+        self._bytes = np.cumsum(self._pmf * self._size)
+        assert self._pmf.shape == self._size.shape
+
+    def _compact(self, size: np.ndarray, probability: np.ndarray, order: np.ndarray, sizetable: Optional[np.ndarray]):
+        """
+        Same as _sort(), but the arrays are float32 and the sizes are indices into the distinct sizes.
+        """
+        if sizetable is None:
+            sizetable, size = np.unique(size, return_inverse=True)
+        self._sizetable = np.asarray(sizetable)
+        self._size = size[order].astype(np.min_scalar_type(max(self._sizetable.size - 1, 0)))
+
+        self._pmf = np.divide(probability[order], np.sum(probability, dtype=float), dtype=np.float32)
+        n = self._pmf.size
+        self._cdf = _accumulate(lambda start, stop: self._pmf[start:stop], n, np.float32)
+        self._volume = _accumulate(lambda start, stop: self._sizetable[self._size[start:stop]], n, np.float32)
+        self._bytes = _accumulate(lambda start, stop: self._pmf[start:stop] * self._sizetable[self._size[start:stop]],
+                                  n, np.float32)
+
+    def _view(self, start: int, stop: int):
+        """
+        Returns the contents between the ranks start and stop as a profile without copying or sorting anything.
+        :param start: first rank
+        :param stop: rank after the last one
+        :return:
+        """
+        view = Request.__new__(Request)
+        view._pmf = self._pmf[start:stop]
+        view._cdf = self._cdf[start:stop]
+        view._size = self._size[start:stop]
+        view._sizetable = self._sizetable
+        view._volume = self._volume[start:stop]
+        view._bytes = self._bytes[start:stop]
 
-            self._size = size[order]
-            self._volume = np.cumsum(self._size)
-            assert self._pmf.shape == self._size.shape
+        view._v0 = self._volume[start - 1] if start > 0 else self._v0
+        view._p0 = self._cdf[start - 1] if start > 0 else self._p0
+        view._b0 = self._bytes[start - 1] if start > 0 else self._b0
+        view._norm = view._cdf[-1] - view._p0 if view._cdf.size else 0
+        return view
 
     @property
     def sizes(self) -> np.ndarray:
@@ -39,7 +121,21 @@ class Request:
         Returns the size of each content in an array
         :return:
         """
-        return self._size
+        return self._size if self._sizetable is None else self._sizetable[self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory of the arrays of the profile (Byte).
+        """
+        return sum(values.nbytes for values in [self._pmf, self._cdf, self._size, self._volume, self._bytes,
+                                                self._sizetable] if values is not None)
+
+    def _sizesof(self, rank: np.ndarray) -> np.ndarray:
+        """
+        Returns the sizes of the contents of the ranks.
+        """
+        return self._size[rank] if self._sizetable is None else self._sizetable[self._size[rank]]
 
     @property
     def volumes(self) -> np.ndarray:
@@ -48,7 +144,27 @@ class Request:
         plotting.
         :return:
         """
-        return self._volume
+        return self._volume - self._v0
+
+    def _index(self, volume, start=0):
+        """
+        Returns the rank of the content, which cumulative volume is the nearest to volume (the first one on a tie).
+        Same as np.abs(self._volume - volume).argmin(), but with a binary search on the (monotonic) volumes.
+        :param volume: scalar or array of volumes (Byte), measured from start
+        :param start: scalar or array of ranks, only the contents from start on are considered
+        :return: scalar or array of ranks
+        """
+        volume, start = np.asarray(volume), np.asarray(start)
+        last = self._volume.size - 1
+        start = np.minimum(start, last)
+        target = volume + np.where(start > 0, self._volume[start - 1], self._v0)
+
+        # first content reaching the target and the first content of the volume just below it
+        right = np.clip(np.searchsorted(self._volume, target), start, last)
+        left = np.maximum(np.searchsorted(self._volume, self._volume[np.maximum(right - 1, 0)]), start)
+
+        nearer = np.abs(self._volume[left] - target) <= np.abs(self._volume[right] - target)
+        return np.where((right > start) & nearer, left, right)[()]
 
     def pmf(self, volume) -> float:
         """
@@ -56,34 +172,151 @@ class Request:
         :param volume:
         :return:
         """
-        idx = (np.abs(self._volume - volume)).argmin()  # TODO: speed this up, list is already ordered...
-        return self._pmf[idx]
+        return self._pmf[self._index(volume)] / self._norm
 
     def cdf(self, volume) -> float:
-        if self._pmf.size == 0:
+        if self._pmf.size == 0 or self._norm <= 0:
             return 1
-        idx = (np.abs(self._volume - volume)).argmin()
-        return self._cdf[idx]
+        return (self._cdf[self._index(volume)] - self._p0) / self._norm
 
     def hit(self, volume: float):
-        idx = (np.abs(self._volume - volume)).argmin()
-        # tail the arrays and normalize them to get a real pdf.
-        return Request(self._size[:idx], self._pmf[:idx] / np.sum(self._pmf[:idx]))
+        # head of the arrays, normalized through the view
+        return self._view(0, self._index(volume))
 
     def miss(self, volume: float):
         if self._pmf.size == 0:
             return Request()
-        idx = (np.abs(self._volume - volume)).argmin()
-        # tail the arrays and normalize them to get a real pdf.
-        return Request(self._size[idx + 1:], self._pmf[idx + 1:] / np.sum(self._pmf[idx + 1:]))
+        # tail of the arrays, normalized through the view
+        return self._view(self._index(volume) + 1, self._pmf.size)
+
+    def split(self, volume: float) -> Tuple[float, 'Request', float]:
+        """
+        Returns the cdf value, the miss stream and its mean request size at volume at once.
+        :param volume:
+        :return: tuple of (cdf, miss stream profile, mean request size of the miss stream)
+        """
+        miss = self.miss(volume)
+        return self.cdf(volume), miss, miss.meanrequestsize
+
+    def sweep(self, volumes, start=0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized cdf() and miss() for a whole range of cache sizes with a single binary search. Miss streams are
+        described by the rank they start at, pass them as start to chain caches.
+        :param volumes: array of cache sizes (Byte)
+        :param start: array of miss stream descriptors (ranks) the request streams start at (0: this profile)
+        :return: tuple of (hit ratios, miss stream ranks, miss stream mean request sizes)
+        """
+        volumes, start = np.broadcast_arrays(np.asarray(volumes, dtype=float), np.asarray(start, dtype=int))
+        n = self._pmf.size
+        if n == 0:
+            return np.ones(volumes.shape), np.zeros(volumes.shape, dtype=int), np.zeros(volumes.shape)
+
+        # probability mass of the contents before start
+        head = np.where(start > 0, self._cdf[np.clip(start, 1, n) - 1], self._p0)
+        norm = np.where(start > 0, self._cdf[-1] - head, self._norm)
+
+        # there is nothing to miss on an empty stream (or on one without any probability mass left)
+        empty = (start >= n) | (norm <= 0)
+        idx = self._index(volumes, start)
+        ratio = np.where(empty, 1, (self._cdf[idx] - head) / np.where(empty, 1, norm))
+
+        missstart = np.where(empty, n, idx + 1)
+        missnorm = self._cdf[-1] - self._cdf[idx]
+        missbytes = self._bytes[-1] - self._bytes[idx]
+        meansize = np.where(empty | (missnorm <= 0), 0, missbytes / np.where(missnorm > 0, missnorm, 1))
+
+        return ratio, missstart, meansize
 
     def consistenthashing(self, nodes: int, replication: int = 1):
         assert replication < nodes, f"replication {replication} is higher than nodes {nodes}!"
 
         # return [Request(self._size[n::nodes], self._pmf[n::nodes] / np.sum(self._pmf[n::nodes])) for n in range(nodes)]
-        return [Request(np.concatenate([self._size[(n + r) % nodes::nodes] for r in range(replication)]),
+        sizes = self.sizes
+        return [Request(np.concatenate([sizes[(n + r) % nodes::nodes] for r in range(replication)]),
                         np.concatenate([self._pmf[(n+r)%nodes::nodes] / np.sum(self._pmf[(n+r)%nodes::nodes]) for r in range(replication)])) for n in range(nodes)]
 
+    def hashing(self, nodes, replication=1, volume=0, start=0,
+                head: int = 256) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized consistent hashing model of the request stream from start over nodes: the content of rank j
+        (counted from start) is stored on the nodes (j - r) mod nodes, r < replication, which share its requests
+        evenly. Like in PoP.ingress(), the nodes cache together the contents up to nodes * volume / replication. The
+        first head contents of the stream are placed one by one, the rest is spread evenly (the imbalance is made by
+        the popular contents).
+        :param nodes: array of node numbers
+        :param replication: array of replication factors (at most nodes are used)
+        :param volume: array of cache sizes of a node (Byte)
+        :param start: array of miss stream descriptors (ranks), see sweep()
+        :param head: number of contents placed one by one
+        :return: tuple of (per node hit ratios, per node shares of the stream bytes, max / mean node load), the per
+                 node arrays have an extra last axis of max(nodes), padded with nan
+        """
+        nodes, replication, volume, start = np.broadcast_arrays(np.asarray(nodes, dtype=int),
+                                                                np.asarray(replication, dtype=int),
+                                                                np.asarray(volume, dtype=float),
+                                                                np.asarray(start, dtype=int))
+        assert np.all(nodes > 0), f"non positive number of nodes: {nodes}"
+        assert np.all(replication > 0), f"non positive replication: {replication}"
+        shape, width = nodes.shape, int(np.max(nodes, initial=1))
+        n = self._pmf.size
+        start = np.minimum(start, n)
+        if n == 0:
+            head = 0
+        cut = np.ravel(self._index(nodes * volume / replication, start) if n else start)
+        start = start.ravel()
+        nodes, replication = nodes.ravel(), np.minimum(replication, nodes).ravel()
+
+        # each distinct configuration is computed once (the grids repeat them a lot)
+        keys, inverse = np.unique(np.stack([nodes, replication, start, cut]), axis=1, return_inverse=True)
+        nodes, replication, start, cut = keys
+        inverse = np.ravel(inverse)
+
+        # probability, hit probability and byte mass of the stream, of its head and of the head by nodes (the
+        # contents of a node without replication)
+        cdf, bytes_ = np.concatenate([[self._p0], self._cdf]), np.concatenate([[self._b0], self._bytes])
+        total = np.stack([cdf[-1] - cdf[start], np.where(cut >= start, cdf[np.minimum(cut + 1, n)] - cdf[start], 0),
+                          bytes_[-1] - bytes_[start]])
+
+        rank = start[:, np.newaxis] + np.arange(head)
+        inside = rank < n
+        rank = np.minimum(rank, n - 1)
+        pmf = np.where(inside, self._pmf[rank] if n else 0, 0)
+        masses = [pmf, np.where(rank <= cut[:, np.newaxis], pmf, 0), pmf * (self._sizesof(rank) if n else 0)]
+        bins = (np.arange(nodes.size) * width)[:, np.newaxis] + np.arange(head) % nodes[:, np.newaxis]
+        bynode = np.stack([np.bincount(bins.ravel(), mass.ravel(), nodes.size * width).reshape(nodes.size, width)
+                           for mass in masses])
+        rest = np.maximum(total - np.stack([np.sum(mass, axis=1) for mass in masses]), 0)
+
+        # node n holds the contents of the nodes n ... n + replication - 1 (mod nodes), a circular moving sum
+        rows, first = np.arange(nodes.size)[:, np.newaxis], np.arange(width)
+        cumsum = np.cumsum(bynode[:, rows, np.arange(2 * width) % nodes[:, np.newaxis]], axis=2)
+        cumsum = np.concatenate([np.zeros((3, nodes.size, 1)), cumsum], axis=2)
+        load = (cumsum[:, rows, first + replication[:, np.newaxis]] - cumsum[:, rows, first]) / \
+               replication[:, np.newaxis] + rest[:, :, np.newaxis] / nodes[:, np.newaxis]
+
+        valid = first[np.newaxis] < nodes[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(valid, np.where(load[0] > 0, load[1] / load[0], 1), np.nan)
+            share = np.where(valid, np.where(total[2][:, np.newaxis] > 0, load[2] / total[2][:, np.newaxis],
+                                             1 / nodes[:, np.newaxis]), np.nan)
+        imbalance = np.nanmax(share, axis=1) * nodes
+        ratio, share, imbalance = ratio[inverse], share[inverse], imbalance[inverse]
+
+        return ratio.reshape(shape + (width,)), share.reshape(shape + (width,)), imbalance.reshape(shape)
+
+    def _evenhashing(self, nodes, replication=1, volume=0,
+                     start=0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same as hashing(), but the stream is spread evenly over the nodes, for the profiles without single contents.
+        """
+        nodes, replication, volume, start = np.broadcast_arrays(np.asarray(nodes, dtype=int),
+                                                                np.asarray(replication, dtype=int),
+                                                                np.asarray(volume, dtype=float), np.asarray(start))
+        ratio, _, _ = self.sweep(nodes * volume / replication, start)
+        valid = np.arange(int(np.max(nodes, initial=1))) < nodes[..., np.newaxis]
+        return np.where(valid, ratio[..., np.newaxis], np.nan), np.where(valid, 1 / nodes[..., np.newaxis], np.nan), \
+               np.ones(nodes.shape)
+
     def rps2bps(self, rps: float):
         """
         Determines the expected throughput from request pro sec (using meanrequestsize)
@@ -100,30 +333,36 @@ class Request:
         """
         return bps / 8 / self.meanrequestsize
 
+    @property
+    def numcontents(self) -> int:
+        return self._pmf.size
+
     @property
     def contentbase(self) -> int:
-        return np.sum(self._size)
+        return self._volume[-1] - self._v0 if self._volume.size else 0
 
     @property
     def meanrequestsize(self):
-        return np.sum(np.multiply(self._pmf, self._size))
+        return (np.float64(self._bytes[-1]) - self._b0) / self._norm if self._bytes.size and self._norm > 0 else 0
 
     def describe(self):
         return f"*** {self.__class__.__name__} profile ***\n" \
-               f"Number of contents: {self._pmf.size} ({self.contentbase / 1000 / 1000 / 1000 / 1000} TB)\n" \
+               f"Number of contents: {self.numcontents} ({self.contentbase / 1000 / 1000 / 1000 / 1000} TB)\n" \
                f"Mean request size: {self.meanrequestsize / 1000 / 1000:.2f} MB\n"
 
     def plot(self, axs, **kwargs):
+        import matplotlib.pyplot as plt
+
         if axs is None:
             fig, axs = plt.subplots(1, 2)
 
-        axs[0, 0].plot(self._volume / 1000 / 1000 / 1000, self._pmf, **kwargs)
+        axs[0, 0].plot(self.volumes / 1000 / 1000 / 1000, self._pmf / self._norm, **kwargs)
         axs[0, 0].set_ylabel("probabbility")
         axs[0, 0].set_xlabel('volume (GB)')
         axs[0, 0].loglog()
         axs[0, 0].title.set_text('pmf')
 
-        axs[0, 1].plot(self._volume / 1000 / 1000 / 1000, self._cdf, **kwargs)
+        axs[0, 1].plot(self.volumes / 1000 / 1000 / 1000, (self._cdf - self._p0) / self._norm, **kwargs)
         axs[0, 1].set_ylabel("probabbility")
         axs[0, 1].set_xlabel('volume (GB)')
         axs[0, 1].title.set_text('cdf')
@@ -132,6 +371,8 @@ class Request:
             plt.show()
 
     def save(self, filename: str, axs=None, **kwargs):
+        import matplotlib.pyplot as plt
+
         if axs is None:
             fig, axs = plt.subplots(1, 2)
 
@@ -140,12 +381,14 @@ class Request:
         plt.savefig(filename)
 
     def plotstats(self, ax=None):
+        import matplotlib.pyplot as plt
+
         if ax is None:
             fig, ax = plt.subplots()
             fig.suptitle(self.__class__.__name__)
 
         ax.loglog()
-        ax.plot(self._volume, self._pmf)
+        ax.plot(self.volumes, self._pmf / self._norm)
         ax2 = ax.twinx()
         #        ax2.scatter(self._volume, self._cdf, **kwargs)
         ax.set_ylabel("probability")
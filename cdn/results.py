@@ -0,0 +1,173 @@
+import csv
+import heapq
+import os
+import tempfile
+import numpy as np
+from typing import List, Tuple
+
+
+class Results:
+    def __init__(self, filename: str, columns: List[Tuple[str, type]], header: str = "", chunksize: int = 100000):
+        """
+        Columnar result buffer, which streams the rows to a csv file chunk by chunk, so the memory use does not depend
+        on the number of rows and the finished rows are on the disk.
+        :param filename: csv file to write (truncated)
+        :param columns: list of (name, dtype) of the columns
+        :param header: text written before the rows, each line commented out with #
+        :param chunksize: number of rows kept in memory
+        """
+        assert chunksize > 0, f"non positive chunksize: {chunksize}"
+        self._filename = filename
+        self._columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self._chunksize = chunksize
+        self._buffer = {name: np.empty(chunksize, dtype=dtype) for name, dtype in self._columns}
+        self._fill = 0
+        self._rows = 0
+
+        with open(filename, 'wt', newline='') as f:
+            for line in header.splitlines():
+                f.write(f"# {line}\n")
+            csv.writer(f).writerow([''] + self.columns)
+
+    @classmethod
+    def reopen(cls, filename: str, columns: List[Tuple[str, type]], rows: int, size: int,
+               chunksize: int = 100000) -> 'Results':
+        """
+        Continues a csv file of results, e.g. of a checkpoint: the file is truncated to its first rows.
+        :param filename: csv file written by Results
+        :param columns: see __init__()
+        :param rows: number of rows kept
+        :param size: size of the file up to the end of the kept rows (Byte)
+        :param chunksize: see __init__()
+        :return:
+        """
+        assert os.path.getsize(filename) >= size, f"{filename} is shorter than {size} Byte"
+        results = cls.__new__(cls)
+        results._filename = filename
+        results._columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        results._chunksize = chunksize
+        results._buffer = {name: np.empty(chunksize, dtype=dtype) for name, dtype in results._columns}
+        results._fill = 0
+        results._rows = rows
+        with open(filename, 'r+b') as f:
+            f.truncate(size)
+        return results
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name, _ in self._columns]
+
+    def __len__(self) -> int:
+        return self._rows + self._fill
+
+    def append(self, **row):
+        """
+        Adds one row.
+        :param row: value of each column
+        :return:
+        """
+        self.extend(**{name: [value] for name, value in row.items()})
+
+    def extend(self, **columns):
+        """
+        Adds several rows at once.
+        :param columns: array of each column, all of the same length
+        :return:
+        """
+        assert set(columns) == set(self.columns), f"Wrong columns: {sorted(columns)}"
+        columns = {name: np.asarray(values) for name, values in columns.items()}
+        length = {values.size for values in columns.values()}
+        assert len(length) == 1, f"Column length mismatch: {length}"
+
+        done, length = 0, length.pop()
+        while done < length:
+            num = min(length - done, self._chunksize - self._fill)
+            for name, values in columns.items():
+                self._buffer[name][self._fill:self._fill + num] = values[done:done + num]
+            self._fill += num
+            done += num
+            if self._fill == self._chunksize:
+                self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows to the csv file.
+        :return:
+        """
+        if self._fill == 0:
+            return
+
+        index = np.arange(self._rows, self._rows + self._fill)
+        with open(self._filename, 'at', newline='') as f:
+            csv.writer(f).writerows(zip(index.tolist(), *[self._buffer[name][:self._fill].tolist()
+                                                         for name in self.columns]))
+        self._rows += self._fill
+        self._fill = 0
+
+    def _key(self, by: List[str]):
+        """
+        Returns a function, which parses the sort key out of a csv row.
+        """
+        converters = {np.dtype(bool): lambda value: value == 'True'}
+        columns = {name: (idx + 1, dtype) for idx, (name, dtype) in enumerate(self._columns)}  # first is the index
+        parse = [(columns[name][0], converters.get(columns[name][1], float)) for name in by]
+        return lambda row: tuple(convert(row[idx]) for idx, convert in parse)
+
+    def sort(self, by: List[str], ascending: bool = False):
+        """
+        Sorts the rows of the csv file in place. If there are more rows than a chunk, sorted runs of chunksize rows are
+        written to temporary files first and merged afterwards (external merge sort), so the memory use stays bounded.
+        :param by: list of columns to sort by
+        :param ascending:
+        :return:
+        """
+        self.flush()
+        key = self._key(by)
+        directory = os.path.dirname(os.path.abspath(self._filename))
+
+        with open(self._filename, 'rt', newline='') as f:
+            header = []
+            while True:
+                line = f.readline()
+                if not line.startswith('#'):
+                    break
+                header.append(line)
+            header.append(line)
+
+            runs = []
+            try:
+                reader = csv.reader(f)
+                while True:
+                    chunk = [row for _, row in zip(range(self._chunksize), reader)]
+                    if not chunk:
+                        break
+                    chunk.sort(key=key, reverse=not ascending)
+                    run = tempfile.TemporaryFile('w+t', newline='', dir=directory)
+                    csv.writer(run).writerows(chunk)
+                    run.seek(0)
+                    runs.append(run)
+
+                fd, tmp = tempfile.mkstemp(dir=directory, suffix='.csv')
+                with os.fdopen(fd, 'wt', newline='') as out:
+                    out.writelines(header)
+                    csv.writer(out).writerows(heapq.merge(*[csv.reader(run) for run in runs], key=key,
+                                                          reverse=not ascending))
+            finally:
+                for run in runs:
+                    run.close()
+
+        os.replace(tmp, self._filename)
+
+    def frame(self):
+        """
+        Reads the rows back into a pandas DataFrame.
+        :return:
+        """
+        import pandas as pd
+
+        self.flush()
+        return pd.read_csv(self._filename, comment='#', index_col=0)
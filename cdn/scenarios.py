@@ -0,0 +1,213 @@
+import json
+import multiprocessing
+import numpy as np
+from cdn import LiveTV, FactorizedLiveTV, Memo, Store
+from cdn.montecarlo import MonteCarlo
+from cdn.results import Results
+from cdn.pareto import Pareto
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+# the Monte Carlo models of a worker process, see Scenarios.run()
+_montecarlos = None
+
+
+def _init(montecarlos):
+    global _montecarlos
+    _montecarlos = montecarlos
+
+
+def _block(args) -> Tuple[int, Dict[str, np.ndarray]]:
+    idx, seed, num = args
+    return idx, _montecarlos[idx].block(seed, num)
+
+
+class Scenarios:
+    # parameters of a scenario, the same as the options of the cli (and their units), the ones of the request profile
+    # first
+    profile = ['channels', 'zipf', 'timeshift', 'fragmentlen', 'profiles', 'bandwidths']
+    parameters = profile + ['peak', 'pops', 'iterations', 'seed']
+
+    def __init__(self, scenarios: List[Dict[str, object]], store: Optional[Store] = None):
+        """
+        Batch of sizing scenarios: the scenarios of the same request profile share one LiveTV, which is built once.
+        :param scenarios: list of scenario parameters, see parameters, with an optional name
+        :param store: profile store of the LiveTV builds, see Store
+        """
+        self._names = []
+        self._montecarlos = []
+        self._iterations = []
+        self._seeds = []
+        profiles, zipfs = {}, {}
+        for n, scenario in enumerate(scenarios):
+            missing = set(self.parameters) - {'seed'} - set(scenario)
+            unknown = set(scenario) - set(self.parameters) - {'name'}
+            assert not missing and not unknown, f"Wrong scenario {n}, missing: {missing}, unknown: {unknown}"
+            # the same profile however its values are written, e.g. "1.2" and 1.2, 6 and 6.0, a csv is fitted once
+            if str(scenario['zipf']) not in zipfs:
+                zipfs[str(scenario['zipf'])] = self.zipf(scenario['zipf'])[0]
+            values = [int(scenario['channels']), zipfs[str(scenario['zipf'])]] + \
+                     [[float(value) for value in scenario[name]] if isinstance(scenario[name], (list, tuple))
+                      else float(scenario[name]) for name in self.profile[2:]]
+            key = json.dumps(values)
+            if key not in profiles:
+                profiles[key] = self.livetv(*values, store=store)
+
+            self._names.append(str(scenario.get('name', n)))
+            self._montecarlos.append(MonteCarlo(profiles[key], scenario['pops'], scenario['peak'] * 1000 ** 4))
+            self._iterations.append(scenario['iterations'])
+            self._seeds.append(scenario.get('seed'))
+        assert len(set(self._names)) == len(self._names), f"Duplicate scenario names: {self._names}"
+        self._profiles = len(profiles)
+
+    @classmethod
+    def load(cls, filename: str, store: Optional[Store] = None) -> 'Scenarios':
+        """
+        Reads the scenarios of a json file, either a list of scenarios or an object of the scenarios (list) and of
+        defaults for all of them (object), e.g. {"defaults": {"channels": 300, ...}, "scenarios": [{"peak": 10}, ...]}.
+        :param filename:
+        :param store: see __init__()
+        :return:
+        """
+        with open(filename) as f:
+            content = json.load(f)
+        if isinstance(content, list):
+            content = {'scenarios': content}
+        return cls([dict(content.get('defaults', {}), **scenario) for scenario in content['scenarios']], store)
+
+    @staticmethod
+    def zipf(zipf: Union[float, str]) -> Tuple[float, Optional[Tuple[float, float]]]:
+        """
+        Zipf parameter of the cli option.
+        :param zipf: zipf parameter (a number or its string) or a csv file of the channel request counts (last column)
+               to fit it to
+        :return: tuple of (parameter, its 95% confidence interval if fitted else None)
+        """
+        try:
+            return float(zipf), None
+        except ValueError:
+            import pandas as pd
+            from cdn.zipf import fit
+            s, low, high = fit(pd.read_csv(zipf, header=None).iloc[:, -1].to_numpy())
+            return s, (low, high)
+
+    @staticmethod
+    def livetv(channels: int, zipf, timeshift: List[float], fragmentlen: float, profiles: List[float],
+               bandwidths: List[float], store: Optional[Store] = None, compact: bool = False,
+               memo: Optional[Memo] = None) -> LiveTV:
+        """
+        Builds the request profile of the cli options.
+        :param channels: number of channels
+        :param zipf: see zipf()
+        :param timeshift: timeshift length, mean and stddev (h)
+        :param fragmentlen: length of a streaming fragment (s)
+        :param profiles: weights of profiles
+        :param bandwidths: profile bandwidths (Mbps)
+        :param store: see Store
+        :param compact: see LiveTV
+        :param memo: builds a FactorizedLiveTV with this memo instead (store and compact are not used)
+        :return:
+        """
+        s, _ = Scenarios.zipf(zipf)
+        tslen, tsmean, tsstddev = (hours * 60 * 60 for hours in timeshift)
+        args = (channels, round(tslen / fragmentlen), np.array(profiles, dtype=float),
+                np.array(bandwidths) * 1000 * 1000 / 8 * fragmentlen, s, tsmean / fragmentlen, tsstddev / fragmentlen)
+        return FactorizedLiveTV(*args, memo) if memo is not None else LiveTV(*args, store, compact)
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    @property
+    def profiles(self) -> int:
+        """
+        Number of distinct request profiles (LiveTV builds).
+        """
+        return self._profiles
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def run(self, workers: int = 1, blocksize: int = 10000) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+        """
+        Evaluates the random designs of all scenarios block by block over a pool of workers. The blocks of a scenario
+        are seeded as in MonteCarlo.run(), so a scenario gives the same designs as a cli run of its seed.
+        :param workers: number of worker processes, 1 runs in this process
+        :param blocksize: number of designs in a block
+        :return: iterator of (scenario name, result columns of a block), in order
+        """
+        assert workers > 0, f"non positive number of workers: {workers}"
+        blocks = []
+        for idx, (iterations, seed) in enumerate(zip(self._iterations, self._seeds)):
+            sizes = [min(blocksize, iterations - done) for done in range(0, iterations, blocksize)]
+            blocks.extend(zip([idx] * len(sizes), np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+
+        if workers == 1:
+            _init(self._montecarlos)
+            results = map(_block, blocks)
+        else:
+            pool = multiprocessing.Pool(workers, initializer=_init, initargs=(self._montecarlos,))
+            results = pool.imap(_block, blocks)
+        try:
+            for idx, block in results:
+                yield self._names[idx], block
+        finally:
+            if workers > 1:
+                pool.terminate()
+
+    def save(self, filename: str, paretofilename: Optional[str] = None, workers: int = 1, header: str = "",
+             objectives: Optional[List[str]] = None) -> Tuple[Results, Dict[str, Pareto]]:
+        """
+        Runs the scenarios into one result csv, the rows tagged by their scenario, and the Pareto frontiers of the
+        scenarios into another one.
+        :param filename: csv file of the results
+        :param paretofilename: csv file of the Pareto frontiers, None not to write them
+        :param workers: see run()
+        :param header: see Results
+        :param objectives: see Pareto
+        :return: tuple of (results, Pareto frontier of each scenario)
+        """
+        columns = [('scenario', object)] + MonteCarlo.columns
+        results = Results(filename, columns, header=header)
+        paretos = {name: Pareto(MonteCarlo.columns, objectives) for name in self._names}
+        for name, block in self.run(workers):
+            results.extend(scenario=np.full(len(block['cost']), name, dtype=object), **block)
+            paretos[name].extend(**block)
+        results.sort(by=['valid', 'cost'], ascending=False)
+
+        if paretofilename is not None:
+            frontiers = Results(paretofilename, columns, header=header)
+            for name, pareto in paretos.items():
+                frontier = pareto.frontier
+                frontiers.extend(scenario=np.full(len(pareto), name, dtype=object), **frontier)
+            frontiers.flush()
+        return results, paretos
+
+
+if __name__ == '__main__':
+    import argparse
+    import datetime
+    import time
+
+    parser = argparse.ArgumentParser(description='CDN designer, batch of scenarios.')
+    parser.add_argument('scenarios', help=f"json file of the scenarios, a list of objects of {Scenarios.parameters} "
+                                          f"(and name), or an object of defaults and scenarios")
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--store', metavar='DIR', help='profile store, see the --store option of the cli')
+    parser.add_argument('--output', help='csv file of the results (default: /data/scenarios<now>.csv)')
+    parser.add_argument('--pareto', nargs='+', choices=list(Pareto.senses), default=['cost', 'util_ec', 'util_mc'],
+                        metavar='COLUMN', help=f'objectives of the Pareto frontiers ({", ".join(Pareto.senses)})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scenarios = Scenarios.load(args.scenarios, Store(args.store) if args.store else None)
+    print(f"{len(scenarios)} scenarios, {scenarios.profiles} request profiles built in "
+          f"{time.perf_counter() - start:.1f} s")
+
+    filename = args.output or f"/data/scenarios{datetime.datetime.now()}.csv"
+    results, paretos = scenarios.save(filename, f"{filename[:-4]}_pareto.csv", args.workers,
+                                      header=f"Scenarios of {args.scenarios}\n", objectives=args.pareto)
+    print(f"{len(results)} designs evaluated in {time.perf_counter() - start:.1f} s, written to {filename}")
+    for name, pareto in paretos.items():
+        valid = pareto.frontier['cost'][pareto.frontier['valid']]
+        print(f"{name}: {len(pareto)} designs on the Pareto frontier, cheapest valid: "
+              f"{np.min(valid) if valid.size else np.nan:.0f} €")
@@ -0,0 +1,632 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence, Tuple
+
+try:
+    import numba
+except ImportError:  # the caches are simulated vectorized, chunk by chunk
+    numba = None
+
+# whether new caches replay the requests one by one in the compiled kernels below (numba is needed)
+compiled = numba is not None
+
+
+def _jit(function=None, nrt: bool = True):
+    """
+    Compiles a kernel with numba, if it is installed.
+    :param nrt: False for the helpers of the kernels, which allocate no arrays: the reference counts of their array
+           arguments are not updated on each call then
+    """
+    if function is None:
+        return lambda function: _jit(function, nrt)
+    return numba.njit(cache=True, nogil=True, _nrt=nrt)(function) if numba is not None else function
+
+
+class _Slots:
+    def __init__(self, **columns: type):
+        """
+        Contents of a cache for the compiled kernels: an open addressing hash table of the content ids to slots in
+        column arrays, rows of (id, slot), the slot is -1 if the row is empty. The slots of the removed contents are
+        spare, they are taken again first.
+        :param columns: dtype of each column, besides the ids, (dtype, n) for n values per slot
+        """
+        self.hashtable = np.full((16, 2), -1, dtype=np.int64)
+        self.counters = np.zeros(2, dtype=np.int64)  # slots taken so far, spare slots
+        self.spare = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self._dtypes = columns
+        for name, dtype in columns.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+
+    @property
+    def taken(self) -> np.ndarray:
+        """
+        Which ones of the slots taken so far hold a content.
+        """
+        taken = np.ones(self.counters[0], dtype=bool)
+        taken[self.spare[:self.counters[1]]] = False
+        return taken
+
+    def replay(self, kernel, columns: Sequence[str], *args):
+        """
+        Runs a kernel on the requests, it stops at a new content, which does not fit (see _slot()), and goes on after
+        the arrays are grown to twice their size.
+        :param kernel: compiled kernel of (hashtable, spare, counters, first request, ids, *columns, *args), which
+               returns the request it stopped at, -1 at the end
+        :param columns: names of the columns passed to kernel
+        :param args: further arguments of kernel
+        """
+        start = 0
+        while start >= 0:
+            if self.counters[1] == 0 and self.counters[0] == self.ids.size:
+                for name, dtype in dict(self._dtypes, spare=np.int64, ids=np.int64).items():
+                    column = np.zeros(max(2 * self.ids.size, 16), dtype=dtype)
+                    column[:self.ids.size] = getattr(self, name)
+                    setattr(self, name, column)
+            if 2 * (self.counters[0] - self.counters[1] + 1) > len(self.hashtable):
+                hashtable = self.hashtable
+                self.hashtable = np.full((2 * len(hashtable), 2), -1, dtype=np.int64)
+                _rehash(hashtable, self.hashtable)
+            start = kernel(self.hashtable, self.spare, self.counters, start, self.ids,
+                           *(getattr(self, name) for name in columns), *args)
+
+
+@_jit(nrt=False)
+def _home(hashtable, content):
+    """
+    Returns the position of a content in the hash table without collisions (multiplicative hashing).
+    """
+    return (content * -7046029254386353131 >> 32) & (len(hashtable) - 1)
+
+
+@_jit(nrt=False)
+def _find(hashtable, content):
+    """
+    Returns the position of a content in the hash table, or of the empty row, where it goes (linear probing).
+    """
+    i = _home(hashtable, content)
+    while hashtable[i, 1] >= 0 and hashtable[i, 0] != content:
+        i = (i + 1) & (len(hashtable) - 1)
+    return i
+
+
+@_jit(nrt=False)
+def _rehash(hashtable, empty):
+    """
+    Inserts the rows of a hash table into an empty one.
+    """
+    for i in range(len(hashtable)):
+        if hashtable[i, 1] >= 0:
+            j = _find(empty, hashtable[i, 0])
+            empty[j, 0], empty[j, 1] = hashtable[i, 0], hashtable[i, 1]
+
+
+# number of requests, whose rows in the hash table are found at once, see _lookup()
+_BLOCK = 256
+
+
+@_jit(nrt=False)
+def _lookup(hashtable, content, found):
+    """
+    Finds the rows of a block of requests in the hash table ahead of a kernel: read only, so the memory accesses of
+    the requests overlap, they wait for the updates of the earlier requests in a kernel.
+    """
+    for i in range(content.size):
+        found[i] = _find(hashtable, content[i])
+
+
+@_jit(nrt=False)
+def _slot(hashtable, spare, counters, content, row):
+    """
+    Returns the slot of a content and whether it is new, a spare or the next slot is taken for a new one. The slot is
+    -1, if the columns are full or the hash table would be more than half full.
+    :param row: row of the content found by _lookup(), it is found again, if the hash table changed meanwhile
+    """
+    i = row if hashtable[row, 1] >= 0 and hashtable[row, 0] == content else _find(hashtable, content)
+    if hashtable[i, 1] >= 0:
+        return hashtable[i, 1], False
+    if counters[1] == 0 and counters[0] == spare.size or 2 * (counters[0] - counters[1] + 1) > len(hashtable):
+        return -1, True
+    if counters[1] > 0:
+        counters[1] -= 1
+        slot = spare[counters[1]]
+    else:
+        slot = counters[0]
+        counters[0] += 1
+    hashtable[i, 0], hashtable[i, 1] = content, slot
+    return slot, True
+
+
+@_jit(nrt=False)
+def _free(hashtable, spare, counters, content):
+    """
+    Removes a content from the hash table (backward shift deletion), its slot is spare.
+    """
+    mask = len(hashtable) - 1
+    i = _find(hashtable, content)
+    spare[counters[1]] = hashtable[i, 1]
+    counters[1] += 1
+    hashtable[i, 1] = -1
+    j = i
+    while True:
+        j = (j + 1) & mask
+        if hashtable[j, 1] < 0:
+            return
+        # the row at j is moved back, unless the home of its content is cyclically in (i, j]
+        home = _home(hashtable, hashtable[j, 0])
+        if (i < home <= j) if i <= j else (i < home or home <= j):
+            continue
+        hashtable[i, 0], hashtable[i, 1] = hashtable[j, 0], hashtable[j, 1]
+        hashtable[j, 1] = -1
+        i = j
+
+
+@_jit
+def _count(hashtable, spare, counters, start, ids, sizes, counts, content, size, rows):
+    """
+    Counts the requests of the contents, the rows are their slots.
+    """
+    found = np.empty(_BLOCK, dtype=np.int64)
+    for i in range(start, content.size):
+        if (i - start) % _BLOCK == 0:
+            _lookup(hashtable, content[i:i + _BLOCK], found)
+        slot, new = _slot(hashtable, spare, counters, content[i], found[(i - start) % _BLOCK])
+        if slot < 0:
+            return i
+        if new:
+            ids[slot], sizes[slot], counts[slot] = content[i], size[i], 0
+        counts[slot] += 1
+        rows[i] = slot
+    return -1
+
+
+@_jit
+def _lru(hashtable, spare, counters, start, ids, entries, queue, ends, capacity, content, size, hits):
+    """
+    Replays the requests on an LRU cache: the entries of the slots are (size, time stamp), each request is queued
+    (slot, time stamp, content), the contents are evicted from the head of the queue, where the ones requested again
+    later are skipped. A content takes the size of its last request, like in the vectorized LRU. ends holds the head
+    and the tail of the queue, the cached bytes and the next time stamp. The queue has two entries per slot, so it has
+    room after it is compacted.
+    """
+    entries, queue = entries.reshape(-1, 2), queue.reshape(-1, 3)
+    head, tail, used, clock = ends[0], ends[1], ends[2], ends[3]
+    stop = -1
+    found = np.empty(_BLOCK, dtype=np.int64)
+    for i in range(start, content.size):
+        if (i - start) % _BLOCK == 0:
+            _lookup(hashtable, content[i:i + _BLOCK], found)
+        slot, new = _slot(hashtable, spare, counters, content[i], found[(i - start) % _BLOCK])
+        if slot < 0:
+            stop = i
+            break
+        hits[i] = not new
+        if new:
+            ids[slot] = content[i]
+        else:
+            used -= entries[slot, 0]
+        used += size[i]
+        entries[slot, 0], entries[slot, 1] = size[i], clock
+
+        if tail == len(queue):
+            n = 0
+            for j in range(head, tail):
+                if entries[queue[j, 0], 1] == queue[j, 1]:
+                    queue[n, 0], queue[n, 1], queue[n, 2] = queue[j, 0], queue[j, 1], queue[j, 2]
+                    n += 1
+            head, tail = 0, n
+        queue[tail, 0], queue[tail, 1], queue[tail, 2] = slot, clock, content[i]
+        tail += 1
+        clock += 1
+
+        while used > capacity:
+            if entries[queue[head, 0], 1] == queue[head, 1]:
+                used -= entries[queue[head, 0], 0]
+                _free(hashtable, spare, counters, queue[head, 2])
+            head += 1
+    ends[0], ends[1], ends[2], ends[3] = head, tail, used, clock
+    return stop
+
+
+@_jit
+def _ttl(hashtable, spare, counters, start, ids, sizes, times, ttl, content, size, time, hits):
+    """
+    Replays the requests on a TTL cache, times are the last requests of the contents.
+    """
+    found = np.empty(_BLOCK, dtype=np.int64)
+    for i in range(start, content.size):
+        if (i - start) % _BLOCK == 0:
+            _lookup(hashtable, content[i:i + _BLOCK], found)
+        slot, new = _slot(hashtable, spare, counters, content[i], found[(i - start) % _BLOCK])
+        if slot < 0:
+            return i
+        hits[i] = not new and time[i] - times[slot] < ttl
+        ids[slot], sizes[slot], times[slot] = content[i], size[i], time[i]
+    return -1
+
+
+@_jit
+def _remove(hashtable, spare, counters, ids, removed):
+    """
+    Removes the contents of the slots, which are removed (and taken).
+    """
+    for slot in range(counters[0]):
+        if removed[slot] and hashtable[_find(hashtable, ids[slot]), 1] == slot:
+            _free(hashtable, spare, counters, ids[slot])
+
+
+def _links(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the position of the previous and of the next request of the same content for each request, -1 and the
+    number of requests if there is none.
+    :param codes: non negative integer content codes of the requests
+    :return: tuple of (previous positions, next positions)
+    """
+    m = codes.size
+
+    # stable radix sort by 16 bit digits (numpy sorts 16 bit integers stably in linear time)
+    order = np.arange(m)
+    for shift in range(0, max(int(np.max(codes, initial=0)).bit_length(), 1), 16):
+        order = order[np.argsort((codes[order] >> shift & 0xffff).astype(np.uint16), kind='stable')]
+
+    same = codes[order[1:]] == codes[order[:-1]]
+    prev, next_ = np.full(m, -1, dtype=np.int64), np.full(m, m, dtype=np.int64)
+    prev[order[1:][same]] = order[:-1][same]
+    next_[order[:-1][same]] = order[1:][same]
+    return prev, next_
+
+
+def _rangeleq(values: np.ndarray, weights: np.ndarray, left: np.ndarray, right: np.ndarray, threshold: np.ndarray,
+              budget: np.ndarray) -> np.ndarray:
+    """
+    Offline range queries on a wavelet matrix: whether the sum of the weights at the positions left <= j < right, where
+    values is above threshold, is at most budget, for all queries at once, bit by bit (a stable partition and prefix
+    sums a bit). The decided queries are dropped, and so are the positions out of the ranges of the rest.
+    :param values: non negative integer values
+    :param weights: non negative integer weights of the values
+    :param left: first positions of the ranges
+    :param right: positions after the ranges
+    :param threshold: thresholds of the queries
+    :param budget: budgets of the queries
+    :return: boolean array
+    """
+    result = np.zeros(left.size, dtype=bool)
+    queries = np.arange(left.size)
+    total = np.zeros(left.size, dtype=np.int64)
+    values = values.astype(np.int32 if values.size < np.iinfo(np.int32).max else np.int64)
+    for level in range(int(max(np.max(values, initial=0), np.max(threshold, initial=0))).bit_length() - 1, -1, -1):
+        m = values.size
+        bits = (values >> level) & 1 == 1
+        ones, ones1, all1 = np.zeros(m + 1, dtype=np.int64), np.zeros(m + 1, dtype=np.int64), \
+            np.zeros(m + 1, dtype=np.int64)
+        np.cumsum(bits, out=ones[1:])
+        np.cumsum(np.where(bits, weights, 0), out=ones1[1:])
+        np.cumsum(weights, out=all1[1:])
+
+        # the values with the same higher bits and a 1 here are above a threshold with 0 here, the rest may be
+        below = (threshold >> level) & 1 == 0
+        total += np.where(below, ones1[right] - ones1[left], 0)
+        rest = np.where(below, (all1[right] - all1[left]) - (ones1[right] - ones1[left]), ones1[right] - ones1[left])
+        decided = (total > budget) | (total + rest <= budget)
+        result[queries[decided]] = total[decided] <= budget[decided]
+        zeros = m - ones[m]
+        left = np.where(below, left - ones[left], zeros + ones[left])[~decided]
+        right = np.where(below, right - ones[right], zeros + ones[right])[~decided]
+        queries, total, threshold, budget = queries[~decided], total[~decided], threshold[~decided], budget[~decided]
+        if not queries.size:
+            return result
+
+        order = np.concatenate([np.flatnonzero(~bits), np.flatnonzero(bits)])
+        values, weights = values[order], weights[order]
+
+        # keep only the positions in the ranges, if it is worth it
+        inside = np.cumsum(np.bincount(left, minlength=m + 1) - np.bincount(right, minlength=m + 1))[:m] > 0
+        if np.count_nonzero(inside) < m / 2:
+            position = np.concatenate([[0], np.cumsum(inside)])
+            left, right = position[left], position[right]
+            values, weights = values[inside], weights[inside]
+
+    result[queries] = total <= budget
+    return result
+
+
+def catalog(ids: np.ndarray, sizes: np.ndarray, content: np.ndarray, size: np.ndarray, *columns: np.ndarray) -> tuple:
+    """
+    Adds the new contents of a chunk of requests to a catalog ordered by id.
+    :param ids: content ids of the catalog, ordered
+    :param sizes: content sizes of the catalog (Byte)
+    :param content: content ids of the requests
+    :param size: content sizes of the requests (Byte)
+    :param columns: further arrays of the catalog, the new contents get zeros
+    :return: tuple of (ids, sizes, catalog rows of the requests, *columns)
+    """
+    codes, unique = pd.factorize(content, sort=True)
+    first = np.empty(unique.size, dtype=np.int64)
+    first[codes[::-1]] = np.arange(codes.size)[::-1]
+    pos = np.searchsorted(ids, unique)
+    new = (pos == ids.size) | (np.append(ids, 0)[pos] != unique)
+    ids, sizes = np.insert(ids, pos[new], unique[new]), np.insert(sizes, pos[new], size[first[new]])
+    return (ids, sizes, np.searchsorted(ids, unique)[codes]) + \
+        tuple(np.insert(column, pos[new], 0) for column in columns)
+
+
+class Catalog:
+    def __init__(self):
+        """
+        Sizes and request counts of the contents requested so far, counted in a compiled kernel (see compiled), or
+        chunk by chunk by catalog() otherwise.
+        """
+        self._ids = np.empty(0, dtype=np.int64)
+        self._sizes = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._slots = _Slots(sizes=np.int64, counts=np.int64) if compiled else None
+
+    def feed(self, content: np.ndarray, size: np.ndarray):
+        """
+        Counts a chunk of requests.
+        :param content: integer content ids
+        :param size: content sizes (Byte)
+        """
+        content, size = np.asarray(content, dtype=np.int64), np.asarray(size, dtype=np.int64)
+        if self._slots is not None:
+            self._slots.replay(_count, ['sizes', 'counts'], content, size, np.empty(content.size, dtype=np.int64))
+        else:
+            self._ids, self._sizes, rows, self._counts = catalog(self._ids, self._sizes, content, size, self._counts)
+            self._counts += np.bincount(rows, minlength=self._ids.size)
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the ids, sizes and request counts of the contents, ordered by id.
+        """
+        if self._slots is not None:
+            n = self._slots.counters[0]
+            order = np.argsort(self._slots.ids[:n])
+            return self._slots.ids[order], self._slots.sizes[order], self._slots.counts[order]
+        return self._ids, self._sizes, self._counts
+
+
+class LRU:
+    def __init__(self, capacity: float):
+        """
+        Least recently used cache of capacity bytes, simulated request by request in a compiled kernel (see
+        compiled), or chunk by chunk on arrays otherwise. The contents of an LRU cache are always the most recently
+        requested ones, which fit, so a request hits, if the distinct contents requested since the previous request of
+        the same content fit into the cache together with it (stack distance). Each chunk is prepended with the cached
+        contents requested in it, the rest of the cache is kept as byte gaps between them.
+        :param capacity: cache size (Byte)
+        """
+        assert capacity >= 0, f"negative capacity: {capacity}"
+        self._capacity = capacity
+
+        # cached contents, from the least recently requested one
+        self._ids = np.empty(0, dtype=np.int64)
+        self._sizes = np.empty(0, dtype=np.int64)
+
+        # or the ones of the kernel, see _lru()
+        self._slots = _Slots(entries=(np.int64, 2), queue=(np.int64, 6)) if compiled else None
+        self._ends = np.zeros(4, dtype=np.int64)
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    @property
+    def volume(self) -> int:
+        return int(self._ends[2]) if self._slots is not None else int(np.sum(self._sizes))
+
+    def feed(self, content: np.ndarray, size: np.ndarray, time: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Replays a chunk of requests.
+        :param content: integer content ids
+        :param size: content sizes (Byte)
+        :param time: not used
+        :return: boolean array of the hits
+        """
+        content, size = np.asarray(content, dtype=np.int64), np.asarray(size, dtype=np.int64)
+        if content.size == 0:
+            return np.zeros(0, dtype=bool)
+        if self._slots is not None:
+            hits = np.empty(content.size, dtype=bool)
+            self._slots.replay(_lru, ['entries', 'queue'], self._ends, self._capacity, content, size, hits)
+            return hits
+
+        # cached contents requested in the chunk, each followed by the bytes of the cached ones up to the next
+        cached = pd.Index(self._ids).get_indexer(content)
+        requested = np.unique(cached[cached >= 0])
+        volumes = np.concatenate([[0], np.cumsum(self._sizes)])
+        gaps = volumes[np.append(requested[1:], self._ids.size)] - volumes[requested + 1]
+        codes, _ = pd.factorize(np.concatenate([self._ids[requested], content]))
+        head = np.empty(2 * requested.size, dtype=np.int64)
+        head[0::2], head[1::2] = codes[:requested.size], codes.max(initial=0) + 1 + np.arange(requested.size)
+        weights = np.empty(2 * requested.size, dtype=np.int64)
+        weights[0::2], weights[1::2] = self._sizes[requested], gaps
+        codes = np.concatenate([head, codes[requested.size:]])
+        weights = np.concatenate([weights, size])
+
+        # distinct bytes since the previous request, bounded by all the bytes and by the first or the last requests
+        prev, next_ = _links(codes)
+        query = np.flatnonzero(prev[head.size:] >= 0) + head.size
+        left, right = prev[query] + 1, query
+        upper = np.concatenate([[0], np.cumsum(weights)])
+        first = np.concatenate([[0], np.cumsum(np.where(prev < 0, weights, 0))])
+        last = np.concatenate([[0], np.cumsum(np.where(next_ == codes.size, weights, 0))])
+        need = self._capacity - weights[query]
+        hit = upper[right] - upper[left] <= need
+        open_ = ~hit & (np.maximum(first[right] - first[left], last[right] - last[left]) <= need)
+
+        # the last requests are always counted, the rest is summed on the wavelet matrix
+        again = np.flatnonzero(next_ < codes.size)
+        rank = np.searchsorted(again, np.stack([left[open_], right[open_]]))
+        hit[open_] = _rangeleq(next_[again], weights[again], rank[0], rank[1], query[open_],
+                               need[open_] - (last[right[open_]] - last[left[open_]]))
+        hits = np.zeros(codes.size, dtype=bool)
+        hits[query[hit]] = True
+
+        # the cache is the most recently requested contents, which fit
+        final = np.flatnonzero(next_[head.size:] == codes.size)
+        kept = np.ones(self._ids.size, dtype=bool)
+        kept[requested] = False
+        ids = np.concatenate([self._ids[kept], content[final]])
+        sizes = np.concatenate([self._sizes[kept], size[final]])
+        fit = np.count_nonzero(np.cumsum(sizes[::-1]) <= self._capacity)
+        self._ids, self._sizes = ids[ids.size - fit:], sizes[sizes.size - fit:]
+
+        return hits[head.size:]
+
+
+class LFU:
+    def __init__(self, capacity: float, period: Optional[int] = None):
+        """
+        Least frequently used cache of capacity bytes: it holds the most often requested contents so far, which fit
+        (like the ideal cache of Request.split()), refreshed every period requests. The requests are counted in a
+        compiled kernel (see compiled), or chunk by chunk on arrays otherwise.
+        :param capacity: cache size (Byte)
+        :param period: number of requests between the refreshes, None to refresh after each chunk
+        """
+        assert capacity >= 0, f"negative capacity: {capacity}"
+        assert period is None or period > 0, f"non positive period: {period}"
+        self._capacity = capacity
+        self._period = period
+        self._since = 0  # requests since the last refresh
+
+        # all the contents requested so far, ordered by id
+        self._ids = np.empty(0, dtype=np.int64)
+        self._sizes = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._cached = np.empty(0, dtype=bool)
+
+        # or the ones of the kernel, see _count()
+        self._slots = _Slots(sizes=np.int64, counts=np.int64, cached=bool) if compiled else None
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    @property
+    def volume(self) -> int:
+        _, sizes, _, cached = self._columns()
+        return int(np.sum(sizes[cached]))
+
+    def _columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the ids, sizes, request counts and whether they are cached of the contents requested so far.
+        """
+        if self._slots is not None:
+            n = self._slots.counters[0]
+            return tuple(getattr(self._slots, name)[:n] for name in ('ids', 'sizes', 'counts', 'cached'))
+        return self._ids, self._sizes, self._counts, self._cached
+
+    def feed(self, content: np.ndarray, size: np.ndarray, time: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Replays a chunk of requests.
+        :param content: integer content ids
+        :param size: content sizes (Byte)
+        :param time: not used
+        :return: boolean array of the hits
+        """
+        content, size = np.asarray(content, dtype=np.int64), np.asarray(size, dtype=np.int64)
+        if content.size == 0:
+            return np.zeros(0, dtype=bool)
+        period = self._period or content.size
+        bounds = np.append(np.arange(period - self._since, content.size, period), content.size)
+        hits = np.zeros(content.size, dtype=bool)
+        for start, stop in zip(np.concatenate([[0], bounds[:-1]]), bounds):
+            if self._slots is not None:
+                rows = np.empty(stop - start, dtype=np.int64)
+                self._slots.replay(_count, ['sizes', 'counts'], content[start:stop], size[start:stop], rows)
+                hits[start:stop] = self._slots.cached[rows]
+            else:
+                self._ids, self._sizes, rows, self._counts, self._cached = \
+                    catalog(self._ids, self._sizes, content[start:stop], size[start:stop], self._counts, self._cached)
+                hits[start:stop] = self._cached[rows]
+                self._counts += np.bincount(rows, minlength=self._ids.size)
+            self._since += stop - start
+
+            if self._since == period:
+                self._refresh()
+                self._since = 0
+        return hits
+
+    def _refresh(self):
+        """
+        Caches the most often requested contents, which fit, the lower ids first on a tie: the bytes of each request
+        count give the count at the boundary, only its contents are sorted.
+        """
+        ids, sizes, counts, cached = self._columns()
+        volumes = np.cumsum(np.bincount(counts, weights=sizes)[::-1])[::-1]
+        boundary = np.count_nonzero(volumes > self._capacity) - 1
+        np.greater(counts, boundary, out=cached)
+        if boundary >= 0:
+            tied = np.flatnonzero(counts == boundary)
+            tied = tied[np.argsort(ids[tied])]
+            room = self._capacity - (volumes[boundary + 1] if boundary + 1 < volumes.size else 0)
+            cached[tied[np.cumsum(sizes[tied]) <= room]] = True
+
+
+class TTL:
+    def __init__(self, ttl: float):
+        """
+        Time to live cache: a content is kept ttl seconds after its last request, so a request hits, if the same
+        content was requested less than ttl seconds before. The size of the cache is not limited. It is simulated
+        request by request in a compiled kernel (see compiled), or chunk by chunk on arrays otherwise.
+        :param ttl: time to live (s)
+        """
+        assert ttl >= 0, f"negative ttl: {ttl}"
+        self._ttl = ttl
+
+        # contents requested in the last ttl seconds and the time of their last request
+        self._ids = np.empty(0, dtype=np.int64)
+        self._sizes = np.empty(0, dtype=np.int64)
+        self._times = np.empty(0, dtype=float)
+
+        # or the ones of the kernel, see _ttl()
+        self._slots = _Slots(sizes=np.int64, times=float) if compiled else None
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    @property
+    def volume(self) -> int:
+        if self._slots is not None:
+            return int(np.sum(self._slots.sizes[:self._slots.counters[0]][self._slots.taken]))
+        return int(np.sum(self._sizes))
+
+    def feed(self, content: np.ndarray, size: np.ndarray, time: np.ndarray) -> np.ndarray:
+        """
+        Replays a chunk of requests.
+        :param content: integer content ids
+        :param size: content sizes (Byte)
+        :param time: request times (s), not decreasing
+        :return: boolean array of the hits
+        """
+        assert time is not None, "TTL cache needs the request times"
+        content, size = np.asarray(content, dtype=np.int64), np.asarray(size, dtype=np.int64)
+        time = np.asarray(time, dtype=float)
+        if content.size == 0:
+            return np.zeros(0, dtype=bool)
+        if self._slots is not None:
+            slots, hits = self._slots, np.empty(content.size, dtype=bool)
+            slots.replay(_ttl, ['sizes', 'times'], self._ttl, content, size, time, hits)
+            _remove(slots.hashtable, slots.spare, slots.counters, slots.ids,
+                    time[-1] - slots.times[:slots.counters[0]] >= self._ttl)
+            return hits
+
+        # time of the previous request, in the chunk or before it
+        codes, _ = pd.factorize(content)
+        prev, next_ = _links(codes)
+        before = pd.Index(self._ids).get_indexer(content)
+        last = np.where(prev >= 0, time[np.maximum(prev, 0)], np.append(self._times, -np.inf)[before])
+        hits = time - last < self._ttl
+
+        # keep the contents requested in the last ttl seconds
+        final = np.flatnonzero(next_ == content.size)
+        kept = np.ones(self._ids.size, dtype=bool)
+        kept[before[before >= 0]] = False
+        ids = np.concatenate([self._ids[kept], content[final]])
+        sizes = np.concatenate([self._sizes[kept], size[final]])
+        times = np.concatenate([self._times[kept], time[final]])
+        alive = time[-1] - times < self._ttl
+        self._ids, self._sizes, self._times = ids[alive], sizes[alive], times[alive]
+
+        return hits
@@ -0,0 +1,164 @@
+import copy
+import numpy as np
+from cdn import Request
+from typing import Tuple
+
+
+class Sketch(Request):
+    def __init__(self, profile: Request, error: float = 1e-4, resolution: float = 1):
+        """
+        Compressed profile: a table of (cumulative volume, cumulative probability, cumulative bytes) knots, linearly
+        interpolated in between. The volume axis is bisected until the cumulative probability and the (normalized)
+        cumulative bytes grow at most error between the neighboring points. Both are monotonic, so they are bounded
+        between the points, and only those points are kept as knots, which are needed to keep the interpolation within
+        error everywhere, except around single contents more popular than error (their step is resolved to
+        resolution). The steep head gets many knots, the flat tail few.
+        Miss streams are views of the same table, their hit ratio error is amplified by 1 / their probability mass.
+        :param profile: the profile to compress, anything with a sweep() (Request, Factorized, ...)
+        :param error: maximum absolute error of the hit ratio
+        :param resolution: smallest distance of two knots (Byte)
+        """
+        super().__init__()
+        assert 0 < error < 1, f"Wrong error: {error}"
+        assert resolution > 0, f"Wrong resolution: {resolution}"
+        total, meansize = profile.contentbase, profile.meanrequestsize
+
+        def evaluate(volumes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            ratio, _, missmeansize = profile.sweep(volumes)
+            return ratio, meansize - (1 - ratio) * missmeansize
+
+        # refine the segments where the interpolation may be too far off, a quarter of error leaves room for merging
+        knots = np.array([0, total], dtype=float)
+        cum, cumbytes = evaluate(knots)
+        while True:
+            coarse = (np.diff(cum) > error / 4) | (np.diff(cumbytes) > error / 4 * meansize)
+            coarse &= np.diff(knots) > resolution
+            if not np.any(coarse):
+                break
+            idx = np.flatnonzero(coarse) + 1
+            mid = (knots[idx - 1] + knots[idx]) / 2
+            ratio, bytes_ = evaluate(mid)
+            knots, cum, cumbytes = np.insert(knots, idx, mid), np.insert(cum, idx, ratio), np.insert(cumbytes, idx,
+                                                                                                        bytes_)
+
+        # merge the neighboring segments as long as the interpolation stays within error: between two evaluated
+        # volumes, the (monotonic) functions are bounded by their values there, the line is known
+        def within(first: int, last: int) -> bool:
+            x = knots[first:last + 1]
+            for y, tolerance in ((cum[first:last + 1], error), (cumbytes[first:last + 1], error * meansize)):
+                line = y[0] + (y[-1] - y[0]) * (x - x[0]) / (x[-1] - x[0])
+                if max(np.max(y[1:] - line[:-1]), np.max(line[1:] - y[:-1])) > tolerance:
+                    return False
+            return True
+
+        keep = [0]
+        while keep[-1] < knots.size - 1:
+            # gallop, then bisect the farthest knot (a single segment is always kept)
+            first, step = keep[-1], 1
+            while first + 2 * step < knots.size and within(first, first + 2 * step):
+                step *= 2
+            lo, hi = first + step, min(first + 2 * step, knots.size)
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                lo, hi = (mid, hi) if within(first, mid) else (lo, mid)
+            keep.append(lo)
+
+        self._knots, self._cum, self._cumbytes = knots[keep], cum[keep], cumbytes[keep]
+        self._count = profile.numcontents
+        self._total = total
+
+        # the profile holds the contents after the volume _v0, like the views of Request
+        self._v0 = 0
+        self._p0 = 0
+        self._b0 = 0
+        self._norm = self._cum[-1]
+
+    @property
+    def knots(self) -> int:
+        return self._knots.size
+
+    @property
+    def nbytes(self) -> int:
+        return self._knots.nbytes + self._cum.nbytes + self._cumbytes.nbytes
+
+    def _interp(self, volume) -> Tuple[np.ndarray, np.ndarray]:
+        return np.interp(volume, self._knots, self._cum), np.interp(volume, self._knots, self._cumbytes)
+
+    def pmf(self, volume) -> float:
+        # the probability of a content is the slope of the cumulative bytes
+        idx = np.clip(np.searchsorted(self._knots, self._v0 + volume, side='right'), 1, self._knots.size - 1)
+        return (self._cumbytes[idx] - self._cumbytes[idx - 1]) / (self._knots[idx] - self._knots[idx - 1]) / self._norm
+
+    def cdf(self, volume) -> float:
+        if self.contentbase <= 0 or self._norm <= 0:
+            return 1
+        cum, _ = self._interp(self._v0 + volume)
+        return (cum - self._p0) / self._norm
+
+    def miss(self, volume: float):
+        tail = copy.copy(self)
+        tail._v0 = min(self._v0 + max(volume, 0), self._knots[-1])
+        tail._p0, tail._b0 = self._interp(tail._v0)
+        tail._norm = self._cum[-1] - tail._p0
+        return tail
+
+    def sweep(self, volumes, start=0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same as Request.sweep(), but the miss streams are described by the volume before them (0: this profile).
+        """
+        volumes, start = np.broadcast_arrays(np.asarray(volumes, dtype=float), np.asarray(start, dtype=float))
+        head = np.minimum(self._v0 + start, self._knots[-1])
+        end = np.minimum(head + np.maximum(volumes, 0), self._knots[-1])
+        headcum = np.where(start > 0, self._interp(head)[0], self._p0)
+        endcum, endbytes = self._interp(end)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            norm = self._cum[-1] - headcum
+            ratio = np.where(norm > 0, (endcum - headcum) / norm, 1)
+            missnorm = self._cum[-1] - endcum
+            meansize = np.where(missnorm > 0, (self._cumbytes[-1] - endbytes) / missnorm, 0)
+
+        return ratio, end - self._v0, meansize
+
+    def hashing(self, nodes, replication=1, volume=0, start=0,
+                head: int = 256) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # the single contents are not at hand, the stream is spread evenly
+        return self._evenhashing(nodes, replication, volume, start)
+
+    @property
+    def numcontents(self) -> int:
+        # estimated from the volume, exact for equal sized contents
+        return int(round(self._count * self.contentbase / self._total)) if self._total > 0 else 0
+
+    @property
+    def contentbase(self) -> int:
+        return self._knots[-1] - self._v0
+
+    @property
+    def meanrequestsize(self):
+        return (self._cumbytes[-1] - self._b0) / self._norm if self._norm > 0 else 0
+
+    def describe(self):
+        return f"{super().describe()}" \
+               f"Sketch knots: {self.knots} ({self.nbytes / 1000:.1f} kB)\n"
+
+    def plot(self, axs, **kwargs):
+        import matplotlib.pyplot as plt
+
+        if axs is None:
+            fig, axs = plt.subplots(1, 2)
+
+        volumes = self._knots[self._knots >= self._v0]
+        axs[0, 0].plot((volumes - self._v0) / 1000 / 1000 / 1000, self.pmf(volumes - self._v0), **kwargs)
+        axs[0, 0].set_ylabel("probabbility")
+        axs[0, 0].set_xlabel('volume (GB)')
+        axs[0, 0].loglog()
+        axs[0, 0].title.set_text('pmf')
+
+        axs[0, 1].plot((volumes - self._v0) / 1000 / 1000 / 1000, self.cdf(volumes - self._v0), **kwargs)
+        axs[0, 1].set_ylabel("probabbility")
+        axs[0, 1].set_xlabel('volume (GB)')
+        axs[0, 1].title.set_text('cdf')
+
+        if axs is None:
+            plt.show()
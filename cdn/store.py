@@ -0,0 +1,127 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+from cdn import Request
+from typing import Optional
+
+
+class Store:
+    # sorted arrays of a profile, see Request, the distinct sizes of a compact one, and the layout version of the
+    # stored profiles (part of the keys)
+    arrays = ['_pmf', '_cdf', '_size', '_volume', '_bytes']
+    optional = ['_sizetable']
+    version = 1
+
+    def __init__(self, directory: str, budget: float = 10 * 1000 * 1000 * 1000):
+        """
+        Content addressed disk store of built request profiles: the sorted arrays of a profile are written as .npy files
+        in a directory of its key, and are memory mapped (read only) when the profile is loaded again, so processes on
+        the same host share the pages. Profiles are written to a temporary directory and renamed, so concurrent
+        processes can share a store.
+        :param directory: directory of the store, created if needed
+        :param budget: disk budget (Byte), the least recently used profiles are evicted above it
+        """
+        assert budget > 0, f"non positive budget: {budget}"
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._budget = budget
+
+    @staticmethod
+    def key(*params) -> str:
+        """
+        Returns the key of the parameters of a profile, the same for equal values (arrays are keyed by their values).
+        :param params: numbers, strings or arrays
+        :return: hex digest
+        """
+        digest = hashlib.sha256(f"{Store.version}\0".encode())
+        for param in params:
+            digest.update(repr(np.asarray(param, dtype=float).tolist() if not isinstance(param, str) else param)
+                          .encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key)
+
+    def _entries(self):
+        """
+        Returns the list of (last use, size (Byte), path) of the stored profiles.
+        """
+        entries = []
+        for entry in os.scandir(self._directory):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                try:
+                    files = [os.path.join(entry.path, name) for name in os.listdir(entry.path)]
+                    entries.append((entry.stat().st_mtime, sum(os.path.getsize(file) for file in files), entry.path))
+                except FileNotFoundError:
+                    # evicted meanwhile by another process
+                    pass
+        return entries
+
+    @property
+    def nbytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isdir(self._path(key))
+
+    def load(self, key: str, request: Request) -> bool:
+        """
+        Sets the arrays of request to the stored ones, memory mapped.
+        :param key: see key()
+        :param request: profile to fill in, an empty one
+        :return: whether the profile was in the store
+        """
+        path = self._path(key)
+        try:
+            arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in self.arrays}
+            arrays.update({name: np.load(os.path.join(path, f"{name}.npy")) for name in self.optional
+                           if os.path.exists(os.path.join(path, f"{name}.npy"))})
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        for name, values in arrays.items():
+            setattr(request, name, values)
+        return True
+
+    def save(self, key: str, request: Request):
+        """
+        Stores the arrays of a profile and evicts the least recently used profiles above the budget.
+        :param key: see key()
+        :param request: built profile
+        :return:
+        """
+        tmp = tempfile.mkdtemp(dir=self._directory, prefix='.')
+        try:
+            for name in self.arrays + self.optional:
+                if getattr(request, name) is not None:
+                    np.save(os.path.join(tmp, f"{name}.npy"), getattr(request, name))
+            os.rename(tmp, self._path(key))
+        except OSError:
+            # stored meanwhile by another process
+            if key not in self:
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Removes the least recently used profiles until the store is within the budget.
+        :param keep: key of a profile not to remove
+        :return:
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self._budget:
+                break
+            if keep is not None and path == self._path(keep):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
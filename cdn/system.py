@@ -1,17 +1,49 @@
 import numpy as np
 
-from cdn import PoP, Cache, Request
-from typing import Tuple
+from cdn import PoP, Cache, Request, Memo
+from typing import List, Optional, Tuple
 
 
 class System:
-    def __init__(self, numpops: int, request: Request, ec: Cache, mc: Cache):
+    # stages of ingress() after the ones of the PoP (see PoP.dependencies) with the properties they depend on, the
+    # number of PoPs only scales the loads
+    dependencies = [('master', {'nummc', 'nummodulesmc'})]
+
+    def __init__(self, numpops: int, request: Request, ec: Cache, mc: Cache, memo: Optional[Memo] = None):
         self._numpops = numpops
         self._request = request
-        self._pop = PoP(ec)
+        self._pop = PoP(ec, memo)
         self._mc = mc
         self._nummc = 1
 
+        # the ingress profile of the PoP and the results of the master cache stage of the last ingress(), see PoP
+        self._ingress2 = None
+        self._stages = {}
+        self._stale = 0
+
+    def _invalidate(self, name: str):
+        """
+        Makes the stages depending on a property stale, the caches must be changed through the setters.
+        """
+        self._stale = min([self._stale] + [n for n, (_, names) in enumerate(self.dependencies) if name in names])
+
+    @property
+    def stale(self) -> List[str]:
+        """
+        Stages of ingress() to be recomputed, the ones of the PoP first.
+        """
+        stale = self._pop.stale
+        return stale + [stage for stage, _ in self.dependencies[0 if stale else self._stale:]]
+
+    @property
+    def numpops(self) -> int:
+        return self._numpops
+
+    @numpops.setter
+    def numpops(self, val: int):
+        assert isinstance(val, int) and val > 0, f"invalid number of pops: {val}"
+        self._numpops = val
+
     @property
     def nummc(self) -> int:
         return self._nummc
@@ -20,6 +52,7 @@ class System:
     def nummc(self, val: int):
         assert isinstance(val, int) and val > 0, f"invalid number of mcs: {val}"
         self._nummc = val
+        self._invalidate('nummc')
 
     @property
     def numecpop(self) -> int:
@@ -52,6 +85,7 @@ class System:
     @nummodulesmc.setter
     def nummodulesmc(self, val: int):
         self._mc.nummodules = val
+        self._invalidate('nummodulesmc')
 
     @property
     def storageec(self) -> int:
@@ -79,7 +113,7 @@ class System:
 
     def ingress(self, numrequests: int, egress: Request) -> Tuple[int, Request, float, float, int, Request, float, float]:
         """
-
+        Only the stages made stale by the setters since the last call are recomputed (see stale), the loads are always.
         :param numrequests:
         :param egress:
         :return: tuple ()
@@ -87,11 +121,109 @@ class System:
         # get ingress after one PoP:
         rps2, ingress2, util_ec, chr_ec = self._pop.ingress(int(numrequests / self._numpops), egress)
 
-        # get ingress after mastercache cluster:
-        rps3 = int(rps2 * self._numpops * (1 - ingress2.cdf(self._nummc * self._mc.storage)))
-        ingress3 = ingress2.miss(self._nummc * self._mc.storage)
+        # get ingress after mastercache cluster, the stage is stale on another ingress profile of the PoP
+        if ingress2 is not self._ingress2:
+            self._ingress2, self._stale = ingress2, 0
+        if self._stale <= 0:
+            self._stages['master'] = self._pop.split(ingress2, self._nummc * self._mc.storage)[:2]
+        cdf3, ingress3 = self._stages['master']
+        self._stale = len(self.dependencies)
+        rps3 = int(rps2 * self._numpops * (1 - cdf3))
         util_mc = ingress2.rps2bps(rps2 * self._numpops / self._nummc) / self._mc.capacity
-        chr_mc = 1-(rps3/rps2) if rps2 != 0 else np.nan
+        # the master caches serve the misses of all PoPs
+        chr_mc = 1-(rps3/(rps2*self._numpops)) if rps2 != 0 else np.nan
 
         return rps2, ingress2, util_ec, chr_ec,\
-               rps3, ingress3, util_mc, chr_mc
\ No newline at end of file
+               rps3, ingress3, util_mc, chr_mc
+
+    def batch(self, numrequests, egress: Request, replication: np.ndarray, storage1ec: np.ndarray,
+              nummodulesec: np.ndarray, numecpop: np.ndarray, nummodulesmc: np.ndarray,
+              nummc: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+                                          np.ndarray]:
+        """
+        Vectorized ingress() for arrays of system configurations, the arrays are broadcasted against each other. The
+        configuration of this object is left untouched.
+        :param numrequests: scalar or array of the slots of a load curve, see curve()
+        :param egress:
+        :param replication:
+        :param storage1ec: ratio of the dedicated storage on the edge caches
+        :param nummodulesec: number of memory modules in an edge cache
+        :param numecpop: number of edge caches in a PoP
+        :param nummodulesmc: number of memory modules in a master cache
+        :param nummc: number of master caches
+        :return: tuple of (rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, cost) arrays
+        """
+        rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, _ = self._batch(numrequests, egress, replication, storage1ec,
+                                                                      nummodulesec, numecpop, nummodulesmc, nummc)
+        return rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, self.batchcost(nummodulesec, numecpop, nummodulesmc, nummc)
+
+    def edgeload(self, numrequests, egress: Request, storage1ec: np.ndarray, nummodulesec: np.ndarray) -> np.ndarray:
+        """
+        Vectorized load of the edge caches of a PoP in units of a single one: its utilization, if it served the PoP
+        alone (without replication or imbalance). A PoP needs at least as many edge caches.
+        :param numrequests: scalar or array of the slots of a load curve, see curve()
+        :param egress:
+        :param storage1ec: ratio of the dedicated storage on the edge caches
+        :param nummodulesec: number of memory modules in an edge cache
+        :return: array of the loads
+        """
+        return self._pop.batch(np.trunc(np.asarray(numrequests) / self._numpops), egress, 1, storage1ec, nummodulesec,
+                               1)[3]
+
+    def curve(self, numrequests: np.ndarray, egress: Request, replication: np.ndarray, storage1ec: np.ndarray,
+              nummodulesec: np.ndarray, numecpop: np.ndarray, nummodulesmc: np.ndarray,
+              nummc: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same as batch() over the slots of a load curve in one pass: the cache volumes are looked up once per
+        configuration, only the loads are computed per slot.
+        :param numrequests: array of the numbers of requests of the slots
+        :return: tuple of (rps2, util_ec, chr_ec, util_mc, chr_mc, origin egress (bps)) arrays of the configurations
+                 with an extra last axis of the slots
+        """
+        rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, meansize3 = self._batch(numrequests, egress, replication,
+                                                                              storage1ec, nummodulesec, numecpop,
+                                                                              nummodulesmc, nummc)
+        return rps2, util_ec, chr_ec, util_mc, chr_mc, rps3 * meansize3 * 8
+
+    def _batch(self, numrequests, egress: Request, replication: np.ndarray, storage1ec: np.ndarray,
+               nummodulesec: np.ndarray, numecpop: np.ndarray, nummodulesmc: np.ndarray,
+               nummc: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+                                           np.ndarray]:
+        """
+        Returns the results of batch() with the mean request size of the origin stream instead of the cost, the load
+        dependent ones with the extra last axes of numrequests.
+        """
+        nummodulesmc, nummc = np.broadcast_arrays(nummodulesmc, nummc)
+        assert np.all((self._mc.minmodules <= nummodulesmc) & (nummodulesmc <= self._mc.maxmodules)), \
+            f"Invalid nummodules: {nummodulesmc}"
+        assert np.all(nummc > 0), f"invalid number of mcs: {nummc}"
+
+        # get ingress after one PoP:
+        rps2, start2, meansize2, util_ec, chr_ec = self._pop.batch(np.trunc(np.asarray(numrequests) / self._numpops),
+                                                                   egress, replication, storage1ec, nummodulesec,
+                                                                   numecpop)
+
+        # get ingress after mastercache cluster:
+        ratio3, _, meansize3 = egress.sweep(nummc * nummodulesmc * self._mc.modulesize, start2)
+        slots = (Ellipsis,) + (np.newaxis,) * np.ndim(numrequests)
+        ratio3, nummc, meansize2, meansize3 = (np.asarray(values)[slots] for values in
+                                               [ratio3, nummc, meansize2, meansize3])
+        rps3 = np.trunc(rps2 * self._numpops * (1 - ratio3))
+        util_mc = rps2 * self._numpops / nummc * meansize2 * 8 / self._mc.capacity
+        with np.errstate(divide='ignore', invalid='ignore'):  # of the misses of all PoPs, like ingress()
+            chr_mc = np.where(rps2 != 0, 1 - rps3 / (rps2 * self._numpops), np.nan)
+
+        return rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, meansize3
+
+    def batchcost(self, nummodulesec: np.ndarray, numecpop: np.ndarray, nummodulesmc: np.ndarray,
+                  nummc: np.ndarray) -> np.ndarray:
+        """
+        Vectorized cost for arrays of system configurations, it does not need the request profile.
+        :param nummodulesec: number of memory modules in an edge cache
+        :param numecpop: number of edge caches in a PoP
+        :param nummodulesmc: number of memory modules in a master cache
+        :param nummc: number of master caches
+        :return: array of costs
+        """
+        return self._numpops * numecpop * (self._pop.baseprice + nummodulesec * self._pop.moduleprice) + \
+               nummc * (self._mc.baseprice + nummodulesmc * self._mc.moduleprice)
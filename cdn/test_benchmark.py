@@ -0,0 +1,30 @@
+import os
+import tempfile
+from unittest import TestCase
+from cdn.benchmark import Benchmark
+import numpy as np
+
+
+class TestBenchmark(TestCase):
+    def test_run(self):
+        benchmark = Benchmark(repeat=2, iterations=100, requests=10000)
+        rows = []
+        frame = benchmark.run(scales=[1000, 3000], callback=rows.append)
+        self.assertEqual(len(frame), 2 * len(Benchmark.cases))
+        self.assertEqual(len(rows), len(frame))
+        self.assertTrue(np.all(frame['time'] > 0) and np.all(frame['time'] <= frame['mean']))
+        self.assertTrue(np.all(frame['memory'] > 0))
+
+        # round trip and comparison
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'benchmark.json')
+            Benchmark.save(filename, frame)
+            baseline = Benchmark.load(filename)
+        self.assertTrue(baseline.equals(frame))
+        self.assertFalse(np.any(Benchmark.compare(frame, baseline)['regression']))
+
+        slower = frame.assign(time=frame['time'] * 2 + 1)
+        comparison = Benchmark.compare(slower, baseline.iloc[:3])
+        self.assertEqual(len(comparison), 3)
+        self.assertTrue(np.all(comparison['regression']))
+        self.assertFalse(np.any(Benchmark.compare(slower, baseline, mintime=np.inf)['regression']))
@@ -0,0 +1,93 @@
+import os
+import tempfile
+from unittest import TestCase
+from cdn import LiveTV
+from cdn.checkpoint import Checkpoint
+from cdn.montecarlo import MonteCarlo
+from cdn.results import Results
+from cdn.pareto import Pareto
+import numpy as np
+
+
+class TestCheckpoint(TestCase):
+    def test_resume(self):
+        request = LiveTV(100, 2000, np.array([1., 2., 3.]), np.array([2., 4., 8.]) * 1000 * 1000 / 8 * 6, 1.2, 600, 300)
+        montecarlo = MonteCarlo(request, 10, 10 * 1000 ** 4)
+        num, blocksize, chunksize = 3000, 500, 700
+        with tempfile.TemporaryDirectory() as directory:
+            # uninterrupted run
+            results = Results(os.path.join(directory, 'run.csv'), MonteCarlo.columns, "header", chunksize)
+            pareto = Pareto(MonteCarlo.columns, ['cost', 'util_mc'])
+            for block in montecarlo.run(num, seed=1, blocksize=blocksize, prune=True, pareto=pareto):
+                results.extend(**block)
+                pareto.extend(**block)
+            results.sort(by=['valid', 'cost'])
+
+            # checkpointed after 2 blocks, the third one is lost
+            filename = os.path.join(directory, 'checkpoint.npz')
+            checkpoint = Checkpoint(filename, interval=0)
+            resumed = Results(os.path.join(directory, 'resumed.csv'), MonteCarlo.columns, "header", chunksize)
+            frontier = Pareto(MonteCarlo.columns, ['cost', 'util_mc'])
+            blocks = montecarlo.run(num, seed=1, blocksize=blocksize, prune=True, pareto=frontier)
+            for done, block in enumerate(blocks, 1):
+                resumed.extend(**block)
+                frontier.extend(**block)
+                if done == 2:
+                    checkpoint.save(done, resumed, frontier, seed=1, pruned=montecarlo.pruned)
+                elif done == 3:
+                    resumed.flush()
+                    break
+            blocks.close()
+
+            state, resumed, frontier = Checkpoint.resume(filename, MonteCarlo.columns)
+            self.assertEqual(state['blocks'], 2)
+            pruned = state['pruned']
+            for block in montecarlo.run(num, seed=state['seed'], blocksize=blocksize, prune=True, pareto=frontier,
+                                        start=state['blocks']):
+                resumed.extend(**block)
+                frontier.extend(**block)
+            resumed.sort(by=['valid', 'cost'])
+
+            self.assertGreater(pruned, 0)
+            self.assertEqual(len(resumed), len(results))
+            with open(results.filename, 'rb') as f, open(resumed.filename, 'rb') as g:
+                self.assertEqual(f.read(), g.read())
+            for name, _ in MonteCarlo.columns:
+                np.testing.assert_array_equal(frontier.frontier[name], pareto.frontier[name])
+
+    def test_workers(self):
+        # a pruned run of several workers against a Pareto frontier of other objectives than the default ones, like
+        # --workers 3 --prune --pareto cost util_mc, has the results and the frontier of a single process, also resumed
+        request = LiveTV(100, 2000, np.array([1., 2., 3.]), np.array([2., 4., 8.]) * 1000 * 1000 / 8 * 6, 1.2, 600, 300)
+        montecarlo = MonteCarlo(request, 10, 10 * 1000 ** 4)
+        num, blocksize = 3000, 300
+        with tempfile.TemporaryDirectory() as directory:
+            contents = []
+            for workers, stop in [(1, None), (3, None), (3, 4)]:
+                results = Results(os.path.join(directory, f'run{workers}{stop}.csv'), MonteCarlo.columns, "header")
+                pareto = Pareto(MonteCarlo.columns, ['cost', 'util_mc'])
+                filename, start = os.path.join(directory, 'checkpoint.npz'), 0
+                if stop is not None:
+                    blocks = montecarlo.run(num, seed=1, workers=workers, blocksize=blocksize, prune=True,
+                                            pareto=pareto)
+                    for done, block in enumerate(blocks, 1):
+                        results.extend(**block)
+                        pareto.extend(**block)
+                        if done == stop:
+                            Checkpoint(filename, interval=0).save(done, results, pareto, seed=1)
+                            break
+                    blocks.close()
+                    state, results, pareto = Checkpoint.resume(filename, MonteCarlo.columns)
+                    start = state['blocks']
+                for block in montecarlo.run(num, seed=1, workers=workers, blocksize=blocksize, prune=True,
+                                            pareto=pareto, start=start):
+                    results.extend(**block)
+                    pareto.extend(**block)
+                results.sort(by=['valid', 'cost'])
+                pareto.save(os.path.join(directory, f'pareto{workers}{stop}.csv'), header="header")
+                with open(results.filename, 'rb') as f, open(os.path.join(directory, f'pareto{workers}{stop}.csv'),
+                                                             'rb') as g:
+                    contents.append((f.read(), g.read()))
+            self.assertLess(contents[0][0].count(b'\n'), num // 2)
+            for content in contents[1:]:
+                self.assertEqual(content, contents[0])
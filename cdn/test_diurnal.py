@@ -0,0 +1,101 @@
+from unittest import TestCase
+from cdn import LiveTV, FactorizedLiveTV, System, DellR750
+from cdn.diurnal import Diurnal, DiurnalMonteCarlo
+from cdn.montecarlo import MonteCarlo
+import numpy as np
+
+
+class TestDiurnal(TestCase):
+    def test_batch(self):
+        # same as System.ingress() of each slot on a profile built for its timeshift
+        for i in range(3):
+            channels, fragments = np.random.randint(1, 50), np.random.randint(1, 200)
+            profiles = np.random.random(3) + 0.1
+            sizes = np.random.randint(1, 10 * 1000 * 1000, 3).astype(float)
+            s, sigma = np.random.uniform(0.5, 2), fragments / 4 + 1
+            request = LiveTV(channels, fragments, profiles, sizes, s, fragments / 2, sigma)
+
+            slots = 12
+            load = np.random.uniform(1, 100, slots) * 1000 * 1000 * 1000
+            tsmu = np.random.choice([fragments / 2, fragments / 3, fragments / 4], slots)
+            diurnal = Diurnal(request, load, tsmu)
+            self.assertLessEqual(len(diurnal.profiles), 3)
+            self.assertEqual(sum(slots.size for _, slots in diurnal.profiles), diurnal.slots)
+
+            ec, mc = DellR750(), DellR750()
+            system = System(np.random.randint(1, 10), request, ec, mc)
+            num = 5
+            replication = np.random.randint(1, 10 + 1, num)
+            storage1ec = np.random.random(num)
+            nummodulesec = np.random.randint(ec.minmodules, ec.maxmodules + 1, num)
+            numecpop = np.random.randint(1, 40 + 1, num)
+            nummodulesmc = np.random.randint(mc.minmodules, mc.maxmodules + 1, num)
+            nummc = np.random.randint(1, 5, num)
+            results = diurnal.batch(system, replication, storage1ec, nummodulesec, numecpop, nummodulesmc, nummc)
+            for result in results:
+                self.assertEqual(result.shape, (num, slots))
+
+            for slot in range(slots):
+                profile = LiveTV(channels, fragments, profiles, sizes, s, tsmu[slot], sigma)
+                numrequests = profile.bps2rps(load[slot])
+                self.assertAlmostEqual(diurnal.numrequests[slot], numrequests, delta=1e-9 * numrequests)
+                for n in range(num):
+                    system.replication = int(replication[n])
+                    system.storage1ec = storage1ec[n]
+                    system.nummodulesec = int(nummodulesec[n])
+                    system.numecpop = int(numecpop[n])
+                    system.nummodulesmc = int(nummodulesmc[n])
+                    system.nummc = int(nummc[n])
+                    rps2, _, util_ec, chr_ec, rps3, ingress3, util_mc, chr_mc = system.ingress(numrequests, profile)
+
+                    np.testing.assert_allclose([rps2, util_ec, chr_ec, util_mc, chr_mc, ingress3.rps2bps(rps3)],
+                                               [result[n, slot] for result in results], rtol=1e-9, atol=1e-6)
+
+    def test_factorized(self):
+        # only the fragment factor of a timeshifted profile is recomputed
+        request = FactorizedLiveTV(20, 100, np.array([1., 2.]), np.array([1e6, 3e6]), 1.2, 50, 20)
+        timeshifted = request.timeshifted(30, 10)
+        self.assertIs(timeshifted.channelpmf, request.channelpmf)
+        self.assertIs(request.timeshifted(50, 20), request)
+        expected = FactorizedLiveTV(20, 100, np.array([1., 2.]), np.array([1e6, 3e6]), 1.2, 30, 10)
+        volumes = np.random.uniform(0, expected.contentbase, 10)
+        for result, values in zip(timeshifted.sweep(volumes), expected.sweep(volumes)):
+            np.testing.assert_allclose(result, values)
+
+    def test_montecarlo(self):
+        # a flat load curve is the single peak
+        request = LiveTV(20, 100, np.array([1., 2.]), np.array([1e6, 3e6]), 1.2, 50, 20)
+        peak = 50 * 1000 * 1000 * 1000
+        diurnal = DiurnalMonteCarlo(Diurnal(request, np.full(4, peak)), 3)
+        montecarlo = MonteCarlo(request, 3, peak)
+        for result, expected in zip(diurnal.run(100, seed=1), montecarlo.run(100, seed=1)):
+            for name in ['util_ec', 'util_mc', 'chr_ec', 'valid', 'cost']:
+                np.testing.assert_allclose(result[name], expected[name])
+
+    def test_chr(self):
+        # the CHRs are averaged over the requests reaching the tier, the slots without any are left out
+        request = LiveTV(200, 2000, np.array([1., 2.]), np.array([1e6, 3e6]), 0.6, 1000, 500)
+        load = np.array([0, 10, 40, 80, 20]) * 1000 * 1000 * 1000.
+        diurnal = Diurnal(request, load, np.array([1000, 1000, 600, 200, 1000]))
+        montecarlo = DiurnalMonteCarlo(diurnal, 3)
+        replication, storage1ec, nummodulesec, numecpop, nummodulesmc = \
+            np.array([1, 2, 4]), np.array([0.1, 0.5, 0.9]), np.array([1, 4, 8]), np.array([1, 3, 10]), np.array([1, 2, 8])
+        result = montecarlo.evaluate(replication, storage1ec, nummodulesec, numecpop, nummodulesmc)
+
+        system = System(3, request, DellR750(), DellR750())
+        rps2, _, chr_ec, _, chr_mc, _ = diurnal.batch(system, replication, storage1ec, nummodulesec, numecpop,
+                                                      nummodulesmc, montecarlo.nummc(nummodulesmc))
+        slots = np.flatnonzero(load > 0)
+        for n in range(replication.size):
+            self.assertAlmostEqual(result['chr_ec'][n], np.round(100 * np.average(
+                chr_ec[n, slots], weights=diurnal.numrequests[slots]), 2))
+            if np.any(rps2[n] > 0):
+                self.assertAlmostEqual(result['chr_mc'][n], np.round(100 * np.average(
+                    chr_mc[n, slots], weights=rps2[n, slots]), 2))
+            else:  # no ingress all day
+                self.assertTrue(np.isnan(result['chr_mc'][n]))
+        self.assertTrue(np.isnan(result['chr_mc'][-1]))
+
+        values = np.array([[np.nan, 0.5, 1, 0], [np.nan, np.nan, np.nan, np.nan]])
+        np.testing.assert_allclose(DiurnalMonteCarlo._average(values, np.array([[0, 1, 3, 0], [0, 0, 0, 0]])),
+                                   [7 / 8, np.nan])
@@ -0,0 +1,65 @@
+from unittest import TestCase
+from cdn import Request, Factorized, LiveTV, FactorizedLiveTV
+import numpy as np
+
+
+class TestFactorized(TestCase):
+    def test_request(self):
+        # same as the materialized product
+        for i in range(10):
+            pmf1, pmf2, pmf3 = [np.random.random(np.random.randint(1, 20)) for _ in range(3)]
+            sizes = np.random.randint(1, 10 * 1000 * 1000, pmf3.size)
+            factorized = Factorized(pmf1, pmf2, pmf3, sizes)
+            pmf = pmf1.reshape((-1, 1, 1)) * pmf2.reshape((1, -1, 1)) * pmf3.reshape((1, 1, -1))
+            request = Request(np.broadcast_to(sizes, pmf.shape).flatten(), pmf.flatten())
+
+            self.assertEqual(factorized.numcontents, request.numcontents)
+            self.assertAlmostEqual(factorized.contentbase, request.contentbase)
+            self.assertAlmostEqual(factorized.meanrequestsize, request.meanrequestsize,
+                                   delta=1e-9 * request.meanrequestsize)
+            # a cut after the last content leaves an empty tail
+            ratio, _, meansize = factorized.sweep(request.contentbase - np.min(sizes) / 3)
+            self.assertEqual((float(ratio), float(meansize)), (1, 0))
+            for volume in np.random.uniform(0, request.contentbase, 10):
+                self.assertAlmostEqual(factorized.cdf(volume), request.cdf(volume))
+                miss, miss2 = factorized.miss(volume), request.miss(volume)
+                self.assertEqual(miss.numcontents, miss2.numcontents)
+                # the mean size of a tail is a difference of sums, relatively less accurate
+                self.assertAlmostEqual(miss.meanrequestsize, miss2.meanrequestsize,
+                                       delta=1e-6 * miss2.meanrequestsize + 1e-3)
+                for volume2 in np.random.uniform(0, miss2.contentbase, 10):
+                    self.assertAlmostEqual(miss.cdf(volume2), miss2.cdf(volume2))
+
+            volumes = np.random.uniform(0, request.contentbase, 10)
+            ratio, start, meansize = factorized.sweep(volumes)
+            ratio2, start2, meansize2 = request.sweep(volumes)
+            np.testing.assert_allclose(ratio, ratio2)
+            np.testing.assert_allclose(meansize, meansize2, rtol=1e-6)
+            ratio, _, meansize = factorized.sweep(volumes[::-1], start)
+            ratio2, _, meansize2 = request.sweep(volumes[::-1], start2)
+            np.testing.assert_allclose(ratio, ratio2)
+            np.testing.assert_allclose(meansize, meansize2, rtol=1e-6)
+
+    def test_ties(self):
+        # a group of contents of the same probability and size is cut at the nearest content, like in the
+        # materialized profile: the first two profiles, and the timeshift mirrored around the live edge, are ties
+        args = 50, 201, np.array([1., 1., 2.]), np.array([1e6, 1e6, 3e6]), 1.2, 101, 30
+        livetv, factorized = LiveTV(*args), FactorizedLiveTV(*args)
+        volumes = np.random.uniform(0, livetv.contentbase, 200)
+        ratio, start, meansize = factorized.sweep(volumes)
+        ratio2, start2, meansize2 = livetv.sweep(volumes)
+        np.testing.assert_allclose(ratio, ratio2, rtol=1e-9)
+        np.testing.assert_allclose(meansize, meansize2, rtol=1e-6)
+        ratio, _, meansize = factorized.sweep(volumes[::-1], start)
+        ratio2, _, meansize2 = livetv.sweep(volumes[::-1], start2)
+        np.testing.assert_allclose(ratio, ratio2, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(meansize, meansize2, rtol=1e-6)
+
+        # all contents of an inner factor tied
+        pmf1, pmf3 = np.random.random(7), np.random.random(3)
+        factorized = Factorized(pmf1, np.ones(500), pmf3, np.full(3, 1e6))
+        pmf = pmf1.reshape((-1, 1, 1)) * np.ones((1, 500, 1)) * pmf3.reshape((1, 1, -1))
+        request = Request(np.full(pmf.size, 1e6), pmf.flatten())
+        for volume in np.random.uniform(0, request.contentbase, 20):
+            self.assertAlmostEqual(factorized.cdf(volume), request.cdf(volume))
+            self.assertEqual(factorized.miss(volume).numcontents, request.miss(volume).numcontents)
@@ -0,0 +1,40 @@
+from unittest import TestCase
+from cdn import Request, Memo, System, DellR750
+import numpy as np
+
+
+class TestMemo(TestCase):
+    def test_lookup(self):
+        request = Request(np.random.randint(1, 1000, 1000), np.random.zipf(1.5, 1000).astype(float))
+        memo = Memo()
+        for volume in np.random.uniform(0, request.contentbase, 10):
+            cdf, miss, meansize = memo.lookup(request, volume)
+            self.assertEqual(cdf, request.cdf(volume))
+            self.assertEqual(miss.numcontents, request.miss(volume).numcontents)
+            self.assertEqual(meansize, request.miss(volume).meanrequestsize)
+            self.assertIs(memo.lookup(request, volume)[1], miss)
+            self.assertIs(memo.lookup(miss, volume)[1], memo.lookup(miss, volume)[1])
+        self.assertEqual((memo.hits, memo.misses), (20, 20))
+
+        # least recently used entries are evicted
+        memo = Memo(budget=1, quantum=100)
+        memo.lookup(request, 150)
+        self.assertIs(memo.lookup(request, 199)[1], memo.lookup(request, 100)[1])
+        memo.lookup(request, 250)
+        memo.lookup(request, 150)
+        self.assertEqual((len(memo), memo.hits, memo.misses), (1, 2, 3))
+
+    def test_system(self):
+        request = Request(np.random.randint(1, 10 * 1000 * 1000 * 1000, 10000),
+                          np.random.zipf(1.5, 10000).astype(float))
+        memo = Memo()
+        system, system2 = System(5, request, DellR750(), DellR750(), memo), System(5, request, DellR750(), DellR750())
+        for i in range(20):
+            nummodules, numcache = np.random.randint(1, 4), np.random.randint(1, 4)
+            for s in [system, system2]:
+                s.nummodulesec, s.numecpop, s.nummc = nummodules, numcache, 2
+            rps2, _, util_ec, chr_ec, rps3, _, util_mc, chr_mc = system.ingress(1000 * 1000, request)
+            rps2_, _, util_ec2, chr_ec2, rps3_, _, util_mc2, chr_mc2 = system2.ingress(1000 * 1000, request)
+            np.testing.assert_equal([rps2, util_ec, chr_ec, rps3, util_mc, chr_mc],
+                                    [rps2_, util_ec2, chr_ec2, rps3_, util_mc2, chr_mc2])
+        self.assertGreater(memo.hits, 0)
@@ -0,0 +1,53 @@
+from unittest import TestCase
+from cdn import Request, Mixed, LiveTV, FactorizedLiveTV, System, DellR750
+import numpy as np
+
+
+class TestMixed(TestCase):
+    def test_merge(self):
+        # same as sorting the concatenated catalogs again
+        for i in range(3):
+            # the timeshift is off the fragments, so there are no ties to order differently
+            vod = Request(np.random.randint(1, 10, 2000) * 1000. * 1000, np.random.random(2000) ** 3)
+            livetv = LiveTV(np.random.randint(1, 50), np.random.randint(1, 200), np.array([1., 2.]),
+                            np.array([1e6, 3e6]), 1.2, 30.37, 20)
+            catchup = vod.miss(np.random.uniform(0, vod.contentbase / 2))
+            profiles, weights = [vod, livetv, catchup], np.random.random(3)
+            shares = weights / np.sum(weights)
+            sizes = np.concatenate([profile.sizes for profile in profiles])
+            probability = np.concatenate([profile._pmf / profile._norm * share
+                                          for profile, share in zip(profiles, shares)])
+            volumes = np.random.uniform(0, np.sum(sizes), 20)
+
+            for compact in [False, True]:
+                expected = Request(sizes, probability, compact)
+                for chunksize in [13, 97, 1 << 20]:
+                    mixed = Mixed(profiles, weights, compact, chunksize)
+                    np.testing.assert_allclose(mixed.shares, shares)
+                    self.assertEqual(mixed.numcontents, expected.numcontents)
+                    self.assertTrue(np.all(np.diff(mixed._pmf) <= 0))
+                    self.assertAlmostEqual(mixed.contentbase, expected.contentbase, delta=1e-6 * expected.contentbase)
+                    # the mean request size of a nearly empty tail is a cancellation in either profile, its byte
+                    # mass is compared
+                    ratio, missstart, meansize = mixed.sweep(volumes)
+                    expectedratio, expectedstart, expectedsize = expected.sweep(volumes)
+                    np.testing.assert_allclose(ratio, expectedratio, rtol=1e-6)
+                    np.testing.assert_array_equal(missstart, expectedstart)
+                    np.testing.assert_allclose((1 - ratio) * meansize, (1 - expectedratio) * expectedsize, rtol=1e-6,
+                                               atol=1e-9 * expected.meanrequestsize)
+
+        with self.assertRaises(AssertionError):
+            Mixed([FactorizedLiveTV(10, 10, np.array([1.]), np.array([1e6]), 1.2, 5, 2)], [1])
+
+    def test_system(self):
+        # a catalog mixed with an empty share is the catalog
+        livetv = LiveTV(20, 100, np.array([1., 2.]), np.array([1e6, 3e6]), 1.2, 50, 20)
+        vod = Request(np.full(500, 5e6), np.random.random(500))
+        mixed = Mixed([livetv, vod], [1, 0])
+        system = System(4, livetv, DellR750(), DellR750())
+        numrequests = livetv.bps2rps(10 * 1000 ** 3)
+        expected = system.ingress(numrequests, livetv)
+        for result, values in zip(system.ingress(numrequests, mixed), expected):
+            if isinstance(values, Request):
+                result, values = result.meanrequestsize, values.meanrequestsize
+            np.testing.assert_allclose(result, values, rtol=1e-9)
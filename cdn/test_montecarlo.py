@@ -0,0 +1,62 @@
+import os
+import tempfile
+from unittest import TestCase
+from cdn import LiveTV, FactorizedLiveTV
+from cdn.montecarlo import MonteCarlo
+from cdn.pareto import Pareto
+from cdn.results import Results
+import numpy as np
+
+
+class TestMonteCarlo(TestCase):
+    def test_prune(self):
+        for factorized, peak, objectives, num in [(False, 10, None, 3000), (False, 40, ['cost'], 3000),
+                                                  (True, 20, ['cost', 'util_mc'], 200)]:
+            args = (100, 2000, np.array([1., 2., 3.]), np.array([2., 4., 8.]) * 1000 * 1000 / 8 * 6, 1.2, 600, 300)
+            request = FactorizedLiveTV(*args) if factorized else LiveTV(*args)
+            montecarlo = MonteCarlo(request, 10, peak * 1000 ** 4)
+            blocks = list(montecarlo.run(num, seed=1, blocksize=num // 6))
+            designs = {name: np.concatenate([block[name] for block in blocks]) for name, _ in MonteCarlo.columns}
+
+            # the bounds hold for all designs
+            modulesize = 256 * 1000 ** 3
+            nummodulesec = np.round(designs['storageec_GB'] * 1000 ** 3 / modulesize).astype(int)
+            nummodulesmc = np.round(designs['storagemc_GB'] * 1000 ** 3 / modulesize).astype(int)
+            util_ec, util_mc, cost = montecarlo.bounds(designs['replication'], 0.5, nummodulesec,
+                                                       designs['numecpop'], nummodulesmc)
+            self.assertTrue(np.all(np.round(util_ec * 100, 2) <= designs['util_ec']))
+            self.assertTrue(np.all(np.round(util_mc * 100, 2) <= designs['util_mc']))
+            np.testing.assert_array_equal(cost, designs['cost'])
+            if not factorized:
+                self.assertTrue(np.any(util_mc > 0))
+
+            # the same frontier out of less evaluations
+            pareto, pruned = Pareto(MonteCarlo.columns, objectives), Pareto(MonteCarlo.columns, objectives)
+            for block in blocks:
+                pareto.extend(**block)
+            for block in montecarlo.run(num, seed=1, blocksize=num // 6, prune=True, pareto=pruned):
+                pruned.extend(**block)
+            self.assertGreater(montecarlo.pruned, 0)
+            for name, _ in MonteCarlo.columns:
+                np.testing.assert_array_equal(np.sort(pruned.frontier[name]), np.sort(pareto.frontier[name]))
+
+    def test_workers(self):
+        # the pruned results of a seed do not depend on the number of workers
+        request = LiveTV(100, 2000, np.array([1., 2., 3.]), np.array([2., 4., 8.]) * 1000 * 1000 / 8 * 6, 1.2, 600, 300)
+        montecarlo = MonteCarlo(request, 10, 10 * 1000 ** 4)
+        contents, pruned = [], []
+        with tempfile.TemporaryDirectory() as directory:
+            for workers in [1, 3]:
+                results = Results(os.path.join(directory, f'run{workers}.csv'), MonteCarlo.columns, "header")
+                pareto = Pareto(MonteCarlo.columns, ['cost', 'util_mc'])
+                start = montecarlo.pruned
+                for block in montecarlo.run(3000, seed=1, workers=workers, blocksize=300, prune=True, pareto=pareto):
+                    results.extend(**block)
+                    pareto.extend(**block)
+                results.sort(by=['valid', 'cost'])
+                pruned.append(montecarlo.pruned - start)
+                with open(results.filename, 'rb') as f:
+                    contents.append(f.read())
+        self.assertGreater(pruned[0], 1000)
+        self.assertEqual(pruned[0], pruned[1])
+        self.assertEqual(contents[0], contents[1])
@@ -0,0 +1,27 @@
+from unittest import TestCase
+from cdn import Request
+from cdn.optimizer import Optimizer
+import numpy as np
+
+
+def cheapest(blocks) -> float:
+    blocks = list(blocks)
+    cost = np.concatenate([block['cost'] for block in blocks]).astype(float)
+    return np.min(cost[np.concatenate([block['valid'] for block in blocks])], initial=np.inf)
+
+
+class TestOptimizer(TestCase):
+    def test_search(self):
+        for peak in [0.5, 2, 10]:
+            size = np.random.randint(1, 10 * 1000 * 1000 * 1000, 10000)
+            request = Request(size, np.random.zipf(1.5, size.size).astype(float))
+            optimizer = Optimizer(request, 5, peak * 1000 * 1000 * 1000 * 1000, steps=3)
+
+            # the whole grid
+            block, _, _ = optimizer._evaluate(np.arange(np.prod(optimizer._shape)))
+            self.assertEqual(cheapest(optimizer.grid(block['cost'].size)), cheapest([block]))
+
+            for strategy in ['descent', 'surrogate']:
+                blocks = list(getattr(optimizer, strategy)(1000, seed=1))
+                self.assertLessEqual(sum(len(block['cost']) for block in blocks), 1000)
+                self.assertGreaterEqual(cheapest(blocks), cheapest([block]))
@@ -0,0 +1,44 @@
+from unittest import TestCase
+from cdn.montecarlo import MonteCarlo
+from cdn.pareto import Pareto
+import numpy as np
+
+
+class TestPareto(TestCase):
+    def test_extend(self):
+        for objectives in [None, ['cost', 'util_ec'], ['chr_mc']]:
+            num = 2000
+            columns = {name: np.random.randint(0, 20, num).astype(dtype) for name, dtype in MonteCarlo.columns}
+            columns['valid'] = np.random.random(num) < 0.8
+            pareto = Pareto(MonteCarlo.columns, objectives, chunksize=64)
+            for start in range(0, num, 300):
+                pareto.extend(**{name: values[start:start + 300] for name, values in columns.items()})
+
+            # brute force: the distinct objectives of the valid rows, which are not dominated
+            points = np.column_stack([Pareto.senses[name] * columns[name][columns['valid']]
+                                      for name in pareto.objectives])
+            dominated = [np.any(np.all(points <= point, axis=1) & np.any(points < point, axis=1))
+                         for point in points]
+            frontier = np.unique(points[~np.array(dominated)], axis=0)
+
+            points = np.column_stack([Pareto.senses[name] * pareto.frontier[name] for name in pareto.objectives])
+            self.assertEqual(len(pareto), len(frontier))
+            np.testing.assert_equal(np.unique(points, axis=0), frontier)
+            self.assertTrue(np.all(pareto.frontier['valid']))
+
+    def test_nan(self):
+        # a NaN objective is the worst value, the NaN rows do not pile up in the frontier
+        num = 4000
+        columns = {name: np.random.random(num).astype(dtype) for name, dtype in MonteCarlo.columns}
+        columns['valid'] = np.ones(num, dtype=bool)
+        columns['chr_mc'][np.random.random(num) < 0.8] = np.nan
+        pareto = Pareto(MonteCarlo.columns)
+        for start in range(0, num, 500):
+            pareto.extend(**{name: values[start:start + 500] for name, values in columns.items()})
+
+        points = np.column_stack([Pareto.senses[name] * columns[name] for name in pareto.objectives])
+        points[np.isnan(points)] = np.inf
+        dominated = [np.any(np.all(points <= point, axis=1) & np.any(points < point, axis=1)) for point in points]
+        self.assertEqual(len(pareto), np.count_nonzero(~np.array(dominated)))
+        self.assertEqual(np.count_nonzero(np.isnan(pareto.frontier['chr_mc'])),
+                         np.count_nonzero(~np.array(dominated) & np.isnan(columns['chr_mc'])))
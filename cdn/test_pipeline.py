@@ -0,0 +1,64 @@
+from unittest import TestCase
+from cdn import Request, System, DellR750, Tier, Pipeline
+import numpy as np
+
+
+class TestPipeline(TestCase):
+    def test_system(self):
+        # the edge and master tiers of System
+        for i in range(5):
+            length = np.random.randint(1, 10000)
+            prob = np.random.zipf(1.5, length).astype(float)
+            size = np.random.randint(1, 10 * 1000 * 1000 * 1000, length)
+            request = Request(size, prob)
+            ec, mc = DellR750(), DellR750()
+            numpops = np.random.randint(1, 10)
+            system = System(numpops, request, ec, mc)
+            numrequests = np.random.randint(1, 1000 * 1000)
+
+            num = 20
+            replication = np.random.randint(1, 10 + 1, num)
+            storage1ec = np.random.random(num)
+            nummodulesec = np.random.randint(ec.minmodules, ec.maxmodules + 1, num)
+            numecpop = np.random.randint(1, 40 + 1, num)
+            nummodulesmc = np.random.randint(mc.minmodules, mc.maxmodules + 1, num)
+            nummc = np.random.randint(1, 5, num)
+            rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, cost = system.batch(
+                numrequests, request, replication, storage1ec, nummodulesec, numecpop, nummodulesmc, nummc)
+
+            pipeline = Pipeline(numpops, [Tier('edge', ec, numecpop, replication, nummodules=nummodulesec,
+                                               dedicated=storage1ec),
+                                          Tier('master', mc, nummc, fanin=numpops, nummodules=nummodulesmc,
+                                               hashed=False)])
+            edge, master = pipeline.batch(numrequests, request)
+            np.testing.assert_allclose([edge['missrps'], edge['util'], edge['chr'], master['missrps'],
+                                        master['util'], master['chr'], edge['cost'] + master['cost']],
+                                       [rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, cost], rtol=1e-9)
+
+    def test_tiers(self):
+        # the origin stream of four tiers is the miss stream of the caches one after the other
+        length = np.random.randint(1000, 10000)
+        request = Request(np.random.randint(1, 10 * 1000 * 1000 * 1000, length),
+                          np.random.zipf(1.5, length).astype(float))
+        cache = DellR750()
+        counts = np.random.randint(1, 4, 4)
+        modules = np.random.randint(cache.minmodules, cache.maxmodules + 1, 4)
+        fanins = [1, 4, 2, 2]
+        pipeline = Pipeline(16, [Tier(str(n), cache, counts[n], fanin=fanins[n], nummodules=modules[n], hashed=False)
+                                 for n in range(4)])
+        self.assertEqual([float(sites) for sites in pipeline.sites], [16, 4, 2, 1])
+        for fanin in [3, np.array([2, 5])]:
+            with self.assertRaises(AssertionError):
+                Pipeline(16, [Tier('edge', cache, 1), Tier('mid', cache, 1, fanin=fanin)])
+        np.testing.assert_array_equal(Pipeline(16, [Tier('edge', cache, 1),
+                                                    Tier('mid', cache, 1, fanin=np.array([2, 8]))]).sites[1], [8, 2])
+        results = pipeline.batch(1000 * 1000, request)
+
+        rps, stream = 1000 * 1000 / 16, request
+        for n, result in enumerate(results):
+            rps = np.trunc(rps) * fanins[n] if n else np.trunc(rps)
+            self.assertAlmostEqual(result['rps'], rps, delta=1e-9 * rps)
+            cdf, stream, meansize = stream.split(counts[n] * modules[n] * cache.modulesize)
+            rps = np.trunc(rps * (1 - cdf))
+            self.assertAlmostEqual(result['missrps'], rps, delta=1e-9 * rps + 1)
+            self.assertAlmostEqual(result['missbps'], stream.rps2bps(rps), delta=1e-6 * stream.rps2bps(rps))
@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from cdn import Request, System, DellR750
+from cdn.profiler import Profiler, stages
+import numpy as np
+
+
+class TestProfiler(TestCase):
+    def test_start(self):
+        originals = {(owner, attribute): vars(owner)[attribute] for owner, attribute in stages}
+        size, prob = np.random.randint(1, 1000, 1000), np.random.random(1000)
+        request = Request(size, prob)
+        system = System(3, request, DellR750(), DellR750())
+        expected = system.ingress(1000 * 1000, request)
+
+        with Profiler() as profiler:
+            self.assertTrue(profiler.running)
+            self.assertIsNot(vars(System)['ingress'], originals[(System, 'ingress')])
+            for _ in range(5):
+                # all stages stale, see System.stale
+                system.storage1ec = 0.1
+                self.assertEqual(system.ingress(1000 * 1000, request)[::2], expected[::2])
+            with profiler.stage('block'):
+                np.ones(1000 * 1000)
+        self.assertFalse(profiler.running)
+
+        # the methods are restored
+        for (owner, attribute), original in originals.items():
+            self.assertIs(vars(owner)[attribute], original)
+
+        frame = profiler.frame()
+        self.assertEqual(frame.loc['System.ingress', 'calls'], 5)
+        self.assertEqual(frame.loc['PoP.ingress', 'calls'], 5)
+        self.assertEqual(frame.loc['Request.split', 'calls'], 15)
+        self.assertEqual(frame.loc['block', 'calls'], 1)
+        self.assertGreaterEqual(frame.loc['System.ingress', 'total'], frame.loc['PoP.ingress', 'total'])
+        self.assertTrue(np.all(frame['p99'] <= frame['total']))
+        self.assertLessEqual(frame.loc['System.ingress', 'share'], 1)
+        self.assertNotIn('Results.sort', frame.index)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'profile.json')
+            profiler.save(filename)
+            with open(filename) as f:
+                saved = json.load(f)
+        self.assertEqual(saved['stages']['System.ingress']['calls'], 5)
+        self.assertAlmostEqual(saved['elapsed'], profiler.elapsed)
@@ -1,9 +1,19 @@
+import subprocess
+import sys
 from unittest import TestCase
 from cdn import Request
 import numpy as np
 
 
 class TestRequest(TestCase):
+    def test_imports(self):
+        # the model and the cli loop do not load plotting, pandas or scipy until they are used
+        loaded = subprocess.run([sys.executable, '-c', "import sys, cdn, cdn.montecarlo, cdn.optimizer, cdn.results, "
+                                                       "cdn.pareto; print(*sorted(sys.modules))"],
+                                stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout.split()
+        for module in ['matplotlib', 'pandas', 'scipy', 'tqdm']:
+            self.assertNotIn(module, loaded)
+
     def test_init(self):
         # check empty
         Request()
@@ -62,3 +72,132 @@ class TestRequest(TestCase):
             size = np.random.randint(1, 10 * 1000 * 1000, length)
             request = Request(size, prob)
             request.consistenthashing(5, 2)
+
+    def test_cdf(self):
+        # check empty
+        request = Request()
+        self.assertEqual(request.cdf(0), 1)
+
+        # check against the nearest volume (also with zero sized contents, where volumes repeat)
+        for i in range(10):
+            length = np.random.randint(1, 1000)
+            prob = np.random.random(length)
+            size = np.random.randint(0, 10 * 1000 * 1000, length)
+            size[0] += 1
+            request = Request(size, prob)
+            for volume in np.concatenate([np.random.uniform(-1, request.contentbase + 1, 100), request.volumes[:10]]):
+                idx = np.abs(request.volumes - volume).argmin()
+                self.assertEqual(request.cdf(volume), request._cdf[idx])
+                self.assertEqual(request.pmf(volume), request._pmf[idx])
+
+    def test_sweep(self):
+        # check empty
+        request = Request()
+        ratio, start, meansize = request.sweep([0, 1])
+        self.assertTrue(np.all(ratio == 1))
+
+        # check against cdf() and miss(), also chained
+        for i in range(10):
+            length = np.random.randint(1, 1000)
+            prob = np.random.random(length)
+            size = np.random.randint(1, 10 * 1000 * 1000, length)
+            request = Request(size, prob)
+            volumes = np.random.uniform(0, request.contentbase, 10)
+            ratio, start, meansize = request.sweep(volumes)
+            ratio2, start2, meansize2 = request.sweep(volumes[::-1], start)
+            for n, volume in enumerate(volumes):
+                self.assertEqual(ratio[n], request.cdf(volume))
+                miss = request.miss(volume)
+                self.assertAlmostEqual(meansize[n], miss.meanrequestsize, delta=1e-6 * meansize[n])
+                self.assertAlmostEqual(ratio2[n], miss.cdf(volumes[::-1][n]))
+
+    def test_view(self):
+        for i in range(10):
+            length = np.random.randint(2, 1000)
+            prob = np.random.random(length)
+            size = np.random.randint(1, 10 * 1000 * 1000, length)
+            request = Request(size, prob)
+            volume = np.random.uniform(0, request.contentbase / 2)
+            idx = np.abs(request.volumes - volume).argmin()
+
+            # miss shares the arrays, but behaves like a renormalized copy
+            miss = request.miss(volume)
+            copy = Request(request.sizes[idx + 1:], request._pmf[idx + 1:] / np.sum(request._pmf[idx + 1:]))
+            self.assertTrue(np.shares_memory(miss.sizes, request.sizes))
+            self.assertEqual(miss.contentbase, copy.contentbase)
+            self.assertAlmostEqual(miss.meanrequestsize, copy.meanrequestsize, delta=1e-6 * copy.meanrequestsize)
+            self.assertAlmostEqual(miss.rps2bps(1000), copy.rps2bps(1000), delta=1e-3 * copy.rps2bps(1000))
+            for volume2 in np.random.uniform(0, copy.contentbase, 10):
+                self.assertAlmostEqual(miss.cdf(volume2), copy.cdf(volume2))
+                self.assertAlmostEqual(miss.miss(volume2).meanrequestsize, copy.miss(volume2).meanrequestsize,
+                                       delta=1e-6 * copy.meanrequestsize)
+
+            # hit is the head
+            hit = request.hit(volume)
+            self.assertEqual(hit.contentbase, np.sum(request.sizes[:idx]))
+
+    def test_hashing(self):
+        # check empty
+        request = Request()
+        ratio, share, imbalance = request.hashing([1, 3], 2)
+        self.assertTrue(np.all(imbalance == 1))
+
+        # check against placing the contents one by one (all of them in the head)
+        for i in range(10):
+            length = np.random.randint(1, 300)
+            prob = np.random.random(length)
+            size = np.random.randint(1, 10 * 1000 * 1000, length)
+            request = Request(size, prob)
+            nodes, replication = np.random.randint(1, 12), np.random.randint(1, 12)
+            start = np.random.randint(length)
+            volume = np.random.uniform(0, request.contentbase / 3)
+            ratio, share, imbalance = request.hashing([nodes, 3], replication, volume, start, head=length)
+
+            cut = request._index(nodes * volume / replication, start)
+            copies = min(replication, nodes)
+            load, hit, data = np.zeros(nodes), np.zeros(nodes), np.zeros(nodes)
+            for j in range(length - start):
+                for r in range(copies):
+                    node = (j - r) % nodes
+                    load[node] += request._pmf[start + j] / copies
+                    hit[node] += request._pmf[start + j] * (start + j <= cut) / copies
+                    data[node] += request._pmf[start + j] * request._size[start + j] / copies
+
+            np.testing.assert_allclose(ratio[0, :nodes], np.where(load > 0, hit / np.maximum(load, 1e-300), 1),
+                                       rtol=1e-5, atol=1e-9)
+            np.testing.assert_allclose(share[0, :nodes], data / np.sum(data), rtol=1e-5, atol=1e-9)
+            self.assertAlmostEqual(imbalance[0], np.max(data / np.sum(data)) * nodes, delta=1e-5 * imbalance[0])
+            self.assertTrue(np.all(np.isnan(share[0, nodes:])))
+            self.assertAlmostEqual(np.nansum(share[1]), 1)
+
+    def test_compact(self):
+        for i in range(10):
+            length = np.random.randint(1, 1000)
+            prob = np.random.random(length)
+            size = np.random.choice(np.random.randint(1000, 10 * 1000 * 1000, np.random.randint(1, 300)), length)
+            request = Request(size, prob)
+            compact = Request(size, prob, compact=True)
+            self.assertLessEqual(compact.nbytes, request.nbytes / 2 + compact._sizetable.nbytes)
+            np.testing.assert_array_equal(compact.sizes, request.sizes)
+            self.assertAlmostEqual(compact.contentbase, request.contentbase, delta=6e-8 * request.contentbase)
+            self.assertAlmostEqual(compact.meanrequestsize, request.meanrequestsize,
+                                   delta=2e-7 * request.meanrequestsize)
+
+            # at the volumes of the contents, the sizes are far above the rounding of the volumes
+            volumes = request.volumes[np.random.randint(length, size=10)] + np.random.uniform(-100, 100, 10)
+            ratio, start, meansize = request.sweep(volumes)
+            ratio2, start2, meansize2 = compact.sweep(volumes)
+            np.testing.assert_array_equal(start2, start)
+            np.testing.assert_allclose(ratio2, ratio, atol=1.2e-7)
+            # the byte mass of a tail is a difference of float32 sums of the whole profile
+            mass = np.where(start < length, 1 - request._cdf[start - 1], 0)
+            np.testing.assert_array_less(np.abs(meansize2 - meansize), 2e-7 * (meansize + request.meanrequestsize) /
+                                         np.maximum(mass, 1e-300) + 1)
+
+            # views and hashing
+            volume = volumes[0]
+            self.assertAlmostEqual(compact.miss(volume).cdf(volume / 2), request.miss(volume).cdf(volume / 2),
+                                   delta=1.2e-7 / max(mass[0], 1e-300) + 1e-9)
+            _, share, imbalance = request.hashing([3, 5], 2, volume / 4)
+            _, share2, imbalance2 = compact.hashing([3, 5], 2, volume / 4)
+            np.testing.assert_allclose(share2, share, rtol=1e-5, atol=1e-7)
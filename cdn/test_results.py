@@ -0,0 +1,32 @@
+import os
+import tempfile
+from unittest import TestCase
+from cdn.results import Results
+import numpy as np
+
+
+class TestResults(TestCase):
+    def test_sort(self):
+        for chunksize in [1, 7, 1000]:
+            with tempfile.TemporaryDirectory() as directory:
+                filename = os.path.join(directory, 'results.csv')
+                results = Results(filename, [('valid', bool), ('cost', float), ('num', int)], header="a\nb",
+                                  chunksize=chunksize)
+                num = np.random.randint(1, 100)
+                valid = np.random.random(num) > 0.5
+                cost = np.random.randint(0, 10, num) * 1.5
+                results.extend(valid=valid[:num // 2], cost=cost[:num // 2], num=np.arange(num // 2))
+                for n in range(num // 2, num):
+                    results.append(valid=valid[n], cost=cost[n], num=n)
+                self.assertEqual(len(results), num)
+
+                results.sort(by=['valid', 'cost'], ascending=False)
+                with open(filename) as f:
+                    self.assertEqual(f.readline(), "# a\n")
+                    self.assertEqual(f.readline(), "# b\n")
+
+                frame = results.frame()
+                self.assertEqual(list(frame.columns), ['valid', 'cost', 'num'])
+                expected = sorted(zip(valid, cost), reverse=True)
+                self.assertEqual(list(zip(frame.valid, frame.cost)), expected)
+                np.testing.assert_array_equal(frame.index, frame.num)
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from cdn import FactorizedLiveTV, LiveTV, Memo
+from cdn.montecarlo import MonteCarlo
+from cdn.scenarios import Scenarios
+import numpy as np
+
+
+class TestScenarios(TestCase):
+    def test_run(self):
+        defaults = {'channels': 20, 'zipf': 1.2, 'timeshift': [1, 0.3, 0.2], 'fragmentlen': 10,
+                    'profiles': [1, 2], 'bandwidths': [3, 6], 'iterations': 2500}
+        scenarios = [{'name': 'small', 'peak': 1, 'pops': 4, 'seed': 1},
+                     {'name': 'large', 'peak': 10, 'pops': 8, 'seed': 2},
+                     {'name': 'ladder', 'peak': 1, 'pops': 4, 'seed': 1, 'bandwidths': [3, 8]}]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'scenarios.json')
+            with open(filename, 'wt') as f:
+                json.dump({'defaults': defaults, 'scenarios': scenarios}, f)
+            batch = Scenarios.load(filename)
+            self.assertEqual(len(batch), 3)
+            self.assertEqual(batch.profiles, 2)
+            self.assertEqual(batch.names, ['small', 'large', 'ladder'])
+
+            # the same designs as a cli run of each scenario
+            blocks = list(batch.run(blocksize=1000))
+            self.assertEqual([name for name, _ in blocks], ['small'] * 3 + ['large'] * 3 + ['ladder'] * 3)
+            for n, scenario in enumerate(scenarios):
+                scenario = dict(defaults, **scenario)
+                request = Scenarios.livetv(*[scenario[name] for name in Scenarios.profile])
+                montecarlo = MonteCarlo(request, scenario['pops'], scenario['peak'] * 1000 ** 4)
+                for expected, (_, block) in zip(montecarlo.run(scenario['iterations'], scenario['seed'],
+                                                               blocksize=1000), blocks[3 * n:3 * n + 3]):
+                    for name in expected:
+                        np.testing.assert_array_equal(block[name], expected[name])
+
+            # combined results, also from workers
+            results, paretos = batch.save(os.path.join(directory, 'results.csv'),
+                                          os.path.join(directory, 'pareto.csv'), workers=2)
+            frame = results.frame()
+            self.assertEqual(len(frame), 3 * 2500)
+            self.assertEqual(sorted(frame['scenario'].unique()), ['ladder', 'large', 'small'])
+            blocks = list(batch.run())
+            for name in batch.names:
+                cost = sum(np.sum(block['cost']) for other, block in blocks if other == name)
+                self.assertAlmostEqual(frame[frame['scenario'] == name]['cost'].sum(), cost, delta=1e-9 * cost)
+            self.assertEqual(set(paretos), {'small', 'large', 'ladder'})
+            with open(os.path.join(directory, 'pareto.csv')) as f:
+                self.assertEqual(len(f.readlines()), 1 + sum(len(pareto) for pareto in paretos.values()))
+
+        with self.assertRaises(AssertionError):
+            Scenarios([dict(defaults, peak=1)])
+
+        # the values of a profile are compared as numbers
+        same = dict(defaults, zipf='1.2', fragmentlen=10.0, profiles=[1.0, 2], peak=1, pops=4)
+        batch = Scenarios([dict(defaults, name='a', peak=1, pops=4), dict(same, name='b'), dict(same, name='c')])
+        self.assertEqual(batch.profiles, 1)
+
+    def test_livetv(self):
+        # the request profile of the cli options, its zipf parameter given or fitted
+        self.assertEqual(Scenarios.zipf('1.2'), (1.2, None))
+        self.assertEqual(Scenarios.zipf(0.8), (0.8, None))
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'channels.csv')
+            np.savetxt(filename, np.column_stack([np.arange(50), np.round(1e6 / np.arange(1, 51) ** 1.3)]),
+                       delimiter=',', fmt='%d')
+            s, (low, high) = Scenarios.zipf(filename)
+            self.assertAlmostEqual(s, 1.3, delta=0.01)
+            self.assertTrue(low < s < high)
+            self.assertEqual(Scenarios.livetv(20, filename, [1, 0.3, 0.2], 10, [1, 2], [3, 6])._s, s)
+
+        request = Scenarios.livetv(20, 1.2, [1, 0.3, 0.2], 10, [1, 2], [3, 6])
+        expected = LiveTV(20, 360, np.array([1., 2.]), np.array([3, 6]) * 1000 * 1000 / 8 * 10., 1.2, 108, 72)
+        factorized = Scenarios.livetv(20, 1.2, [1, 0.3, 0.2], 10, [1, 2], [3, 6], memo=Memo())
+        self.assertIsInstance(factorized, FactorizedLiveTV)
+        volumes = np.random.uniform(0, expected.contentbase, 10)
+        ratio, start, meansize = expected.sweep(volumes)
+        for result, values in zip(request.sweep(volumes), [ratio, start, meansize]):
+            np.testing.assert_allclose(result, values, rtol=1e-9)
+        # the miss streams of a factorized profile do not start at ranks
+        for result, values in zip(factorized.sweep(volumes)[::2], [ratio, meansize]):
+            np.testing.assert_allclose(result, values, rtol=1e-9)
@@ -0,0 +1,90 @@
+from unittest import TestCase, mock
+from cdn import simulator
+from cdn.simulator import LRU, LFU, TTL
+from collections import OrderedDict
+import numpy as np
+
+
+class TestSimulator(TestCase):
+    @staticmethod
+    def modes():
+        """
+        The vectorized and, if numba is installed, the compiled simulation.
+        """
+        return [False, True] if simulator.numba is not None else [False]
+
+    @staticmethod
+    def chunks(cache, content, size, time=None):
+        """
+        Replays the requests in random chunks.
+        """
+        bounds = np.unique(np.concatenate([[0, content.size], np.random.randint(0, content.size + 1, 5)]))
+        return np.concatenate([cache.feed(content[start:stop], size[start:stop],
+                                          time[start:stop] if time is not None else None)
+                               for start, stop in zip(bounds[:-1], bounds[1:])])
+
+    def test_lru(self):
+        # check against a linked hash map
+        for i in range(20):
+            length = np.random.randint(1, 200)
+            sizes = np.random.randint(1, 100, length)
+            content = np.random.zipf(1.2, np.random.randint(1, 3000)) % length
+            capacity = np.random.randint(0, np.sum(sizes) + 1)
+
+            cache, used, hits = OrderedDict(), 0, []
+            for c in content.tolist():
+                hits.append(c in cache)
+                if c in cache:
+                    cache.move_to_end(c)
+                else:
+                    cache[c] = sizes[c]
+                    used += sizes[c]
+                    while used > capacity:
+                        used -= cache.popitem(last=False)[1]
+
+            for compiled in self.modes():
+                with mock.patch.object(simulator, 'compiled', compiled):
+                    lru = LRU(capacity)
+                np.testing.assert_array_equal(self.chunks(lru, content * 7 - 50, sizes[content]), hits)
+                self.assertEqual(lru.volume, used)
+
+    def test_lfu(self):
+        # check against sorting the request counts
+        for i in range(20):
+            length = np.random.randint(1, 200)
+            sizes = np.random.randint(1, 100, length)
+            content = np.random.zipf(1.2, np.random.randint(1, 3000)) % length
+            capacity = np.random.randint(0, np.sum(sizes) + 1)
+            period = np.random.randint(1, 200)
+
+            counts, cached, hits = np.zeros(length, dtype=int), set(), []
+            for start in range(0, content.size, period):
+                for c in content[start:start + period].tolist():
+                    hits.append(c in cached)
+                    counts[c] += 1
+                order = [c for c in np.argsort(-counts, kind='stable') if counts[c]]
+                cached = set(np.array(order)[np.cumsum(sizes[order]) <= capacity].tolist())
+
+            for compiled in self.modes():
+                with mock.patch.object(simulator, 'compiled', compiled):
+                    lfu = LFU(capacity, period)
+                np.testing.assert_array_equal(self.chunks(lfu, content, sizes[content]), hits)
+
+    def test_ttl(self):
+        # check against the time of the last requests
+        for i in range(20):
+            length = np.random.randint(1, 200)
+            content = np.random.zipf(1.2, np.random.randint(1, 3000)) % length
+            time = np.cumsum(np.random.exponential(1, content.size))
+            ttl = np.random.uniform(0, 50)
+
+            last, hits = {}, []
+            for c, t in zip(content.tolist(), time.tolist()):
+                hits.append(c in last and t - last[c] < ttl)
+                last[c] = t
+
+            for compiled in self.modes():
+                with mock.patch.object(simulator, 'compiled', compiled):
+                    cache = TTL(ttl)
+                np.testing.assert_array_equal(self.chunks(cache, content, np.ones(content.size), time), hits)
+                self.assertEqual(cache.volume, sum(time[-1] - t < ttl for t in last.values()))
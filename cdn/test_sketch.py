@@ -0,0 +1,36 @@
+from unittest import TestCase
+from cdn import Request, Sketch, System, DellR750
+import numpy as np
+
+
+class TestSketch(TestCase):
+    def test_request(self):
+        for error in [1e-2, 1e-3, 1e-4]:
+            size = np.random.randint(1, 10 * 1000 * 1000 * 1000, 10000)
+            request = Request(size, 1 / np.arange(1, size.size + 1) ** 0.8)
+            sketch = Sketch(request, error)
+            self.assertLess(sketch.knots, request.numcontents)
+            self.assertAlmostEqual(sketch.contentbase / request.contentbase, 1)
+            self.assertAlmostEqual(sketch.meanrequestsize / request.meanrequestsize, 1)
+            self.assertAlmostEqual(sketch.rps2bps(1000) / request.rps2bps(1000), 1)
+
+            # no content is more popular than error, so the interpolation is within error everywhere
+            volumes = np.random.uniform(0, request.contentbase, 1000)
+            ratio, _, _ = sketch.sweep(volumes)
+            ratio2, _, _ = request.sweep(volumes)
+            self.assertLessEqual(np.max(np.abs(ratio - ratio2)), error)
+            for volume in volumes[:10]:
+                self.assertLessEqual(abs(sketch.cdf(volume) - request.cdf(volume)), error)
+
+            # the miss streams are chained through the tiers
+            system, system2 = System(5, sketch, DellR750(), DellR750()), System(5, request, DellR750(), DellR750())
+            for s in [system, system2]:
+                s.nummodulesec, s.numecpop, s.replication, s.storage1ec, s.nummc = 4, 4, 2, 0.5, 2
+            _, _, _, chr_ec, _, _, _, chr_mc = system.ingress(1000 * 1000, sketch)
+            rps2_, _, _, chr_ec2, _, _, _, chr_mc2 = system2.ingress(1000 * 1000, request)
+            self.assertAlmostEqual(chr_ec, chr_ec2, delta=10 * error)
+            # the master caches hit the miss stream of the PoPs, its hit ratio error is amplified by 1 / its
+            # probability mass (the share of the requests reaching them), which is floored, so a tiny share does not
+            # let any ratio pass
+            share = rps2_ * 5 / (1000 * 1000)
+            self.assertAlmostEqual(chr_mc, chr_mc2, delta=10 * error / max(share, 0.1))
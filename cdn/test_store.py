@@ -0,0 +1,64 @@
+import tempfile
+import time
+from unittest import TestCase
+from cdn import LiveTV, Store
+import numpy as np
+
+
+class TestStore(TestCase):
+    def test_livetv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = Store(directory)
+            for i in range(5):
+                channels, fragments = np.random.randint(1, 50), np.random.randint(1, 200)
+                profiles = np.random.random(3) + 0.1
+                sizes = np.random.randint(1, 10 * 1000 * 1000, 3).astype(float)
+                s, mu, sigma = np.random.uniform(0.5, 2), np.random.uniform(0, fragments), fragments / 4 + 1
+                built = LiveTV(channels, fragments, profiles, sizes, s, mu, sigma, store)
+                self.assertEqual(len(store), 1)
+
+                # memory mapped on the next build, the same profile
+                loaded = LiveTV(channels, fragments, profiles, sizes, s, mu, sigma, store)
+                self.assertEqual(len(store), 1)
+                self.assertIsInstance(loaded.sizes, np.memmap)
+                for name in Store.arrays:
+                    np.testing.assert_array_equal(getattr(loaded, name), getattr(built, name))
+                volumes = np.random.uniform(0, built.contentbase, 10)
+                for result, expected in zip(loaded.sweep(volumes), built.sweep(volumes)):
+                    np.testing.assert_array_equal(result, expected)
+                self.assertEqual(loaded.describe(5), built.describe(5))
+
+                # the compact profile is another one, with its sizes
+                compact = LiveTV(channels, fragments, profiles, sizes, s, mu, sigma, store, compact=True)
+                loaded = LiveTV(channels, fragments, profiles, sizes, s, mu, sigma, store, compact=True)
+                self.assertEqual(len(store), 2)
+                np.testing.assert_array_equal(loaded.sizes, compact.sizes)
+                np.testing.assert_array_equal(loaded.volumes, compact.volumes)
+                self.assertEqual(loaded.nbytes, compact.nbytes)
+                Store(directory, budget=1).evict()
+
+                # other parameters are another profile
+                LiveTV(channels, fragments, profiles, sizes, s, mu, sigma, store)
+                LiveTV(channels, fragments, profiles, sizes, s + 0.01, mu, sigma, store)
+                self.assertEqual(len(store), 2)
+                Store(directory, budget=1).evict()
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = Store(directory)
+            profiles, sizes = np.ones(2), np.array([1000., 2000.])
+            keys = []
+            for channels in range(1, 5):
+                LiveTV(channels, 100, profiles, sizes, 1, 10, 5, store)
+                keys.append(Store.key('LiveTV', channels, 100, profiles, sizes, 1, 10, 5, False))
+                time.sleep(0.01)
+            self.assertTrue(all(key in store for key in keys))
+
+            # the least recently used ones go first
+            self.assertTrue(store.load(keys[0], LiveTV(1, 1, profiles, sizes, 1, 1, 1)))
+            size = store.nbytes
+            Store(directory, budget=size * 0.6).evict()
+            self.assertIn(keys[0], store)
+            self.assertIn(keys[3], store)
+            self.assertNotIn(keys[1], store)
+            self.assertLessEqual(store.nbytes, size * 0.6)
@@ -0,0 +1,98 @@
+from unittest import TestCase
+from cdn import Request, System, DellR750
+import numpy as np
+
+
+class TestSystem(TestCase):
+    def test_batch(self):
+        for i in range(5):
+            length = np.random.randint(1, 10000)
+            prob = np.random.zipf(1.5, length).astype(float)
+            size = np.random.randint(1, 10 * 1000 * 1000 * 1000, length)
+            request = Request(size, prob)
+            ec, mc = DellR750(), DellR750()
+            system = System(np.random.randint(1, 10), request, ec, mc)
+            numrequests = np.random.randint(1, 1000 * 1000)
+
+            num = 20
+            replication = np.random.randint(1, 10 + 1, num)
+            storage1ec = np.random.random(num)
+            nummodulesec = np.random.randint(ec.minmodules, ec.maxmodules + 1, num)
+            numecpop = np.random.randint(1, 40 + 1, num)
+            nummodulesmc = np.random.randint(mc.minmodules, mc.maxmodules + 1, num)
+            nummc = np.random.randint(1, 5, num)
+            results = system.batch(numrequests, request, replication, storage1ec, nummodulesec, numecpop,
+                                   nummodulesmc, nummc)
+
+            for n in range(num):
+                system.replication = int(replication[n])
+                system.storage1ec = storage1ec[n]
+                system.nummodulesec = int(nummodulesec[n])
+                system.numecpop = int(numecpop[n])
+                system.nummodulesmc = int(nummodulesmc[n])
+                system.nummc = int(nummc[n])
+                rps2, _, util_ec, chr_ec, rps3, _, util_mc, chr_mc = system.ingress(numrequests, request)
+
+                np.testing.assert_allclose([rps2, util_ec, chr_ec, rps3, util_mc, chr_mc, system.cost],
+                                           [result[n] for result in results], rtol=1e-9)
+
+            # the load of the edge caches is the utilization of a single one without replication
+            np.testing.assert_allclose(system.edgeload(numrequests, request, storage1ec, nummodulesec),
+                                       system.batch(numrequests, request, 1, storage1ec, nummodulesec, 1,
+                                                    nummodulesmc, nummc)[1], rtol=1e-9)
+
+    def test_chr_mc(self):
+        # the master caches serve the misses of all PoPs: chr_mc is the share of them hit, the same for any number of
+        # PoPs of the same load each (it divided by the misses of one PoP before)
+        length = np.random.randint(1000, 10000)
+        request = Request(np.random.randint(1, 10 * 1000 * 1000 * 1000, length),
+                          np.random.zipf(1.5, length).astype(float))
+        ratios = []
+        for numpops in [1, 2, 7]:
+            system = System(numpops, request, DellR750(), DellR750())
+            system.replication, system.storage1ec, system.numecpop = 2, 0.3, 3
+            numrequests = numpops * 100 * 1000 * 1000
+            rps2, _, _, _, rps3, _, _, chr_mc = system.ingress(numrequests, request)
+            self.assertAlmostEqual(chr_mc, 1 - rps3 / (rps2 * numpops), delta=1e-12)
+            self.assertTrue(0 <= chr_mc <= 1)
+            results = system.batch(numrequests, request, 2, 0.3, system.nummodulesec, 3, system.nummodulesmc,
+                                   system.nummc)
+            self.assertAlmostEqual(float(results[5]), chr_mc, delta=1e-12)
+            ratios.append(chr_mc)
+        # the PoPs get the same requests, only the truncation of the misses to whole requests moves chr_mc, by less
+        # than 1 / rps2
+        np.testing.assert_allclose(ratios, ratios[0], atol=1 / rps2)
+
+    def test_incremental(self):
+        # single knob edits recompute the stages depending on them only, with the results of a fresh system
+        length = np.random.randint(1, 10000)
+        request = Request(np.random.randint(1, 10 * 1000 * 1000 * 1000, length),
+                          np.random.zipf(1.5, length).astype(float))
+        system = System(5, request, DellR750(), DellR750())
+        numrequests = np.random.randint(1, 1000 * 1000)
+        self.assertEqual(system.stale, ['dedicated', 'hashed', 'master'])
+        system.ingress(numrequests, request)
+        self.assertEqual(system.stale, [])
+
+        knobs = {'numpops': ([], lambda: np.random.randint(1, 10)),
+                 'replication': (['hashed', 'master'], lambda: np.random.randint(1, 10 + 1)),
+                 'storage1ec': (['dedicated', 'hashed', 'master'], lambda: np.random.random()),
+                 'numecpop': (['hashed', 'master'], lambda: np.random.randint(1, 40 + 1)),
+                 'nummodulesec': (['dedicated', 'hashed', 'master'], lambda: np.random.randint(1, 16 + 1)),
+                 'nummodulesmc': (['master'], lambda: np.random.randint(1, 16 + 1)),
+                 'nummc': (['master'], lambda: np.random.randint(1, 5))}
+        values = {}
+        for i in range(50):
+            name = np.random.choice(list(knobs))
+            stale, value = knobs[name]
+            values[name] = value() if name == 'storage1ec' else int(value())
+            setattr(system, name, values[name])
+            self.assertEqual(system.stale, stale)
+            results = system.ingress(numrequests, request)
+
+            fresh = System(system.numpops, request, DellR750(), DellR750())
+            for knob, val in values.items():
+                setattr(fresh, knob, val)
+            expected = fresh.ingress(numrequests, request)
+            np.testing.assert_allclose([results[n] for n in [0, 2, 3, 4, 6, 7]],
+                                       [expected[n] for n in [0, 2, 3, 4, 6, 7]], rtol=1e-12)
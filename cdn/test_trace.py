@@ -0,0 +1,97 @@
+from unittest import TestCase, mock
+from cdn import Request, System, DellR750, simulator
+from cdn.trace import Trace, Replay
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+
+
+class TestTrace(TestCase):
+    def test_trace(self):
+        # the csv and the npy logs give the same chunks
+        with tempfile.TemporaryDirectory() as directory:
+            length = np.random.randint(1, 10000)
+            log = np.zeros(length, dtype=[('time', float), ('content', np.int64), ('size', np.int64)])
+            log['time'] = np.cumsum(np.random.random(length))
+            log['content'] = np.random.zipf(1.5, length)
+            log['size'] = log['content'] * 1000
+            np.save(os.path.join(directory, 'log.npy'), log)
+            pd.DataFrame(log).to_csv(os.path.join(directory, 'log.csv'), header=False, index=False)
+            pd.DataFrame({'content': log['content'].astype(str), 'size': log['size']}).to_csv(
+                os.path.join(directory, 'named.csv'), header=False, index=False)
+
+            chunksize = np.random.randint(1, 1000)
+            csv = list(Trace(os.path.join(directory, 'log.csv'), chunksize=chunksize))
+            npy = list(Trace(os.path.join(directory, 'log.npy'), chunksize=chunksize))
+            named = list(Trace(os.path.join(directory, 'named.csv'), ['content', 'size'], chunksize=chunksize))
+            self.assertEqual(len(csv), int(np.ceil(length / chunksize)))
+            for (time, content, size), (time2, content2, size2), (time3, content3, size3) in zip(csv, npy, named):
+                np.testing.assert_allclose(time, time2)
+                np.testing.assert_array_equal(content, content2)
+                np.testing.assert_array_equal(size, size2)
+                self.assertIsNone(time3)
+                np.testing.assert_array_equal(size, size3)
+
+            # the hashed names identify the same contents
+            content = np.concatenate([chunk[1] for chunk in csv])
+            content3 = np.concatenate([chunk[1] for chunk in named])
+            self.assertEqual(np.unique(content).size, np.unique(content3).size)
+            self.assertEqual(np.unique(np.stack([content, content3]), axis=1).shape[1], np.unique(content).size)
+
+    def test_replay(self):
+        for i in range(5):
+            length = np.random.randint(1, 1000)
+            sizes = np.random.randint(1, 100 * 1000 * 1000, length)
+            content = np.random.zipf(1.2, 10000) % length
+            system = System(np.random.randint(1, 5), Request(), DellR750(), DellR750())
+            system.numecpop = np.random.randint(1, 10)
+            system.storage1ec = np.random.random()
+
+            for policy in Replay.policies:
+                replay = Replay(system, policy, ttl=1000)
+                for start in range(0, content.size, 1000):
+                    replay.feed(np.arange(start, start + 1000, dtype=float), content[start:start + 1000],
+                                sizes[content[start:start + 1000]])
+                frame = replay.frame()
+
+                # the misses of a tier are the requests of the next one
+                self.assertEqual(frame['requests']['ec1'], content.size)
+                self.assertEqual(frame['requests']['ec2'], frame['requests']['ec1'] - frame['hits']['ec1'])
+                self.assertEqual(frame['requests']['mc'], frame['requests']['ec2'] - frame['hits']['ec2'])
+
+                # only the first requests miss on a master cache holding all the contents
+                if policy == 'lru' and system.nummc * system.storagemc >= np.sum(sizes):
+                    self.assertAlmostEqual(frame['ingress']['mc'] * replay.duration / 8,
+                                           np.sum(sizes[np.unique(content)]), delta=1)
+
+                # the profile of the trace
+                profile = replay.profile()
+                self.assertEqual(profile.numcontents, np.unique(content).size)
+                self.assertAlmostEqual(profile.meanrequestsize, np.mean(sizes[content]),
+                                       delta=1e-6 * profile.meanrequestsize)
+                compare = replay.compare()
+                self.assertTrue(np.all((compare['chr'] >= 0) & (compare['chr'] <= 1)))
+
+    def test_compiled(self):
+        # the compiled and the vectorized caches give the same replay
+        length = 500
+        sizes = np.random.randint(1, 2000 * 1000 * 1000, length)
+        content = np.random.zipf(1.2, 20000) % length * 7919
+        time = np.cumsum(np.random.exponential(1, content.size))
+        system = System(3, Request(), DellR750(), DellR750())
+        system.storage1ec = 0.1
+        for policy in Replay.policies:
+            frames, profiles = [], []
+            for compiled in ([False, True] if simulator.numba is not None else [False]):
+                with mock.patch.object(simulator, 'compiled', compiled):
+                    replay = Replay(system, policy, seed=1, ttl=100, period=700)
+                    for start in range(0, content.size, 3000):
+                        chunk = slice(start, start + 3000)
+                        replay.feed(time[chunk], content[chunk], sizes[content[chunk] % length])
+                frames.append(replay.frame())
+                profiles.append(replay.profile())
+            for frame, profile in zip(frames[1:], profiles[1:]):
+                pd.testing.assert_frame_equal(frame, frames[0])
+                np.testing.assert_array_equal(profile.sizes, profiles[0].sizes)
+                np.testing.assert_allclose(profile._pmf, profiles[0]._pmf)
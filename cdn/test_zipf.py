@@ -0,0 +1,36 @@
+from unittest import TestCase
+from cdn.zipf import harmonic, pmf, fit
+from scipy.stats import zipfian
+import numpy as np
+
+
+class TestZipf(TestCase):
+    def test_harmonic(self):
+        for s in np.concatenate([[0, 1 - 1e-9, 1, 1 + 1e-9], np.random.uniform(0, 4, 10)]):
+            n = np.concatenate([np.arange(40), np.random.randint(1, 100000, 10)])
+            direct = [np.sum(np.arange(1, k + 1, dtype=float) ** -s) for k in n]
+            np.testing.assert_allclose(harmonic(n, s), direct, rtol=1e-10)
+
+        k = np.arange(1, 301)
+        np.testing.assert_allclose(pmf(k, 1.56, 300), zipfian.pmf(k, 1.56, 300), rtol=1e-10)
+
+    def test_fit(self):
+        for i in range(5):
+            s, n = np.random.uniform(0.3, 2), np.random.randint(10, 1000)
+            counts = np.random.multinomial(1000 * 1000, pmf(np.arange(1, n + 1), s, n))
+            np.random.shuffle(counts)
+
+            fitted, low, high = fit(counts)
+            self.assertLess(low, fitted)
+            self.assertLess(fitted, high)
+            self.assertAlmostEqual(fitted, s, delta=2 * (high - low))
+
+            # binned and ordered counts
+            binned, low2, high2 = fit(np.sort(counts)[::-1], bins=20, ranked=True)
+            self.assertAlmostEqual(binned, fitted, delta=high2 - low2)
+
+            # the direct likelihood is not higher anywhere near
+            total, logranks = np.sum(counts), np.dot(np.sort(counts)[::-1], np.log(np.arange(1, n + 1)))
+            likelihood = [-x * logranks - total * np.log(np.sum(np.arange(1, n + 1.) ** -x))
+                          for x in fitted + np.array([-1e-3, 0, 1e-3])]
+            self.assertEqual(np.argmax(likelihood), 1)
@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+from cdn import Request, System
+from cdn.simulator import LRU, LFU, TTL, Catalog
+from typing import Iterator, Optional, Sequence, Tuple
+
+
+class Trace:
+    def __init__(self, filename: str, names: Sequence[str] = ('time', 'content', 'size'), chunksize: int = 1 << 20,
+                 **kwargs):
+        """
+        Request log read chunk by chunk, it is never loaded whole: a csv log is parsed by pandas in chunks, a .npy log
+        (structured array with the same field names) is memory mapped. The content ids may be integers or strings
+        (hashed).
+        :param filename: csv or npy file
+        :param names: column names of the log, content and size (Byte) are needed, time (s) is optional
+        :param chunksize: number of requests in a chunk
+        :param kwargs: passed to pandas.read_csv(), no header by default
+        """
+        assert {'content', 'size'} <= set(names), f"Wrong names: {names}"
+        assert chunksize > 0, f"non positive chunksize: {chunksize}"
+        self._filename = filename
+        self._names = list(names)
+        self._chunksize = chunksize
+        self._kwargs = dict({'header': None}, **kwargs)
+
+    @property
+    def timed(self) -> bool:
+        return 'time' in self._names
+
+    @staticmethod
+    def _ids(content: np.ndarray) -> np.ndarray:
+        """
+        Returns the content ids as integers.
+        """
+        content = np.asarray(content)
+        if content.dtype.kind in 'iub':
+            return content.astype(np.int64)
+        return pd.util.hash_array(content.astype(object)).view(np.int64)
+
+    def __iter__(self) -> Iterator[Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]]:
+        """
+        Iterates over the chunks.
+        :return: iterator of (request times or None, content ids, content sizes) arrays
+        """
+        usecols = [name for name in ('time', 'content', 'size') if name in self._names]
+        if self._filename.endswith('.npy'):
+            log = np.load(self._filename, mmap_mode='r')
+            chunks = (log[start:start + self._chunksize] for start in range(0, log.size, self._chunksize))
+        else:
+            chunks = pd.read_csv(self._filename, names=self._names, usecols=usecols, chunksize=self._chunksize,
+                                 **self._kwargs)
+
+        for chunk in chunks:
+            yield np.asarray(chunk['time'], dtype=float) if self.timed else None, self._ids(chunk['content']), \
+                  np.asarray(chunk['size'], dtype=np.int64)
+
+
+class Replay:
+    policies = ['lru', 'lfu', 'ttl']
+    tiers = ['ec1', 'ec2', 'mc']
+
+    def __init__(self, system: System, policy: str = 'lru', seed: Optional[int] = None, ttl: Optional[float] = None,
+                 period: Optional[int] = None):
+        """
+        Trace driven simulation of the cache tiers of System.ingress(): in each PoP the dedicated storage of the edge
+        caches (ec1) and the consistent hashed edge caches (ec2, a cache of their unique volume), and the master
+        caches (mc) behind all PoPs. The requests are spread over the PoPs at random.
+        :param system: configured system
+        :param policy: cache replacement policy, see policies
+        :param seed: seed of the PoP selection, None for a random run
+        :param ttl: time to live of the ttl policy (s), the sizes of the tiers are not used then
+        :param period: refresh period of the lfu policy, see LFU
+        """
+        assert policy in self.policies, f"Wrong policy: {policy}"
+        assert policy != 'ttl' or ttl is not None, "ttl policy needs the ttl"
+        self._system = system
+        self._timed = policy == 'ttl'
+        self._rng = np.random.default_rng(seed)
+
+        capacities = [system.storage1ec,
+                      system.numecpop * (system.storageec - system.storage1ec) / system.replication,
+                      system.nummc * system.storagemc]
+        counts = [system.numpops, system.numpops, 1]
+        make = {'lru': lambda capacity: LRU(capacity), 'lfu': lambda capacity: LFU(capacity, period),
+                'ttl': lambda capacity: TTL(ttl)}[policy]
+        self._caches = [[make(capacity) for _ in range(count)] for capacity, count in zip(capacities, counts)]
+
+        # requests, hits, bytes and missed bytes of the tiers
+        self._requests = np.zeros(len(self.tiers), dtype=np.int64)
+        self._hits = np.zeros(len(self.tiers), dtype=np.int64)
+        self._bytes = np.zeros(len(self.tiers), dtype=np.int64)
+        self._missbytes = np.zeros(len(self.tiers), dtype=np.int64)
+
+        # requests of the contents and the time span of the trace
+        self._catalog = Catalog()
+        self._span = [np.inf, -np.inf]
+
+    @property
+    def requests(self) -> int:
+        return int(self._requests[0])
+
+    @property
+    def duration(self) -> float:
+        """
+        Time span of the trace (s), the number of requests without request times.
+        """
+        return self._span[1] - self._span[0] if self._span[1] > self._span[0] else float(self.requests)
+
+    def _tally(self, tier: int, size: np.ndarray, hits: np.ndarray):
+        self._requests[tier] += size.size
+        self._hits[tier] += np.count_nonzero(hits)
+        self._bytes[tier] += np.sum(size)
+        self._missbytes[tier] += np.sum(size[~hits])
+
+    def feed(self, time: Optional[np.ndarray], content: np.ndarray, size: np.ndarray):
+        """
+        Replays a chunk of requests through the tiers.
+        :param time: request times (s), not decreasing, or None
+        :param content: integer content ids
+        :param size: content sizes (Byte)
+        :return:
+        """
+        assert time is not None or not self._timed, "ttl policy needs the request times"
+        self._catalog.feed(content, size)
+        if time is not None and time.size:
+            self._span = [min(self._span[0], time[0]), max(self._span[1], time[-1])]
+
+        # the requests of each PoP in their order, by a stable (radix) sort of the PoPs
+        numpops = len(self._caches[0])
+        pops = self._rng.integers(numpops, size=content.size).astype(np.min_scalar_type(numpops - 1))
+        order = np.argsort(pops, kind='stable')
+        missed = np.zeros(content.size, dtype=bool)
+        for ec1, ec2, idx in zip(self._caches[0], self._caches[1],
+                                 np.split(order, np.cumsum(np.bincount(pops, minlength=numpops))[:-1])):
+            for tier, cache in enumerate([ec1, ec2]):
+                hits = cache.feed(content[idx], size[idx], time[idx] if time is not None else None)
+                self._tally(tier, size[idx], hits)
+                idx = idx[~hits]
+            missed[idx] = True
+
+        idx = np.flatnonzero(missed)
+        hits = self._caches[2][0].feed(content[idx], size[idx], time[idx] if time is not None else None)
+        self._tally(2, size[idx], hits)
+
+    def run(self, trace: Trace) -> 'Replay':
+        """
+        Replays a whole trace, chunk by chunk.
+        :param trace:
+        :return: self
+        """
+        for time, content, size in trace:
+            self.feed(time, content, size)
+        return self
+
+    def profile(self) -> Request:
+        """
+        Returns the request profile of the trace so far.
+        :return:
+        """
+        _, sizes, counts = self._catalog.columns()
+        return Request(sizes[counts > 0], counts[counts > 0].astype(float))
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Returns the measured requests, hits, CHR and ingress throughput (bps, of the misses) of the tiers.
+        :return:
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.DataFrame({'requests': self._requests, 'hits': self._hits, 'chr': self._hits / self._requests,
+                                 'ingress': self._missbytes * 8 / self.duration}, index=self.tiers)
+
+    def compare(self) -> pd.DataFrame:
+        """
+        Returns the measured CHR and ingress throughput (bps) of the edge and of the master caches next to the ones of
+        System.ingress() on the request profile of the trace, both with the CHR definitions of System.ingress().
+        :return:
+        """
+        numpops, duration = self._system.numpops, self.duration
+        rps2, ingress2, _, chr_ec, rps3, ingress3, _, chr_mc = self._system.ingress(self.requests, self.profile())
+        requests, misses = self._requests, self._requests - self._hits
+        with np.errstate(divide='ignore', invalid='ignore'):
+            measured = [1 - (misses[0] + misses[1]) / (requests[0] + requests[1]), 1 - misses[2] / requests[2]]
+        return pd.DataFrame({'chr': measured, 'chr_model': [chr_ec, chr_mc],
+                             'ingress': self._missbytes[1:] * 8 / duration,
+                             'ingress_model': [ingress2.rps2bps(rps2 * numpops) / duration if rps2 else 0.,
+                                               ingress3.rps2bps(rps3) / duration if rps3 else 0.]}, index=['ec', 'mc'])
+
+
+if __name__ == '__main__':
+    from cdn import DellR750
+    from tqdm.auto import tqdm
+    import argparse
+    import time as clock
+
+    parser = argparse.ArgumentParser(description='Trace driven check of the CDN model.')
+    parser.add_argument('log', help='request log, csv or npy')
+    parser.add_argument('--names', nargs='+', default=['time', 'content', 'size'],
+                        help='column names of the log (time, content, size, others are skipped)')
+    parser.add_argument('--chunksize', type=int, default=1 << 20, help='number of requests read at once')
+    parser.add_argument('--pops', type=int, help='number of PoPs', required=True)
+    parser.add_argument('--replication', type=int, default=1, help='replication in a PoP')
+    parser.add_argument('--storage1ec', type=float, default=0.1, help='ratio of the dedicated storage')
+    parser.add_argument('--nummodulesec', type=int, default=1, help='number of memory modules in an edge cache')
+    parser.add_argument('--numecpop', type=int, default=1, help='number of edge caches in a PoP')
+    parser.add_argument('--nummodulesmc', type=int, default=1, help='number of memory modules in a master cache')
+    parser.add_argument('--nummc', type=int, default=1, help='number of master caches')
+    parser.add_argument('--policy', choices=Replay.policies, default='lru', help='cache replacement policy')
+    parser.add_argument('--ttl', type=float, help='time to live of the ttl policy (s)')
+    parser.add_argument('--period', type=int, help='refresh period of the lfu policy (requests)')
+    parser.add_argument('--seed', type=int, help='seed of the PoP selection (random if omitted)')
+    args = parser.parse_args()
+
+    system = System(args.pops, Request(), DellR750(), DellR750())
+    system.replication = args.replication
+    system.storage1ec = args.storage1ec
+    system.nummodulesec = args.nummodulesec
+    system.numecpop = args.numecpop
+    system.nummodulesmc = args.nummodulesmc
+    system.nummc = args.nummc
+
+    replay = Replay(system, args.policy, args.seed, args.ttl, args.period)
+    start = clock.perf_counter()
+    with tqdm(unit='requests', unit_scale=True) as pbar:
+        for chunk in Trace(args.log, args.names, args.chunksize):
+            replay.feed(*chunk)
+            pbar.update(chunk[1].size)
+    elapsed = clock.perf_counter() - start
+
+    print(f"Replayed {replay.requests} requests in {elapsed:.1f} s ({replay.requests / elapsed / 1000 / 1000:.2f} M/s)")
+    print(replay.frame())
+    print(replay.compare())
@@ -0,0 +1,87 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+def harmonic(n, s: float, head: int = 16):
+    """
+    Generalized harmonic number H(n, s) = sum of k^-s for k = 1 ... n, the normalizer of the Zipf distribution, in
+    O(1): the first head terms are summed, the tail (a Hurwitz zeta difference) is approximated by Euler-Maclaurin.
+    :param n: array of the number of ranks
+    :param s: exponent, non negative
+    :param head: number of the terms summed exactly
+    :return: array of H(n, s)
+    """
+    n = np.asarray(n, dtype=float)
+    assert np.all(n >= 0) and s >= 0, f"negative parameter, s: {s}, n: {n}"
+    k = np.arange(1, head + 1, dtype=float)
+    terms = np.cumsum(k ** -s)
+    exact = np.concatenate([[0], terms])[np.minimum(n, head).astype(int)]
+
+    # sum of x^-s from a to b: integral, trapezoid correction and two Bernoulli terms
+    a, b = head + 1., np.maximum(n, head + 1.)
+    x = (1 - s) * np.log(b / a)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        integral = a ** (1 - s) * np.log(b / a) * np.where(x == 0, 1, np.expm1(x) / x)
+    tail = integral + (a ** -s + b ** -s) / 2 + s / 12 * (a ** (-s - 1) - b ** (-s - 1)) - \
+           s * (s + 1) * (s + 2) / 720 * (a ** (-s - 3) - b ** (-s - 3))
+    return exact + np.where(n > head, tail, 0)
+
+
+def pmf(k, s: float, n: int):
+    """
+    Zipf distribution of n ranks, the same as scipy.stats.zipfian.
+    :param k: array of ranks
+    :param s: exponent
+    :param n: number of ranks
+    :return: array of the probabilities
+    """
+    return np.asarray(k, dtype=float) ** -float(s) / harmonic(n, s)
+
+
+def fit(counts: np.ndarray, bins: Optional[int] = None, alpha: float = 0.05, ranked: bool = False,
+        smax: float = 10) -> Tuple[float, float, float]:
+    """
+    Maximum likelihood Zipf exponent of observed request counts: each request is a sample of the rank of its
+    content, so the log likelihood depends only on the number of requests and the count weighted sum of log ranks.
+    With bins, the counts are summed in logarithmic rank bins and the bin probabilities are fitted. The confidence
+    interval is the normal one of the observed Fisher information. The exponent is the s parameter of LiveTV.
+    :param counts: array of the number of requests of each content (channel)
+    :param bins: number of logarithmic rank bins, None to fit the ranks
+    :param alpha: 1 - confidence level
+    :param ranked: the counts are already ordered by rank (decreasing), otherwise they are sorted
+    :param smax: largest exponent searched
+    :return: tuple of (exponent, lower and upper bound of the confidence interval)
+    """
+    from scipy.optimize import minimize_scalar
+    from scipy.stats import norm
+
+    counts = np.asarray(counts, dtype=float)
+    assert counts.size and np.all(counts >= 0) and np.sum(counts) > 0, f"Wrong counts: {counts}"
+    assert bins is None or bins > 0, f"non positive bins: {bins}"
+    assert 0 < alpha < 1, f"Wrong alpha: {alpha}"
+    if not ranked:
+        counts = np.sort(counts)[::-1]
+    n, total = counts.size, np.sum(counts)
+
+    if bins is None:
+        logranks = np.dot(counts, np.log(np.arange(1, n + 1)))
+
+        def negloglikelihood(s: float) -> float:
+            return s * logranks + total * np.log(harmonic(n, s))
+    else:
+        # bins of ranks edges[i] + 1 ... edges[i + 1]
+        edges = np.unique(np.round(np.geomspace(1, n + 1, bins + 1)).astype(int)) - 1
+        binned = np.add.reduceat(counts, edges[:-1])
+
+        def negloglikelihood(s: float) -> float:
+            mass = np.maximum(np.diff(harmonic(edges, s)), np.finfo(float).tiny)
+            return -np.dot(binned, np.log(mass)) + total * np.log(harmonic(n, s))
+
+    s = minimize_scalar(negloglikelihood, bounds=(0, smax), method='bounded', options={'xatol': 1e-10}).x
+
+    # observed information by central differences
+    h = 1e-4
+    lo = max(s - h, 0)
+    information = (negloglikelihood(lo + 2 * h) - 2 * negloglikelihood(lo + h) + negloglikelihood(lo)) / h ** 2
+    error = norm.ppf(1 - alpha / 2) / np.sqrt(information) if information > 0 else np.inf
+    return float(s), float(s - error), float(s + error)
@@ -1,47 +1,24 @@
-from scipy.optimize import curve_fit
-from scipy.special import zetac
+try:
+    from cdn.zipf import fit, pmf
+except ImportError:  # run as python zipf.py from logs/, the package is in the repository root
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from cdn.zipf import fit, pmf
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
 
-def H(n: int, s: float):
-    assert n > 0, f"negative parameter, s: {s}, n:{n}"
-    return np.sum(np.arange(1, n + 1, ) ** (-s))
-
-
-# zipf
-def pmf(k: int, s: float, N: int):
-#    assert all(k > 0) and s >= 0 and N > 0, f"negative parameter, k:{k}, s:{s}, N:{N}"
-    return k ** -float(s) / H(N, s)
-
-
 if __name__ == '__main__':
     df = pd.read_csv('svc40.csv', names=['ch', 'f'])
-    x = np.arange(df.shape[0]) + 1
-    y = np.array(df.f)
-
-    N = df.shape[0]
-
-    def zipf(k: int, s: float):
-        return pmf(k, s, N)
-
-#    popt, pcov = curve_fit(zipf, x, y, bounds=([0], [np.inf]))
-#    print(popt)
-
-    def neg_zipf_likelihood(s):
-        probas = x ** (-s) / np.sum(np.arange(1, N + 1 ) ** (-s))
-        log_likelihood = sum(np.log(probas) * x)
-        return -log_likelihood
-
-
-    from scipy.optimize import minimize_scalar
+    y = np.sort(np.array(df.f, dtype=float))[::-1]
+    x = np.arange(y.size) + 1
 
-    s_best = minimize_scalar(neg_zipf_likelihood, [0.0001, 30.0])
-    print(s_best)
+    s, low, high = fit(y, ranked=True)
+    print(f"s: {s:.4f} (95% confidence interval: {low:.4f} ... {high:.4f})")
 
-    y2 = zipf(x, s_best.x)
-    plt.plot(x, y)
-    plt.plot(x, y2)
+    plt.plot(x, y / np.sum(y))
+    plt.plot(x, pmf(x, s, y.size))
     plt.loglog()
     plt.show()